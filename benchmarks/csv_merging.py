@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of merging directories of csv files with
+:func:`oemof.solph.inputlib.csv_tools.merge_csv_files`.
+
+Directories of growing numbers of regional node/flow tables and sequence
+files are written to a temporary directory and merged. The time of reading
+and concatenating the files with one thread and with a thread pool is
+reported, as well as the time of merging and writing the merged files as csv
+and as pickle.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from oemof.solph.inputlib.csv_tools import merge_csv_files
+
+from csv_reading import write_csv_files
+
+
+def write_directory(path, files=100, regions=2, periods=8760):
+    """Writes `files` node/flow tables and sequence files."""
+    os.makedirs(path)
+    for n in range(files):
+        write_csv_files(path, regions=regions, periods=periods, seed=n,
+                        prefix='F{0}_R'.format(n),
+                        name='nodes_flows_{0}'.format(n))
+
+
+def run_csv_merging_benchmark(files=(10, 100, 300), periods=8760):
+    print("  {0:>6} {1:>12} {2:>12} {3:>10} {4:>12}".format(
+        'files', '1 thread [s]', 'threads [s]', '+csv [s]', '+pickle [s]'))
+    directory = tempfile.mkdtemp()
+    timings = {}
+    try:
+        for n in files:
+            path = os.path.join(directory, str(n))
+            output = os.path.join(directory, 'merged_{0}'.format(n))
+            os.makedirs(output)
+            write_directory(path, files=n, periods=periods)
+            timings[n] = []
+            for kwargs in [dict(write=False, workers=1),
+                           dict(write=False),
+                           dict(output_format='csv'),
+                           dict(output_format='pickle')]:
+                start = time.perf_counter()
+                merge_csv_files(path, output, cache=False, **kwargs)
+                timings[n].append(time.perf_counter() - start)
+            print("  {0:>6} {1:>12.3f} {2:>12.3f} {3:>10.3f} "
+                  "{4:>12.3f}".format(n, *timings[n]))
+    finally:
+        shutil.rmtree(directory)
+    return timings
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_csv_merging_benchmark()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of reading energy systems from csv files with
+:func:`oemof.solph.NodesFromCSV`.
+
+Node/flow tables and sequence files of growing size (regions of the dispatch
+example with a fossil power plant per fuel, renewable sources with sequences,
+a storage and a load) are written to a temporary directory and read again.
+The loading throughput in rows of the node/flow table per second is reported
+for parsing the files and for reading them again from a
+:class:`oemof.solph.inputlib.csv_cache.ParsedCache`.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import oemof.solph as solph
+from oemof.solph.inputlib import csv_cache
+
+
+COLUMNS = ['class', 'label', 'source', 'target', 'conversion_factors',
+           'nominal_value', 'min', 'max', 'actual_value', 'fixed_costs',
+           'variable_costs', 'fixed', 'nominal_capacity', 'capacity_loss',
+           'inflow_conversion_factor', 'outflow_conversion_factor',
+           'initial_capacity', 'capacity_min', 'capacity_max']
+
+FUELS = ['uranium', 'lignite', 'hard_coal', 'gas', 'oil', 'biomass']
+
+
+def write_csv_files(path, regions=100, periods=8760, seed=1, prefix='R',
+                    name='nodes_flows'):
+    """Writes a node/flow table and a sequence file of the given number of
+    regions and returns their file names and the number of table rows.
+    The labels of the regions start with `prefix`.
+    """
+    rand = np.random.RandomState(seed)
+    rows = []
+    sequences = {}
+
+    def row(**kwargs):
+        rows.append([kwargs.get(c) for c in COLUMNS])
+
+    for fuel in FUELS:
+        row(**{'class': 'Source', 'label': 'resource_' + fuel,
+               'source': 'resource_' + fuel, 'target': 'bus_' + fuel,
+               'variable_costs': rand.uniform(5, 40)})
+    for r in range(regions):
+        bel = prefix + '{0}_bus_el'.format(r)
+        row(**{'class': 'Sink', 'label': prefix + '{0}_excess'.format(r),
+               'source': bel, 'target': prefix + '{0}_excess'.format(r),
+               'variable_costs': 1e-8})
+        for fuel in FUELS:
+            pp = prefix + '{0}_pp_{1}'.format(r, fuel)
+            row(**{'class': 'LinearTransformer', 'label': pp,
+                   'source': 'bus_' + fuel, 'target': pp})
+            row(**{'class': 'LinearTransformer', 'label': pp, 'source': pp,
+                   'target': bel, 'conversion_factors': 0.38,
+                   'nominal_value': 5000, 'max': 0.85, 'fixed_costs': 30000,
+                   'variable_costs': 4})
+        for source in ['wind', 'solar']:
+            label = prefix + '{0}_{1}'.format(r, source)
+            row(**{'class': 'Source', 'label': label, 'source': label,
+                   'target': bel, 'nominal_value': 5000,
+                   'actual_value': 'seq', 'fixed': True})
+            sequences['Source', label, label, bel, 'actual_value'] = (
+                rand.uniform(size=periods))
+        storage = prefix + '{0}_storage'.format(r)
+        row(**{'class': 'Storage', 'label': storage, 'source': bel,
+               'target': storage, 'nominal_value': 1000, 'max': 0.85,
+               'nominal_capacity': 13100, 'capacity_loss': 0,
+               'inflow_conversion_factor': 0.9,
+               'outflow_conversion_factor': 0.9, 'initial_capacity': 0.5,
+               'capacity_min': 0, 'capacity_max': 1})
+        row(**{'class': 'Storage', 'label': storage, 'source': storage,
+               'target': bel, 'nominal_value': 1000, 'max': 0.85})
+        load = prefix + '{0}_load'.format(r)
+        row(**{'class': 'Sink', 'label': load, 'source': bel, 'target': load,
+               'nominal_value': 35000, 'actual_value': 'seq', 'fixed': True})
+        sequences['Sink', load, bel, load, 'actual_value'] = (
+            rand.uniform(size=periods))
+
+    nodes_flows = os.path.join(path, name + '.csv')
+    nodes_flows_seq = os.path.join(path, name + '_seq.csv')
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(nodes_flows, index=False)
+    seq = pd.DataFrame(sequences, index=pd.date_range(
+        '1/1/2012', periods=periods, freq='H'))
+    seq.columns.names = ['class', 'label', 'source', 'target', 'attribute']
+    seq.to_csv(nodes_flows_seq)
+    return nodes_flows, nodes_flows_seq, len(rows)
+
+
+def run_csv_reading_benchmark(regions=(10, 100, 1000), periods=168):
+    print("  {0:>9} {1:>10} {2:>12} {3:>10} {4:>12}".format(
+        'rows', 'read [s]', 'rows per s', 'cached [s]', 'rows per s'))
+    directory = tempfile.mkdtemp()
+    cache = csv_cache.ParsedCache(os.path.join(directory, 'cache'))
+    timings = {}
+    try:
+        for r in regions:
+            nodes_flows, nodes_flows_seq, rows = write_csv_files(
+                directory, regions=r, periods=periods)
+            solph.EnergySystem()
+            start = time.perf_counter()
+            solph.NodesFromCSV(nodes_flows, nodes_flows_seq, cache=False)
+            parsed = time.perf_counter() - start
+            solph.NodesFromCSV(nodes_flows, nodes_flows_seq, cache=cache)
+            solph.EnergySystem()
+            start = time.perf_counter()
+            solph.NodesFromCSV(nodes_flows, nodes_flows_seq, cache=cache)
+            timings[rows] = (parsed, time.perf_counter() - start)
+            print("  {0:>9} {1:>10.3f} {2:>12.0f} {3:>10.3f} "
+                  "{4:>12.0f}".format(rows, parsed, rows / parsed,
+                                      timings[rows][1],
+                                      rows / timings[rows][1]))
+    finally:
+        shutil.rmtree(directory)
+    return timings
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_csv_reading_benchmark()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the initialization of the flow variable bounds in
+:class:`oemof.solph.OperationalModel`.
+
+The bulk assignment used by the model (one batch per flow) is compared to the
+former loop over all flows and timesteps. Both are run on the same model, so
+only the bound assignment itself is timed.
+"""
+
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+import oemof.solph as solph
+
+
+def create_energy_system(flows=200, periods=8760, seed=1):
+    """Creates a simple energy system with one bus, a number of fixed and
+    bounded sources and one excess sink.
+    """
+    rand = np.random.RandomState(seed)
+    timeindex = pd.date_range('1/1/2012', periods=periods, freq='H')
+    energysystem = solph.EnergySystem(timeindex=timeindex)
+
+    bel = solph.Bus(label='electricity')
+    for n in range(flows):
+        profile = rand.uniform(size=periods)
+        if n % 2:
+            solph.Source(label='fixed_{0}'.format(n), outputs={bel: solph.Flow(
+                actual_value=profile, nominal_value=10, fixed=True)})
+        else:
+            solph.Source(label='bounded_{0}'.format(n), outputs={
+                bel: solph.Flow(max=profile, min=0.1 * profile,
+                                nominal_value=10, variable_costs=n)})
+    solph.Sink(label='excess', inputs={bel: solph.Flow()})
+    return energysystem
+
+
+def legacy_flow_bounds(om):
+    """The loop over all flows and timesteps formerly used by the
+    :class:`OperationalModel`.
+    """
+    for (o, i) in om.FLOWS:
+        for t in om.TIMESTEPS:
+            if om.flows[o, i].actual_value[t] is not None and (
+                    om.flows[o, i].nominal_value is not None):
+                om.flow[o, i, t].value = (
+                    om.flows[o, i].actual_value[t] *
+                    om.flows[o, i].nominal_value)
+                if om.flows[o, i].fixed:
+                    om.flow[o, i, t].fix()
+
+            if om.flows[o, i].nominal_value is not None and (
+                    om.flows[o, i].binary is None):
+                om.flow[o, i, t].setub(om.flows[o, i].max[t] *
+                                       om.flows[o, i].nominal_value)
+                om.flow[o, i, t].setlb(om.flows[o, i].min[t] *
+                                       om.flows[o, i].nominal_value)
+
+
+def bulk_flow_bounds(om):
+    """The bulk assignment used by the :class:`OperationalModel`."""
+    for (o, i) in om.FLOWS:
+        om._set_flow_bounds(o, i)
+
+
+def run_flow_bounds_benchmark(flows=200, periods=8760, repetitions=3):
+    energysystem = create_energy_system(flows=flows, periods=periods)
+    om = solph.OperationalModel(energysystem)
+
+    timings = {}
+    for name, function in [('legacy loop', legacy_flow_bounds),
+                           ('bulk assignment', bulk_flow_bounds)]:
+        start = time.perf_counter()
+        for _ in range(repetitions):
+            function(om)
+        timings[name] = (time.perf_counter() - start) / repetitions
+
+    print("Flow bounds of {0} flows x {1} timesteps:".format(flows, periods))
+    for name, seconds in timings.items():
+        print("  {0:<16}: {1:8.3f} s".format(name, seconds))
+    print("  speedup         : {0:8.1f}".format(
+        timings['legacy loop'] / timings['bulk assignment']))
+    return timings
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_flow_bounds_benchmark()
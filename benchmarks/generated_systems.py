@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of creating synthetic energy systems with
+:mod:`oemof.solph.generator`.
+
+Systems of 10^3 to 10^6 flows (a bus has three flows, every bus two
+transformers and every second bus a storage, 8 flows per bus) with profiles
+of a year are created at once and with the nodes streamed in batches into
+:meth:`add_many <oemof.energy_system.EnergySystem.add_many>`. The creation
+throughput in flows per second and the peak memory of the smaller systems (as
+traced by :mod:`tracemalloc`, in a separate run) are reported.
+"""
+
+from itertools import islice
+import logging
+import time
+import tracemalloc
+
+import pandas as pd
+
+import oemof.solph as solph
+from oemof.solph.generator import generate_energy_system, generate_nodes
+
+
+def sizes(flows):
+    """ Returns the numbers of buses, transformers and storages of a system
+    of about `flows` flows.
+    """
+    buses = max(1, flows // 8)
+    return {'buses': buses, 'transformers': 2 * buses,
+            'storages': buses // 2}
+
+
+def stream_energy_system(timesteps, **kwargs):
+    """ Adds the generated nodes to the energy system in batches."""
+    es = solph.EnergySystem(timeindex=pd.date_range(
+        '1/1/2012', periods=timesteps, freq='H'))
+    nodes = generate_nodes(timesteps=timesteps, **kwargs)
+    for batch in iter(lambda: list(islice(nodes, 10000)), []):
+        es.add_many(batch)
+    return es
+
+
+def run_generated_systems_benchmark(flows=(10 ** 3, 10 ** 4, 10 ** 5,
+                                           10 ** 6),
+                                    timesteps=8760, traced=10 ** 5):
+    print("  {0:>9} {1:>12} {2:>12} {3:>13} {4:>10}".format(
+        'flows', 'created [s]', 'streamed [s]', 'flows per s',
+        'peak [MiB]'))
+    # the first energy system imports the solph groupings
+    generate_energy_system(buses=1, transformers=0, storages=0)
+    timings = {}
+    for requested in flows:
+        start = time.perf_counter()
+        es = generate_energy_system(timesteps=timesteps, **sizes(requested))
+        created = time.perf_counter() - start
+        number = len(es.flows())
+        del es
+        start = time.perf_counter()
+        es = stream_energy_system(timesteps, **sizes(requested))
+        streamed = time.perf_counter() - start
+        del es
+
+        peak = float('nan')
+        if number <= traced:
+            tracemalloc.start()
+            generate_energy_system(timesteps=timesteps, **sizes(requested))
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+        timings[number] = (created, streamed, peak)
+        print("  {0:>9} {1:>12.2f} {2:>12.2f} {3:>13.0f} {4:>10.1f}".format(
+            number, created, streamed, number / streamed, peak))
+    return timings
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_generated_systems_benchmark()
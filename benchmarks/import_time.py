@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the time to import oemof's packages.
+
+Every package is imported in a fresh interpreter. The best wall time of a
+number of runs is reported together with the heavy libraries (pyomo, pandas,
+dill, matplotlib, networkx) loaded by the import, which should be none since
+the classes of `oemof.solph`, `oemof.outputlib` and `oemof.tools` are
+imported on first access.
+"""
+
+import logging
+import subprocess
+import sys
+
+
+HEAVY = ['pyomo', 'pandas', 'dill', 'matplotlib', 'networkx']
+
+CODE = """import sys, time
+start = time.perf_counter()
+{0}
+print(time.perf_counter() - start)
+print(' '.join(m for m in {1!r} if m in sys.modules))
+"""
+
+
+def import_time(statement):
+    """ Returns the time to execute the import `statement` in a new
+    interpreter and the heavy libraries loaded by it.
+    """
+    output = subprocess.check_output(
+        [sys.executable, '-c', CODE.format(statement, HEAVY)],
+        stderr=subprocess.DEVNULL, universal_newlines=True)
+    # pyomo may print warnings before the timing
+    seconds, loaded = output.splitlines()[-2:]
+    return float(seconds), loaded.split()
+
+
+def run_import_time_benchmark(statements=('import oemof.solph',
+                                          'import oemof.outputlib',
+                                          'import oemof.tools',
+                                          'from oemof.solph import Bus',
+                                          'from oemof.solph import '
+                                          'OperationalModel'),
+                              runs=5):
+    print("  {0:<40} {1:>10}  {2}".format('import', 'time [s]', 'loaded'))
+    timings = {}
+    for statement in statements:
+        results = [import_time(statement) for _ in range(runs)]
+        seconds = min(r[0] for r in results)
+        timings[statement] = seconds
+        print("  {0:<40} {1:>10.3f}  {2}".format(
+            statement, seconds, ', '.join(results[0][1]) or '-'))
+    return timings
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_import_time_benchmark()
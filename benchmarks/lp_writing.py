@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of writing LP files with the pyomo based
+:class:`oemof.solph.OperationalModel` and the direct matrix backend
+:class:`oemof.solph.matrix.MatrixModel`.
+
+Build time (model creation plus writing the file) and peak memory (as traced
+by :mod:`tracemalloc`) are measured for both backends. Memory is traced in a
+separate run, as tracing slows down the pyomo backend considerably.
+"""
+
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import oemof.solph as solph
+from oemof.solph.matrix import MatrixModel
+
+
+def create_energy_system(regions=10, periods=8760, seed=1):
+    """Creates an energy system with an electricity and a gas bus, a power
+    plant, a chp, a storage, a wind source and a demand per region.
+    """
+    rand = np.random.RandomState(seed)
+    timeindex = pd.date_range('1/1/2012', periods=periods, freq='H')
+    energysystem = solph.EnergySystem(timeindex=timeindex)
+
+    for r in range(regions):
+        bel = solph.Bus(label='electricity_{0}'.format(r))
+        bth = solph.Bus(label='heat_{0}'.format(r))
+        bgas = solph.Bus(label='gas_{0}'.format(r))
+        solph.Source(label='gas_source_{0}'.format(r),
+                     outputs={bgas: solph.Flow(variable_costs=30)})
+        solph.Source(label='wind_{0}'.format(r), outputs={bel: solph.Flow(
+            actual_value=rand.uniform(size=periods), nominal_value=100,
+            fixed=True)})
+        solph.Sink(label='demand_{0}'.format(r), inputs={bel: solph.Flow(
+            actual_value=rand.uniform(size=periods), nominal_value=80,
+            fixed=True)})
+        solph.Sink(label='excess_{0}'.format(r), inputs={bel: solph.Flow()})
+        solph.Sink(label='heat_demand_{0}'.format(r), inputs={bth: solph.Flow(
+            actual_value=rand.uniform(size=periods), nominal_value=40,
+            fixed=True)})
+        solph.LinearTransformer(
+            label='pp_gas_{0}'.format(r),
+            inputs={bgas: solph.Flow()},
+            outputs={bel: solph.Flow(nominal_value=60, variable_costs=5)},
+            conversion_factors={bel: 0.58})
+        solph.LinearTransformer(
+            label='chp_gas_{0}'.format(r),
+            inputs={bgas: solph.Flow()},
+            outputs={bel: solph.Flow(), bth: solph.Flow(nominal_value=50)},
+            conversion_factors={bel: 0.3, bth: 0.5})
+        solph.Storage(
+            label='storage_{0}'.format(r),
+            inputs={bel: solph.Flow(variable_costs=1)},
+            outputs={bel: solph.Flow()},
+            capacity_loss=0.01,
+            nominal_input_capacity_ratio=1/6,
+            nominal_output_capacity_ratio=1/6,
+            inflow_conversion_factor=0.97,
+            outflow_conversion_factor=0.86,
+            investment=solph.Investment(ep_costs=100))
+    return energysystem
+
+
+def write_operational_model(energysystem, filename):
+    om = solph.OperationalModel(energysystem)
+    om.write(filename, io_options={'symbolic_solver_labels': True})
+
+
+def write_matrix_model(energysystem, filename):
+    MatrixModel(energysystem).write(filename)
+
+
+def run_lp_writing_benchmark(regions=10, periods=8760):
+    energysystem = create_energy_system(regions=regions, periods=periods)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, function in [('pyomo', write_operational_model),
+                               ('matrix', write_matrix_model)]:
+            filename = os.path.join(directory, name + '.lp')
+            start = time.perf_counter()
+            function(energysystem, filename)
+            seconds = time.perf_counter() - start
+
+            tracemalloc.start()
+            function(energysystem, filename)
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+            results[name] = (seconds, peak)
+
+    print("LP file of {0} regions x {1} timesteps:".format(regions, periods))
+    for name, (seconds, peak) in results.items():
+        print("  {0:<7}: {1:8.2f} s {2:10.1f} MiB".format(name, seconds, peak))
+    print("  speedup: {0:8.1f}   memory ratio: {1:8.1f}".format(
+        results['pyomo'][0] / results['matrix'][0],
+        results['pyomo'][1] / results['matrix'][1]))
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_lp_writing_benchmark()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the registration and grouping of nodes in an
+:class:`oemof.energy_system.EnergySystem`.
+
+Nodes are added with :meth:`EnergySystem.add_many` and grouped by their label
+and their type. The time per node should stay constant up to a million nodes.
+The former registration, which wrapped the groups in a new partial function
+and copied the group of every added node, is shown for the smaller sizes.
+"""
+
+from functools import partial
+import logging
+import time
+
+from oemof.energy_system import EnergySystem
+from oemof.groupings import Nodes
+from oemof.network import Bus, Node
+
+
+class LegacyNodes(Nodes):
+    """The grouping into sets formerly used by :class:`.Nodes`, copying the
+    group on every merge."""
+    def merge(self, new, old):
+        return old.union(new)
+
+
+def _regroup(entity, groups, groupings):
+    for g in groupings:
+        g(entity, groups)
+    return groups
+
+
+def legacy_registration(nodes):
+    """Adds the nodes one by one like the former :meth:`EnergySystem.add`."""
+    es = EnergySystem(groupings=[LegacyNodes(type)])
+    for n in nodes:
+        es.entities.append(n)
+        es._groups = partial(_regroup, n, es.groups, es._groupings)
+    return es.groups
+
+
+def bulk_registration(nodes):
+    """Adds the nodes at once with :meth:`EnergySystem.add_many`."""
+    es = EnergySystem(groupings=[type])
+    es.add_many(nodes)
+    return es.groups
+
+
+def create_nodes(number):
+    Node.registry = None
+    return [Bus(label='bus_{0}'.format(i)) for i in range(number)]
+
+
+def run_node_registration_benchmark(
+        sizes=(1000, 10000, 100000, 1000000), legacy_sizes=(1000, 10000)):
+    print("  {0:>9} {1:>12} {2:>12} {3:>12}".format(
+        'nodes', 'legacy [s]', 'bulk [s]', 'us per node'))
+    timings = {}
+    for size in sizes:
+        nodes = create_nodes(size)
+        timings[size] = []
+        for function in [legacy_registration, bulk_registration]:
+            if function is legacy_registration and size not in legacy_sizes:
+                timings[size].append(float('nan'))
+                continue
+            start = time.perf_counter()
+            groups = function(nodes)
+            timings[size].append(time.perf_counter() - start)
+            assert len(groups[Bus]) == size
+        print("  {0:>9} {1:>12.3f} {2:>12.3f} {3:>12.2f}".format(
+            size, timings[size][0], timings[size][1],
+            timings[size][1] / size * 1e6))
+    return timings
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_node_registration_benchmark()
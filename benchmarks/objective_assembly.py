@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the assembly of the objective of
+:class:`oemof.solph.OperationalModel`.
+
+The objective is built for models of growing size (flows x timesteps). The
+time per term of the single pass assembly used by the model should stay
+constant, while the former term by term accumulation with `+=` is shown for
+comparison.
+"""
+
+import logging
+import time
+
+import pyomo.environ as po
+
+import oemof.solph as solph
+from oemof.solph.plumbing import is_none
+
+from flow_bounds import create_energy_system
+
+
+def legacy_objective(om):
+    """The term by term accumulation of the variable costs formerly used by
+    :meth:`oemof.solph.blocks.Flow._objective_expression` and
+    :meth:`oemof.solph.OperationalModel.objective_function`.
+    """
+    variable_costs = 0
+    for i, o in om.FLOWS:
+        for t in om.TIMESTEPS:
+            if om.flows[i, o].variable_costs[0] is not None:
+                variable_costs += (om.flow[i, o, t] * om.timeincrement[t] *
+                                   om.flows[i, o].variable_costs[t])
+    expr = 0
+    expr += variable_costs
+    om.del_component('objective')
+    om.objective = po.Objective(expr=expr)
+
+
+def single_pass_objective(om):
+    """The objective assembly used by the :class:`OperationalModel`."""
+    om.objective_function(update=True)
+
+
+def run_objective_benchmark(flows=200, periods=(1000, 2000, 4000, 8000)):
+    print("Objective assembly of {0} flows:".format(flows))
+    print("  {0:>9} {1:>12} {2:>12} {3:>12}".format(
+        'timesteps', 'terms', 'legacy [s]', 'single [s]'))
+    timings = {}
+    for p in periods:
+        energysystem = create_energy_system(flows=flows, periods=p)
+        om = solph.OperationalModel(energysystem)
+        terms = sum(1 for f in om.flows.values()
+                    if not is_none(f.variable_costs[0])) * p
+        timings[p] = []
+        for function in [legacy_objective, single_pass_objective]:
+            start = time.perf_counter()
+            function(om)
+            timings[p].append(time.perf_counter() - start)
+        print("  {0:>9} {1:>12} {2:>12.3f} {3:>12.3f}   "
+              "({4:.2f} us per term)".format(
+                  p, terms, timings[p][0], timings[p][1],
+                  timings[p][1] / terms * 1e6))
+    return timings
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_objective_benchmark()
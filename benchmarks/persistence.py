@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of storing energy systems with :mod:`oemof.solph.persistence`
+compared to :meth:`oemof.energy_system.EnergySystem.dump` and
+:meth:`restore <oemof.energy_system.EnergySystem.restore>`.
+
+The time to write and read an energy system and the size on disk are measured
+for the pickle dump, the columnar directory layout (read lazily with
+memory-mapped profiles) and the compressed `.npz` file.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import oemof.solph as solph
+from oemof.solph import persistence
+
+from lp_writing import create_energy_system
+
+
+def size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name))
+                   for name in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def dump(energysystem, path):
+    energysystem.dump(os.path.dirname(path), os.path.basename(path))
+
+
+def restore(path):
+    energysystem = solph.EnergySystem()
+    energysystem.restore(os.path.dirname(path), os.path.basename(path))
+    return energysystem
+
+
+def run_persistence_benchmark(regions=(10, 50), periods=8760):
+    print("  {0:>8} {1:>10} {2:>10} {3:>10} {4:>10}".format(
+        'regions', 'format', 'write [s]', 'read [s]', 'size [MB]'))
+    directory = tempfile.mkdtemp()
+    formats = [('dump', 'es.oemof', dump, restore),
+               ('columns', 'es', persistence.save, persistence.load),
+               ('npz', 'es.npz', persistence.save, persistence.load)]
+    timings = {}
+    try:
+        for r in regions:
+            energysystem = create_energy_system(regions=r, periods=periods)
+            for name, filename, write, read in formats:
+                path = os.path.join(directory, filename)
+                start = time.perf_counter()
+                write(energysystem, path)
+                written = time.perf_counter() - start
+                start = time.perf_counter()
+                read(path)
+                timings[r, name] = (written, time.perf_counter() - start)
+                print("  {0:>8} {1:>10} {2:>10.3f} {3:>10.3f} "
+                      "{4:>10.1f}".format(r, name, *timings[r, name],
+                                          size(path) / 2 ** 20))
+    finally:
+        shutil.rmtree(directory)
+    return timings
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_persistence_benchmark()
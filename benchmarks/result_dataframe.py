@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of building a :class:`oemof.outputlib.ResultsDataFrame` from the
+results of an energy system.
+
+The construction from one tuple per value formerly used is compared to the
+construction from concatenated arrays. Build time and peak memory (as traced
+by :mod:`tracemalloc`) are reported. The results are random values in the
+layout of :func:`oemof.outputlib.result_dict`, so no model is built or
+solved.
+"""
+
+from collections import UserDict, UserList
+import logging
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from oemof.outputlib import ResultsDataFrame
+import oemof.solph as solph
+
+from lp_writing import create_energy_system
+
+
+class LegacyResultsDataFrame(pd.DataFrame):
+    """The construction formerly used by :class:`ResultsDataFrame`, one tuple
+    per value and a sort of the index afterwards.
+    """
+    def __init__(self, es):
+        rows_list = []
+        for k, v in es.results.items():
+            for kk, vv in v.items():
+                if isinstance(k, solph.Bus):
+                    row = (k.label, 'other' if k is kk else 'from_bus',
+                           'duals' if k is kk else kk.label)
+                elif k is kk:
+                    row = (list(k.outputs)[0].label, 'other', k.label)
+                else:
+                    row = (kk.label, 'to_bus', k.label)
+                rows_list.append(row + (vv,))
+        tuples = [(bus, type, obj, date, val)
+                  for bus, type, obj, vals in rows_list
+                  for date, val in zip(es.timeindex, vals)]
+        index = ['bus_label', 'type', 'obj_label', 'datetime']
+        super().__init__(tuples, columns=index + ['val'])
+        self.set_index(index, inplace=True)
+        self.sort_index(inplace=True)
+
+
+def random_results(energysystem, seed=1):
+    """Returns random results of all flows, storages and buses."""
+    rand = np.random.RandomState(seed)
+    periods = len(energysystem.timeindex)
+    results = UserDict()
+    for source, target in energysystem.flows():
+        results.setdefault(source, UserDict())[target] = UserList(
+            rand.uniform(size=periods).tolist())
+    for node in energysystem.nodes:
+        if isinstance(node, (solph.Bus, solph.Storage)):
+            results.setdefault(node, UserDict())[node] = UserList(
+                rand.uniform(size=periods).tolist())
+    return results
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def run_result_dataframe_benchmark(regions=(10, 50), periods=8760):
+    print("  {0:>8} {1:>10} {2:>10} {3:>12} {4:>10} {5:>12}".format(
+        'regions', 'values', 'tuples [s]', 'tuples [MB]', 'arrays [s]',
+        'arrays [MB]'))
+    timings = {}
+    for r in regions:
+        energysystem = create_energy_system(regions=r, periods=periods)
+        energysystem.results = random_results(energysystem)
+        values = periods * sum(len(v) for v in energysystem.results.values())
+        timings[r] = (measure(LegacyResultsDataFrame, energysystem) +
+                      measure(ResultsDataFrame, energysystem))
+        print("  {0:>8} {1:>10} {2:>10.2f} {3:>12.0f} {4:>10.2f} "
+              "{5:>12.0f}".format(r, values, *timings[r]))
+    return timings
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_result_dataframe_benchmark()
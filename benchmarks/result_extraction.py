@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the result extraction of :func:`oemof.outputlib.result_dict`.
+
+The bulk extraction into numpy arrays is compared to the former extraction,
+which read the values of the flows, storage capacities and duals element by
+element. Pass `solver=None` to compare both on a model which is not solved but
+whose variables and duals are set to random values.
+"""
+
+from collections import UserDict, UserList
+from itertools import groupby
+import logging
+import time
+
+import numpy as np
+import pyomo.environ as po
+
+import oemof.solph as solph
+from oemof.outputlib import result_dict
+
+from lp_writing import create_energy_system
+
+
+def legacy_result_dict(om):
+    """The element by element extraction formerly used by
+    :func:`oemof.outputlib.result_dict` (without investments).
+    """
+    result = UserDict()
+    result.objective = om.objective()
+    for i, o in om.flows:
+        result[i] = result.get(i, UserDict())
+        result[i][o] = UserList([om.flow[i, o, t].value
+                                 for t in om.TIMESTEPS])
+        if isinstance(i, solph.Storage):
+            block = (om.Storage if i.investment is None else
+                     om.InvestmentStorage)
+            result[i][i] = UserList([block.capacity[i, t].value
+                                     for t in om.TIMESTEPS])
+    grouped = groupby(sorted(om.Bus.balance.keys()), lambda pair: pair[0])
+    for bus, timesteps in grouped:
+        result[bus] = result.get(bus, UserDict())
+        result[bus][bus] = [om.dual[om.Bus.balance[bus, t]]
+                            for _, t in timesteps]
+    return result
+
+
+def random_solution(om, seed=1):
+    """Sets random values of all variables and duals of the model."""
+    rand = np.random.RandomState(seed)
+    for var in om.component_data_objects(po.Var):
+        var.value = rand.uniform()
+    for constraint in om.Bus.balance.values():
+        om.dual[constraint] = rand.uniform()
+
+
+def run_result_extraction_benchmark(regions=10, periods=8760, solver=None):
+    energysystem = create_energy_system(regions=regions, periods=periods)
+    om = solph.OperationalModel(energysystem)
+    om.receive_duals()
+    if solver is None:
+        random_solution(om)
+    else:
+        om.solve(solver=solver)
+
+    timings = []
+    for function in [legacy_result_dict, result_dict]:
+        start = time.perf_counter()
+        function(om)
+        timings.append(time.perf_counter() - start)
+
+    print("{0} regions x {1} timesteps ({2}):".format(
+        regions, periods, "solver: " + solver if solver else "no solve"))
+    print("  element by element : {0:8.2f} s".format(timings[0]))
+    print("  bulk               : {0:8.2f} s".format(timings[1]))
+    print("  speedup            : {0:8.1f}".format(timings[0] / timings[1]))
+    return timings
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_result_extraction_benchmark()
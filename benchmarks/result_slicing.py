@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of slicing a :class:`oemof.outputlib.ResultsDataFrame`.
+
+A reporting workload is replayed: the balance of every bus, the results of
+every object in weekly windows and the unstacked results of every bus and
+type, repeated a number of times. Slicing via the lookup table of the frame
+is compared to the former slicing via `.loc` on the MultiIndex.
+"""
+
+import logging
+import time
+
+import pandas as pd
+
+from oemof.outputlib import ResultsDataFrame
+
+from lp_writing import create_energy_system
+from result_dataframe import random_results
+
+
+def legacy_slice_by(df, **kwargs):
+    """The slicing formerly used by `ResultsDataFrame.slice_by`."""
+    kwargs.setdefault('bus_label', slice(None))
+    kwargs.setdefault('type', slice(None))
+    kwargs.setdefault('obj_label', slice(None))
+    kwargs.setdefault('date_from', df.index.get_level_values('datetime')[0])
+    kwargs.setdefault('date_to', df.index.get_level_values('datetime')[-1])
+    idx = pd.IndexSlice
+    return df.loc[idx[kwargs['bus_label'], kwargs['type'],
+                      kwargs['obj_label'],
+                      slice(pd.Timestamp(kwargs['date_from']),
+                            pd.Timestamp(kwargs['date_to']))], :]
+
+
+def legacy_slice_bus_balance(df, bus_label):
+    """The bus balance formerly computed by `slice_bus_balance`."""
+    dfs = []
+    for l in df.index.levels[1]:
+        subset = legacy_slice_by(df, bus_label=bus_label, type=l)
+        subset = subset.unstack(level='obj_label')
+        subset.reset_index(level=['bus_label', 'type'], drop=True,
+                           inplace=True)
+        subset.sort_index(axis=1, inplace=True)
+        subset.columns = subset.columns.get_level_values(1).unique()
+        dfs.append(subset)
+    subset = pd.concat(dfs, axis=1)
+    subset.columns = [v for v in subset.columns]
+    return subset
+
+
+def workload(df, slice_by, slice_bus_balance, repeat=3, weeks=4):
+    """Slices the results of `df` like a reporting job."""
+    buses = list(df.index.levels[0])
+    objects = list(df.index.levels[2])
+    dates = df.index.levels[3]
+    windows = [(dates[w * 168], dates[min((w + 1) * 168, len(dates)) - 1])
+               for w in range(weeks)]
+    slices = 0
+    for _ in range(repeat):
+        for bus in buses:
+            slice_bus_balance(df, bus)
+            slices += 1
+        for obj in objects:
+            for date_from, date_to in windows:
+                slice_by(df, obj_label=obj, date_from=date_from,
+                         date_to=date_to)
+                slices += 1
+    return slices
+
+
+def run_result_slicing_benchmark(regions=(5, 20), periods=8760, repeat=3):
+    print("  {0:>8} {1:>8} {2:>10} {3:>10} {4:>8}".format(
+        'regions', 'slices', 'loc [s]', 'lookup [s]', 'speedup'))
+    timings = {}
+    for r in regions:
+        energysystem = create_energy_system(regions=r, periods=periods)
+        energysystem.results = random_results(energysystem)
+        df = ResultsDataFrame(energy_system=energysystem)
+        start = time.perf_counter()
+        workload(df, legacy_slice_by, legacy_slice_bus_balance, repeat)
+        legacy = time.perf_counter() - start
+        start = time.perf_counter()
+        slices = workload(df, ResultsDataFrame.slice_by,
+                          ResultsDataFrame.slice_bus_balance, repeat)
+        timings[r] = (legacy, time.perf_counter() - start)
+        print("  {0:>8} {1:>8} {2:>10.2f} {3:>10.2f} {4:>8.1f}".format(
+            r, slices, legacy, timings[r][1], legacy / timings[r][1]))
+    return timings
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_result_slicing_benchmark()
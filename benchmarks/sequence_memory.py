@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the memory held by the sequences (`min`, `max`,
+`variable_costs`, conversion factors, ...) of the flows and nodes of an
+energy system after every item was read once per timestep, as done while
+building a model.
+
+The compact sequences of :mod:`oemof.solph.plumbing` (a constant held once,
+profiles as typed numpy arrays) are compared to the former sequences, which
+grew a list of the constant on every read, with profiles given as lists.
+Memory is traced by :mod:`tracemalloc`.
+"""
+
+from collections import UserList
+import logging
+import tracemalloc
+
+from oemof.solph.plumbing import _Sequence, _Profile
+from oemof.solph.rolling_horizon import _sequence_attributes
+
+from lp_writing import create_energy_system
+
+
+class LegacySequence(UserList):
+    """The sequence of a constant formerly used by :func:`.sequence`, which
+    stores every item read."""
+    def __init__(self, *args, **kwargs):
+        self.default = kwargs["default"]
+        super().__init__(*args)
+
+    def __getitem__(self, key):
+        try:
+            return self.data[key]
+        except IndexError:
+            self.data.extend([self.default] * (key - len(self.data) + 1))
+            return self.data[key]
+
+
+def all_sequences(energysystem):
+    """Yields all sequences of the flows and nodes of the energy system."""
+    for obj, attribute in _sequence_attributes(energysystem):
+        value = getattr(obj, attribute)
+        yield from (value.values() if isinstance(value, dict) else [value])
+
+
+def held_memory(energysystem, periods, legacy):
+    """Returns the traced memory in bytes of copies of all sequences after
+    every item was read once per timestep, and the number of sequences.
+    """
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    held = []
+    for s in all_sequences(energysystem):
+        if s.is_constant:
+            copy = (LegacySequence(default=s.default) if legacy else
+                    _Sequence(default=s.default))
+        else:
+            copy = s.values.tolist() if legacy else _Profile(s.values.copy())
+        for t in range(periods):
+            copy[t]
+        held.append(copy)
+    memory = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return memory, len(held)
+
+
+def run_sequence_memory_benchmark(regions=50, periods=8760):
+    energysystem = create_energy_system(regions=regions, periods=periods)
+    legacy, number = held_memory(energysystem, periods, legacy=True)
+    compact, _ = held_memory(energysystem, periods, legacy=False)
+
+    print("{0} sequences of {1} regions x {2} timesteps:".format(
+        number, regions, periods))
+    print("  former sequences  : {0:8.1f} MiB".format(legacy / 2 ** 20))
+    print("  compact sequences : {0:8.1f} MiB".format(compact / 2 ** 20))
+    print("  reduction         : {0:8.1f}".format(legacy / compact))
+    return legacy, compact
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_sequence_memory_benchmark()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the solph groupings (:const:`oemof.solph.GROUPINGS`).
+
+The nodes of energy systems of growing size are grouped with the constraint
+grouping and the single flow grouping of solph. The former groupings, an
+`isinstance` chain for the constraint blocks and one
+:class:`oemof.groupings.FlowsWithNodes` grouping per flow block, are shown for
+comparison.
+"""
+
+import logging
+import time
+
+from oemof.energy_system import EnergySystem
+import oemof.solph.groupings as groupings
+from oemof.solph.network import (Bus, LinearTransformer, Storage,
+                                 LinearN1Transformer,
+                                 VariableFractionTransformer)
+from oemof.solph.options import Investment
+from oemof.solph import blocks
+
+from lp_writing import create_energy_system
+
+
+def legacy_constraint_grouping(node):
+    """The `isinstance` chain formerly used by
+    :func:`oemof.solph.groupings.constraint_grouping`."""
+    if isinstance(node, Bus) and node.balanced:
+        return blocks.Bus
+    if isinstance(node, VariableFractionTransformer):
+        return blocks.VariableFractionTransformer
+    if isinstance(node, LinearTransformer):
+        return blocks.LinearTransformer
+    if isinstance(node, LinearN1Transformer):
+        return blocks.LinearN1Transformer
+    if isinstance(node, Storage) and isinstance(node.investment, Investment):
+        return blocks.InvestmentStorage
+    if isinstance(node, Storage):
+        return blocks.Storage
+
+
+LEGACY_GROUPINGS = [legacy_constraint_grouping,
+                    groupings.investment_flow_grouping,
+                    groupings.standard_flow_grouping,
+                    groupings.binary_flow_grouping,
+                    groupings.discrete_flow_grouping]
+
+
+def group(nodes, solph_groupings):
+    es = EnergySystem(groupings=solph_groupings)
+    es.add_many(nodes)
+    return es.groups
+
+
+def run_grouping_benchmark(regions=(10, 100, 1000)):
+    print("  {0:>9} {1:>12} {2:>12} {3:>12}".format(
+        'nodes', 'legacy [s]', 'registry [s]', 'speedup'))
+    timings = {}
+    for r in regions:
+        nodes = create_energy_system(regions=r, periods=1).nodes
+        timings[r] = []
+        results = []
+        for solph_groupings in [LEGACY_GROUPINGS, groupings.GROUPINGS]:
+            start = time.perf_counter()
+            results.append(group(nodes, solph_groupings))
+            timings[r].append(time.perf_counter() - start)
+        assert results[0] == results[1]
+        print("  {0:>9} {1:>12.3f} {2:>12.3f} {3:>12.1f}".format(
+            len(nodes), timings[r][0], timings[r][1],
+            timings[r][0] / timings[r][1]))
+    return timings
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_grouping_benchmark()
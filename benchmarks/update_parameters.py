@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of :meth:`oemof.solph.OperationalModel.update_parameters`.
+
+The time of one update-and-solve cycle (new `actual_value`, `variable_costs`
+and `max` series pushed into the existing model) is compared to the time of
+rebuilding and solving the model. Pass `solver=None` to compare the update
+with the rebuild without solving.
+"""
+
+import logging
+import time
+
+import numpy as np
+
+import oemof.solph as solph
+
+from lp_writing import create_energy_system
+
+
+def new_parameters(energysystem, regions, periods, seed=2):
+    """Returns new series for the wind sources, gas sources and gas power
+    plants of the benchmark energy system.
+    """
+    rand = np.random.RandomState(seed)
+    groups = energysystem.groups
+    updates = {}
+    for r in range(regions):
+        bel = groups['electricity_{0}'.format(r)]
+        bgas = groups['gas_{0}'.format(r)]
+        updates[groups['wind_{0}'.format(r)], bel] = {
+            'actual_value': rand.uniform(size=periods)}
+        updates[groups['gas_source_{0}'.format(r)], bgas] = {
+            'variable_costs': rand.uniform(25, 35, size=periods)}
+        updates[groups['pp_gas_{0}'.format(r)], bel] = {
+            'max': rand.uniform(0.5, 1, size=periods)}
+    return updates
+
+
+def run_update_benchmark(regions=5, periods=8760, solver='cbc'):
+    energysystem = create_energy_system(regions=regions, periods=periods)
+    om = solph.OperationalModel(energysystem)
+
+    start = time.perf_counter()
+    om.update_parameters(new_parameters(energysystem, regions, periods))
+    if solver is not None:
+        om.solve(solver=solver)
+    update = time.perf_counter() - start
+
+    start = time.perf_counter()
+    om = solph.OperationalModel(energysystem)
+    if solver is not None:
+        om.solve(solver=solver)
+    rebuild = time.perf_counter() - start
+
+    print("{0} regions x {1} timesteps ({2}):".format(
+        regions, periods, "solver: " + solver if solver else "no solve"))
+    print("  update  : {0:8.2f} s".format(update))
+    print("  rebuild : {0:8.2f} s".format(rebuild))
+    print("  speedup : {0:8.1f}".format(rebuild / update))
+    return update, rebuild
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    run_update_benchmark()
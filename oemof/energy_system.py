@@ -1,15 +1,12 @@
 # -*- coding: utf-8 -*-
 
-from functools import partial
 import logging
 import os
 import pandas as pd
 
-import dill as pickle
-
 from oemof.network import Entity
 from oemof.groupings import DEFAULT as BY_UID, Grouping, Nodes
-from oemof.network import Node
+from oemof.network import Adjacency, Node, flow
 
 
 class EnergySystem:
@@ -50,6 +47,9 @@ class EnergySystem:
         <oemof.core.network.Entity>` are automatically added to this list on
         construction.
     groups : dict
+    adjacency : :class:`Adjacency <oemof.network.Adjacency>`
+        Integer indexed adjacency structure of the flows of the nodes. It is
+        built on first access and kept until nodes are added or flows change.
     results : dictionary
         A dictionary holding the results produced by the energy system.
         Is `None` while no results are produced.
@@ -102,35 +102,52 @@ class EnergySystem:
 
         Entity.registry = self
         Node.registry = self
+        self._adjacency = None
         self._groups = {}
         self._groupings = ([BY_UID] +
                            [g if isinstance(g, Grouping) else Nodes(g)
                             for g in kwargs.get('groupings', [])])
-        for e in self.entities:
-            for g in self._groupings:
-                g(e, self.groups)
+        # entities which are not yet grouped, see groups
+        self._ungrouped = list(self.entities)
         self.results = kwargs.get('results')
         self.timeindex = kwargs.get('timeindex',
                                     pd.date_range(start=pd.to_datetime('today'),
                                                   periods=1, freq='H'))
 
-    @staticmethod
-    def _regroup(entity, groups, groupings):
-        for g in groupings:
-            g(entity, groups)
-        return groups
-
     def add(self, entity):
         """ Add an `entity` to this energy system.
         """
         self.entities.append(entity)
-        self._groups = partial(self._regroup, entity, self.groups,
-                               self._groupings)
+        self._adjacency = None
+        self._ungrouped.append(entity)
+
+    def add_many(self, entities):
+        """ Add all `entities` of an iterable to this energy system at once.
+
+        Like :meth:`add`, but the entities are appended in one step. Use this
+        for entities created without a :attr:`registry
+        <oemof.network.Node.registry>`, e.g. when building large energy
+        systems.
+        """
+        entities = list(entities)
+        self.entities.extend(entities)
+        self._adjacency = None
+        self._ungrouped.extend(entities)
 
     @property
     def groups(self):
+        # energy systems restored from former dumps hold the groups as
+        # chain of partial functions
         while callable(self._groups):
             self._groups = self._groups()
+        ungrouped = getattr(self, '_ungrouped', None)
+        if ungrouped:
+            # the groupings are applied once to all entities added since the
+            # last access
+            self._ungrouped = []
+            for e in ungrouped:
+                for g in self._groupings:
+                    g(e, self._groups)
         return self._groups
 
     @property
@@ -140,11 +157,23 @@ class EnergySystem:
     @nodes.setter
     def nodes(self, value):
         self.entities = value
+        self._adjacency = None
+
+    @property
+    def adjacency(self):
+        adjacency = getattr(self, '_adjacency', None)
+        state = (flow.version, id(self.entities), len(self.entities))
+        if adjacency is None or self._adjacency_state != state:
+            self._adjacency = Adjacency(self.entities)
+            self._adjacency_state = state
+        return self._adjacency
 
     def flows(self):
-        return {(source, target): source.outputs[target]
-                for source in self.nodes
-                for target in source.outputs}
+        """ Returns a read-only mapping of the `(source, target)` tuples of
+        all flows leaving the nodes of the energy system to the flow objects.
+        The mapping is kept by the :attr:`adjacency` structure.
+        """
+        return self.adjacency.edges
 
     def dump(self, dpath=None, filename=None):
         r""" Dump an EnergySystem instance.
@@ -160,7 +189,11 @@ class EnergySystem:
         if filename is None:
             filename = 'es_dump.oemof'
 
-        pickle.dump(self.__dict__, open(os.path.join(dpath, filename), 'wb'))
+        # the adjacency structure is rebuilt from the nodes when needed
+        attributes = {k: v for k, v in self.__dict__.items()
+                      if k not in ('_adjacency', '_adjacency_state')}
+        import dill as pickle
+        pickle.dump(attributes, open(os.path.join(dpath, filename), 'wb'))
 
         msg = ('Attributes dumped to: {0}'.format(os.path.join(
             dpath, filename)))
@@ -178,6 +211,7 @@ class EnergySystem:
         if filename is None:
             filename = 'es_dump.oemof'
 
+        import dill as pickle
         self.__dict__ = pickle.load(open(os.path.join(dpath, filename), "rb"))
         msg = ('Attributes restored from: {0}'.format(os.path.join(
             dpath, filename)))
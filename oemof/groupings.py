@@ -2,10 +2,11 @@
 """
 try:
     from collections.abc import (Hashable, Iterable, Mapping,
-                                 MutableMapping as MuMa)
+                                 MutableMapping as MuMa, MutableSet as MuSe)
 except ImportError:
     from collections import (Hashable, Iterable, Mapping,
-                             MutableMapping as MuMa)
+                             MutableMapping as MuMa, MutableSet as MuSe)
+from copy import copy
 from itertools import chain, filterfalse
 
 
@@ -200,7 +201,12 @@ class Grouping:
         for group in (k if (isinstance(k, Iterable) and not
                             isinstance(k, Hashable))
                       else [k]):
-            d[group] = (self.merge(v, d[group]) if group in d else v)
+            if group in d:
+                d[group] = self.merge(v, d[group])
+            else:
+                # groups may be merged in place (see :meth:`Nodes.merge`), so
+                # groups stored under different keys must not be the same set
+                d[group] = copy(v) if isinstance(v, MuSe) else v
 
 
 class Nodes(Grouping):
@@ -218,9 +224,11 @@ class Nodes(Grouping):
     def merge(self, new, old):
         """
         :meth:`Updates <set.update>` :obj:`old` to be the union of :obj:`old`
-        and :obj:`new`.
+        and :obj:`new`. The set :obj:`old` is updated in place, so adding an
+        entity to a group does not copy the group.
         """
-        return old.union(new)
+        old.update(new)
+        return old
 
 
 class Flows(Nodes):
@@ -1,5 +1,7 @@
+from collections import abc
 from functools import total_ordering
-from weakref import WeakKeyDictionary as WeKeDi, WeakSet as WeSe
+from types import MappingProxyType
+import numpy as np
 """
 This package (along with its subpackages) contains the classes used to model
 energy systems. An energy system is modelled as a graph/network of entities
@@ -12,25 +14,33 @@ connected.
 class _Edges:
     """ Internal utility class keeping track of known edges.
 
+    The flows of an edge are stored in the dictionaries of the inputs and
+    outputs of its source and target nodes. Every change of an edge
+    increments :attr:`version`, which invalidates the :class:`Adjacency` of
+    energy systems.
+
     As this is currently quite dirty and hackish, it should be treated as an
     internal implementation detail with an unstable interface. Maye it can be
     converted to a fully fledged useful :python:`Edge` class later on, but for
     now it simply hides most of the dirty secrets of the :class:`Node` class.
 
     """
-    _in_edges = WeKeDi()
-    _flows = WeKeDi()
+    version = 0
 
     def __getitem__(self, key):
-        self._flows[key] = self._flows.get(key, WeKeDi())
-        return self._flows[key]
+        return _outputs(key)
 
     def __setitem__(self, key, value):
         source, target = key
-        self._in_edges[target] = self._in_edges.get(target, WeSe())
-        self._in_edges[target].add(source)
-        self._flows[source] = self._flows.get(source, WeKeDi())
-        self._flows[source][target] = value
+        _outputs(source)[target] = value
+        _inputs(target)[source] = value
+        type(self).version += 1
+
+    def __delitem__(self, key):
+        source, target = key
+        del _outputs(source)[target]
+        del _inputs(target)[source]
+        type(self).version += 1
 
     def __call__(self, *keys):
         result = self
@@ -42,6 +52,167 @@ class _Edges:
 flow = _Edges()
 
 
+def _inputs(node):
+    # created on first use, as nodes may get flows while being unpickled
+    try:
+        return node._inputs
+    except AttributeError:
+        node._inputs = {}
+        return node._inputs
+
+
+def _outputs(node):
+    try:
+        return node._outputs
+    except AttributeError:
+        node._outputs = {}
+        return node._outputs
+
+
+class _Flows(abc.MutableMapping):
+    """ View of the inputs or outputs of a node. Flows set or deleted via
+    the view are set or deleted for both nodes of the edge (see
+    :class:`_Edges`).
+    """
+    __slots__ = ('_node', '_flows', '_outputs')
+
+    def __init__(self, node, outputs):
+        self._node = node
+        self._flows = _outputs(node) if outputs else _inputs(node)
+        self._outputs = outputs
+
+    def _key(self, other):
+        return (self._node, other) if self._outputs else (other, self._node)
+
+    def __getitem__(self, other):
+        return self._flows[other]
+
+    def __setitem__(self, other, value):
+        flow[self._key(other)] = value
+
+    def __delitem__(self, other):
+        del flow[self._key(other)]
+
+    def __iter__(self):
+        return iter(self._flows)
+
+    def __len__(self):
+        return len(self._flows)
+
+    def __contains__(self, other):
+        return other in self._flows
+
+    # the views of the dictionary are faster than the generic ones
+    def keys(self):
+        return self._flows.keys()
+
+    def values(self):
+        return self._flows.values()
+
+    def items(self):
+        return self._flows.items()
+
+    def get(self, other, default=None):
+        return self._flows.get(other, default)
+
+    def __repr__(self):
+        return repr(self._flows)
+
+
+class Adjacency:
+    """ Integer indexed adjacency structure of the flows of an energy system.
+
+    The nodes are numbered in the order of the energy system, followed by
+    sources and targets of flows which are not part of it. The flows are
+    stored in compressed sparse row (CSR) form, i.e. sorted by source, with
+    the flows leaving node `i` at the positions `indptr[i]` to
+    `indptr[i + 1]`. The same holds for the flows entering node `i` at the
+    positions `in_order[in_indptr[i]:in_indptr[i + 1]]`.
+
+    Parameters
+    ----------
+    nodes : list
+        Nodes of the energy system.
+
+    Attributes
+    ----------
+    nodes : list
+    index : dict
+        Number of every node keyed by the `id` of the node.
+    sources, targets : numpy.ndarray
+        Numbers of the source and the target node of every flow.
+    flows : list
+        Flow objects.
+    indptr : numpy.ndarray
+        Offsets of the flows leaving each node.
+    in_order : numpy.ndarray
+        Positions of the flows sorted by target.
+    in_indptr : numpy.ndarray
+        Offsets of the flows entering each node in :attr:`in_order`.
+    edges : mapping
+        Read-only mapping of `(source, target)` to the flow objects.
+
+    Examples
+    --------
+    >>> a, b, c = Node(label='a'), Node(label='b'), Node(label='c')
+    >>> flow[a, b], flow[a, c], flow[c, b] = 1, 2, 3
+    >>> adjacency = Adjacency([a, b, c])
+    >>> list(adjacency.targets)
+    [1, 2, 1]
+    >>> list(adjacency.successors(0)), list(adjacency.predecessors(1))
+    ([1, 2], [0, 2])
+    >>> adjacency.edges[c, b]
+    3
+
+    """
+    def __init__(self, nodes):
+        self.nodes = list(nodes)
+        self.index = {id(n): i for i, n in enumerate(self.nodes)}
+        edges = {}
+        sources = []
+        targets = []
+        for position in range(len(self.nodes)):
+            source = self.nodes[position]
+            for target, f in _outputs(source).items():
+                edges[source, target] = f
+                sources.append(position)
+                targets.append(self._number(target))
+        for position in range(len(self.nodes)):
+            # sources of flows into the nodes which are no nodes themselves
+            for source in _inputs(self.nodes[position]):
+                self._number(source)
+
+        self.flows = list(edges.values())
+        self.edges = MappingProxyType(edges)
+        self.sources = np.array(sources, dtype=int)
+        self.targets = np.array(targets, dtype=int)
+        self.indptr = np.zeros(len(self.nodes) + 1, dtype=int)
+        np.cumsum(np.bincount(self.sources, minlength=len(self.nodes)),
+                  out=self.indptr[1:])
+        self.in_order = np.argsort(self.targets, kind='mergesort')
+        self.in_indptr = np.zeros(len(self.nodes) + 1, dtype=int)
+        np.cumsum(np.bincount(self.targets, minlength=len(self.nodes)),
+                  out=self.in_indptr[1:])
+
+    def _number(self, node):
+        number = self.index.get(id(node))
+        if number is None:
+            number = self.index[id(node)] = len(self.nodes)
+            self.nodes.append(node)
+        return number
+
+    def successors(self, i):
+        """ Returns the numbers of the targets of the flows leaving node
+        `i`."""
+        return self.targets[self.indptr[i]:self.indptr[i + 1]]
+
+    def predecessors(self, i):
+        """ Returns the numbers of the sources of the flows entering node
+        `i`."""
+        return self.sources[
+            self.in_order[self.in_indptr[i]:self.in_indptr[i + 1]]]
+
+
 @total_ordering
 class Node:
     """ Represents a Node in an energy system graph.
@@ -101,9 +272,11 @@ class Node:
     #       needed to confirm that.
 
     registry = None
-    __slots__ = ["__weakref__", "_label", "_state"]
+    __slots__ = ["__weakref__", "_label", "_state", "_inputs", "_outputs"]
 
     def __init__(self, *args, **kwargs):
+        self._inputs = {}
+        self._outputs = {}
         self._state = (args, kwargs)
         self.__setstate__(self._state)
         if __class__.registry is not None:
@@ -147,16 +320,13 @@ class Node:
 
     @property
     def inputs(self):
-        # TODO: Accessing :class:`Flow`'s `_in_edges` is kinda ugly.
-        #       Find a way to replace it.
-        #       This can also have unintuitive behaviour since adding new
-        #       associations to the returned mapping will NOT add a new input
-        #       flow to this node.
-        return {k: flow(k, self) for k in flow._in_edges.get(self, ())}
+        # A view of the inputs kept by `flow`, flows set via the view are
+        # also outputs of their source.
+        return _Flows(self, outputs=False)
 
     @property
     def outputs(self):
-        return flow(self)
+        return _Flows(self, outputs=True)
 
 
 class Bus(Node):
@@ -1,2 +1,35 @@
-from .result_dictionary import result_dict
-from .result_dataframe import ResultsDataFrame, DataFramePlot
+"""The classes of the outputlib are imported on first access (see
+:func:`__getattr__`), plotting imports matplotlib only when a plot is drawn.
+"""
+from importlib import import_module
+import sys
+
+from oemof.tools.helpers import _submodule
+
+
+# public name -> module which defines it
+_EXPORTS = {
+    'result_dict': 'result_dictionary', 'ResultArrays': 'result_dictionary',
+    'ResultsDataFrame': 'result_dataframe',
+    'DataFramePlot': 'result_dataframe',
+    'ResultTable': 'result_table'}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        return _submodule(__name__, name)
+    value = getattr(import_module('.' + _EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+if sys.version_info < (3, 7):
+    # module level __getattr__ is not supported, import everything at once
+    for _name in __all__:
+        __getattr__(_name)
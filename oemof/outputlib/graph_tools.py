@@ -1,27 +1,11 @@
 # -*- coding: utf-8 -*-
 """Modules for creating and manipulating energy system graphs."""
 
+from importlib.util import find_spec
 import logging
 import re
 import warnings
 
-try:
-    from matplotlib import pyplot as plt
-except ImportError:
-    logging.warning('Matplotlib could not be imported.',
-                    ' Plotting will not work.')
-try:
-    import networkx as nx
-    from networkx.drawing.nx_agraph import graphviz_layout
-    import pygraphviz
-except ImportError:
-    nx = None
-    graphviz_layout = None
-    pygraphviz = None
-
-
-warnings.filterwarnings("ignore")  # deactivate matplotlib warnings in networkx
-
 
 def graph(energy_system, optimization_model=None, edge_labels=True,
           remove_nodes=None, remove_nodes_with_substrings=None,
@@ -101,6 +85,16 @@ def graph(energy_system, optimization_model=None, edge_labels=True,
     Needs graphviz and networkx (>= v.1.11) to work properly.
     Tested on Ubuntu 16.04 x64.
     """
+    # networkx, pygraphviz and matplotlib are imported on the first call only,
+    # pygraphviz by the graphviz layout
+    try:
+        import networkx as nx
+        from networkx.drawing.nx_agraph import graphviz_layout
+    except ImportError:
+        nx = None
+    if find_spec('pygraphviz') is None:
+        nx = None
+
     # construct graph from nodes and flows
     if nx:
         G = nx.DiGraph()
@@ -147,17 +141,20 @@ def graph(energy_system, optimization_model=None, edge_labels=True,
          'arrows': arrows
         }
 
-        # draw graph
-        pos = graphviz_layout(G)
-        nx.draw(G, pos=pos, **options)
+        # draw graph, deactivate matplotlib warnings in networkx
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            pos = graphviz_layout(G)
+            nx.draw(G, pos=pos, **options)
 
-        # add edge labels for all edges
-        if edge_labels is True:
-            labels = nx.get_edge_attributes(G, 'weight')
-            nx.draw_networkx_edge_labels(G, pos=pos, edge_labels=labels)
+            # add edge labels for all edges
+            if edge_labels is True:
+                labels = nx.get_edge_attributes(G, 'weight')
+                nx.draw_networkx_edge_labels(G, pos=pos, edge_labels=labels)
 
         # show output
         if plot is True:
+            from matplotlib import pyplot as plt
             plt.show()
 
     else:
@@ -168,7 +165,8 @@ def graph(energy_system, optimization_model=None, edge_labels=True,
 
 
 for o in [graph]:
-    if (((nx is None) or (graphviz_layout is None) or (pygraphviz is None)) and
+    if ((any(find_spec(name) is None
+             for name in ['networkx', 'pygraphviz'])) and
         (getattr(o, "__doc__") is not None)):
         o.__doc__ = re.sub(r"((^|\n)\s*)>>>", r"\1>>",
                            re.sub(r"((^|\n)\s*)\.\.\.", r"\1..", o.__doc__))
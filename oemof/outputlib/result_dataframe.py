@@ -1,19 +1,29 @@
 # -*- coding: utf-8
+from collections import UserList
 import os
 import logging
+import numpy as np
 import pandas as pd
-try:
-    import matplotlib.pyplot as plt
-except ImportError:
-    plt = None
-    logging.warning('Matplotlib could not be imported.',
-                    ' Plotting will not work.')
+
+
+# levels of the index of a ResultsDataFrame
+INDEX = ['bus_label', 'type', 'obj_label', 'datetime']
+
+# formats of the stored ResultsDataFrames by file extension
+FILE_FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.h5': 'hdf',
+                '.hdf5': 'hdf'}
+
+# key of the results table in HDF5 files
+HDF_KEY = 'results'
 
 
 class ResultsDataFrame(pd.DataFrame):
     r"""Creates a multi-indexed pandas dataframe from a solph result object
     and holds methods to create subsets of the data.
 
+    Subsets are taken from the row ranges of the labels in a lookup table,
+    which is built once (see :meth:`lookup`).
+
     Note
     ----
     This is so far only a rough sketch and serves as a base for discussion.
@@ -24,14 +34,30 @@ class ResultsDataFrame(pd.DataFrame):
         A solved energy system model.
     filename : str
         A file name (including path) to a stored ResultsDataFrame
+    result_table : oemof.outputlib.result_table.ResultTable
+        Results in wide format.
+
+    Other Parameters
+    ----------------
+    bus_label, obj_label, date_from, date_to
+        Selection of the results read from `filename`, see
+        :meth:`from_file`.
     """
 
-    def __init__(self, energy_system=None, filename=None):
+    # attributes which are not passed on to derived frames
+    _internal_names = pd.DataFrame._internal_names + ['_lookup']
+    _internal_names_set = set(_internal_names)
+    _lookup = None
+
+    def __init__(self, energy_system=None, filename=None, result_table=None,
+                 **kwargs):
         # default values if not arguments are passed
         if energy_system is not None:
             self.from_energy_system(energy_system)
         elif filename is not None:
-            self.from_file(filename)
+            self.from_file(filename, **kwargs)
+        elif result_table is not None:
+            self.from_result_table(result_table)
         else:
             super().__init__()
 
@@ -43,85 +69,119 @@ class ResultsDataFrame(pd.DataFrame):
         ----------
         es : oemof.solph.EnergySystem
         """
-        rows_list = []
-        for k, v in es.results.items():
-            if 'Bus' in str(k.__class__):
-                for kk, vv in v.items():
-                    row = dict()
-                    row['bus_label'] = k.label
-                    if k is kk:
-                        row['type'] = 'other'
-                    else:
-                        row['type'] = 'from_bus'
-                    if k is kk:
-                        row['obj_label'] = 'duals'
-                    elif isinstance(kk, str):
-                        row['obj_label'] = 'kk'
-                    else:
-                        row['obj_label'] = kk.label
-                    row['datetime'] = es.timeindex
-                    row['val'] = vv
-                    rows_list.append(row)
-            else:
-                if k in v.keys():
-                    # self ref. components (results[component][component])
-                    for kk, vv in v.items():
-                        if k is kk:
-                            # self ref. comp. (results[component][component])
-                            row = dict()
-                            row['bus_label'] = list(k.outputs.keys())[0].label
-                            row['type'] = 'other'
-                            row['obj_label'] = k.label
-                            row['datetime'] = es.timeindex
-                            row['val'] = vv
-                            rows_list.append(row)
-                        else:
-                            # bus inputs (only self ref. components)
-                            row = dict()
-                            row['bus_label'] = list(k.outputs.keys())[0].label
-                            row['type'] = 'to_bus'
-                            row['obj_label'] = k.label
-                            row['datetime'] = es.timeindex
-                            row['val'] = v.get(list(k.outputs.keys())[0])
-                            rows_list.append(row)
-                else:
-                    for kk, vv in v.items():
-                        # bus inputs (results[component][bus])
-                        row = dict()
-                        row['bus_label'] = kk.label
-                        row['type'] = 'to_bus'
-                        row['obj_label'] = k.label
-                        row['datetime'] = es.timeindex
-                        row['val'] = vv
-                        rows_list.append(row)
+        super().__init__(_long_frame(_result_rows(es), es.timeindex))
 
-        # split date and value lists to tuples
-        tuples = [
-            (item['bus_label'], item['type'], item['obj_label'],
-             date, val)
-            for item in rows_list for date, val in zip(item['datetime'],
-                                                       item['val'])]
-
-        # create MultiIndex DataFrame
-        index = ['bus_label', 'type', 'obj_label', 'datetime']
-
-        columns = index + ['val']
+    def from_result_table(self, table):
+        """
+        Create a ResultsDataFrame from a wide
+        :class:`ResultTable <oemof.outputlib.result_table.ResultTable>`.
+        """
+        rows = [{'bus_label': bus_label, 'type': type, 'obj_label': obj_label,
+                 'val': values}
+                for (bus_label, type, obj_label), values in zip(
+                    table.keys, table.values)]
+        super().__init__(_long_frame(rows, table.timeindex))
+
+    def from_file(self, filename, bus_label=None, obj_label=None,
+                  date_from=None, date_to=None):
+        """
+        Read a stored ResultsDataFrame (see :meth:`to_file`).
 
-        super().__init__(tuples, columns=columns)
-        self.set_index(index, inplace=True)
-        self.sort_index(inplace=True)
+        Only the selected results are read from Parquet and HDF5 files, the
+        selection is passed to the reader (predicate pushdown). Row groups
+        of a Parquet file or rows of a HDF5 table outside of the selection
+        are skipped. Csv files are read completely and sliced afterwards.
 
-    def from_file(self, filename):
+        Parameters
+        ----------
+        filename : str
+            File name inclusive path. The format is given by the extension,
+            see :data:`FILE_FORMATS`.
+        bus_label : string or list of strings
+            Labels of the buses to read, all if None.
+        obj_label : string or list of strings
+            Labels of the objects to read, all if None.
+        date_from : string
+            Start date of the results to read e.g. "2016-01-01 00:00:00".
+        date_to : string
+            End date of the results to read.
         """
-        Read a stored ResultsDataFrame (csv-file).
+        selection = {'bus_label': _labels(bus_label),
+                     'obj_label': _labels(obj_label)}
+        dates = (None if date_from is None else pd.Timestamp(date_from),
+                 None if date_to is None else pd.Timestamp(date_to))
+        file_format = _file_format(filename)
+
+        if file_format == 'csv':
+            df = pd.read_csv(filename, index_col=[0, 1, 2, 3],
+                             parse_dates=True)
+            mask = np.ones(len(df), dtype=bool)
+            for name, labels in selection.items():
+                if labels is not None:
+                    mask &= df.index.get_level_values(name).isin(labels)
+            datetime = df.index.get_level_values('datetime')
+            if dates[0] is not None:
+                mask &= datetime >= dates[0]
+            if dates[1] is not None:
+                mask &= datetime <= dates[1]
+            super().__init__(df[mask] if not mask.all() else df)
+            return
+
+        if file_format == 'parquet':
+            filters = [(name, 'in', labels)
+                       for name, labels in selection.items()
+                       if labels is not None]
+            filters.extend((name, operator, date) for name, operator, date
+                           in [('datetime', '>=', dates[0]),
+                               ('datetime', '<=', dates[1])]
+                           if date is not None)
+            columns = pd.read_parquet(filename, filters=filters or None)
+        else:
+            where = ['{0} in {1!r}'.format(name, labels)
+                     for name, labels in selection.items()
+                     if labels is not None]
+            where.extend('datetime {0} {1!r}'.format(operator, str(date))
+                         for operator, date in [('>=', dates[0]),
+                                                ('<=', dates[1])]
+                         if date is not None)
+            columns = pd.read_hdf(filename, HDF_KEY, where=where or None)
+        super().__init__(_from_columns(columns))
+
+    def to_file(self, filename, compression=None, row_groups='bus_label'):
+        """
+        Store the ResultsDataFrame as Parquet (requires pyarrow), HDF5
+        (requires pytables) or csv file, the format is given by the extension
+        of `filename` (see :data:`FILE_FORMATS`).
+
+        The labels are stored as categorical columns, i.e. as integer codes
+        of the labels. A HDF5 file holds one table with the labels and the
+        dates as indexed data columns.
 
         Parameters
         ----------
         filename : str
             File name inclusive path.
+        compression : str
+            Compression of a Parquet file (default 'snappy', see
+            :func:`pyarrow.parquet.write_table`) or of a HDF5 file (default
+            'zlib', see :meth:`pandas.DataFrame.to_hdf`).
+        row_groups : str or int
+            Row groups of a Parquet file: one per bus if 'bus_label', one
+            per `row_groups` timesteps (of all results) if an integer or the
+            default of pyarrow if None. Readers skip the row groups outside
+            of their selection.
         """
-        df = pd.read_csv(filename, index_col=[0, 1, 2, 3], parse_dates=True)
-        super().__init__(df)
+        file_format = _file_format(filename)
+        if file_format == 'csv':
+            self.to_csv(filename)
+        elif file_format == 'parquet':
+            _write_parquet(_to_columns(self), filename,
+                           compression or 'snappy', row_groups)
+        else:
+            _to_columns(self).to_hdf(
+                filename, HDF_KEY, mode='w', format='table',
+                data_columns=INDEX, complib=compression or 'zlib',
+                complevel=9)
 
     def slice_by(self, **kwargs):
         r""" Method for slicing the ResultsDataFrame. A subset is returned.
@@ -142,10 +202,15 @@ class ResultsDataFrame(pd.DataFrame):
         kwargs.setdefault('bus_label', slice(None))
         kwargs.setdefault('type', slice(None))
         kwargs.setdefault('obj_label', slice(None))
-        kwargs.setdefault(
-            'date_from', self.index.get_level_values('datetime')[0])
-        kwargs.setdefault(
-            'date_to', self.index.get_level_values('datetime')[-1])
+        kwargs.setdefault('date_from', self._date(0))
+        kwargs.setdefault('date_to', self._date(-1))
+
+        # row ranges of the lookup table if the labels are found
+        rows = self.lookup().rows(
+            [kwargs[name] for name in INDEX[:-1]],
+            pd.Timestamp(kwargs['date_from']), pd.Timestamp(kwargs['date_to']))
+        if rows is not None:
+            return self.iloc[rows]
 
         # slicing
         idx = pd.IndexSlice
@@ -181,15 +246,22 @@ class ResultsDataFrame(pd.DataFrame):
         subset.columns = subset.columns.get_level_values(1).unique()
         return subset
 
-    def slice_bus_balance(self, bus_label):
+    def slice_bus_balance(self, bus_label, cache=True):
         r"""Method for slicing the ResultsDataFrame. An balance around a bus
         with inputs, outputs and other values is returned.
 
         Parameters
         ----------
         bus_label : string
+        cache : boolean
+            If True, the balance is kept and a copy of it is returned by
+            later calls. The cache is cleared if the index of the frame is
+            replaced, changes of the values in place are not noticed.
 
         """
+        balances = self.lookup().balances
+        if cache and bus_label in balances:
+            return balances[bus_label].copy()
         dfs = []
         for l in self.index.levels[1]:
             df = self.slice_unstacked(bus_label=bus_label, type=l,
@@ -198,8 +270,29 @@ class ResultsDataFrame(pd.DataFrame):
         subset = pd.concat(dfs, axis=1)
         # use standard instead of multi-indexed columns
         subset.columns = [v for v in subset.columns]
+        if cache:
+            balances[bus_label] = subset.copy()
         return subset
 
+    def lookup(self):
+        r"""Returns the lookup table of the row ranges of the labels of the
+        index, which is built on the first call and again after the index was
+        replaced.
+
+        Returns
+        -------
+        _Lookup
+        """
+        if self._lookup is None or self._lookup.index is not self.index:
+            self._lookup = _Lookup(self.index)
+        return self._lookup
+
+    def _date(self, row):
+        """ Date of the row `row` without creating the values of the level.
+        """
+        level = self.index.names.index('datetime')
+        return self.index.levels[level][self.index.codes[level][row]]
+
     def bus_balance_to_csv(self, bus_labels=None, output_path=''):
         r"""Method for saving bus balances of the ResultsDataFrame as single
         csv files. A balance around each bus with inputs, outputs and other
@@ -220,6 +313,270 @@ class ResultsDataFrame(pd.DataFrame):
                     os.path.join(output_path, bus + '.csv'))
 
 
+class _Lookup:
+    """ Row ranges of the `(bus_label, type, obj_label)` labels of the sorted
+    index of a :class:`ResultsDataFrame`.
+
+    Attributes
+    ----------
+    index : pandas.MultiIndex
+    starts, ends : numpy.ndarray
+        First and last (excluding) row of every label combination.
+    keys : numpy.ndarray
+        Codes of the labels of every label combination, one column per
+        level.
+    balances : dict
+        Cached bus balances by bus label.
+    """
+    def __init__(self, index):
+        self.index = index
+        self.balances = {}
+        self.keys = None
+        if (not isinstance(index, pd.MultiIndex) or
+                list(index.names) != INDEX or
+                not isinstance(index.levels[-1], pd.DatetimeIndex) or
+                len(index) == 0 or
+                not all(level.is_monotonic_increasing
+                        for level in index.levels) or
+                not index.is_monotonic_increasing):
+            return
+        codes = [c.astype(np.int64) for c in index.codes[:-1]]
+        sizes = [len(level) for level in index.levels[:-1]]
+        combined = (codes[0] * sizes[1] + codes[1]) * sizes[2] + codes[2]
+        self.starts = np.concatenate(
+            [[0], np.flatnonzero(np.diff(combined)) + 1]).astype(np.int64)
+        self.ends = np.append(self.starts[1:], len(combined))
+        self.keys = np.stack([c[self.starts] for c in codes], axis=1)
+        self.positions = [{label: code for code, label in enumerate(level)}
+                          for level in index.levels[:-1]]
+
+    def rows(self, labels, date_from, date_to):
+        """ Returns the rows of the given labels (one label, a list of labels
+        or `slice(None)` per level) from `date_from` to `date_to` (including)
+        or None if they are not found.
+        """
+        if self.keys is None:
+            return None
+        selected = np.ones(len(self.starts), dtype=bool)
+        for level, label in enumerate(labels):
+            if isinstance(label, slice) and label == slice(None):
+                continue
+            positions = self.positions[level]
+            try:
+                codes = ([positions[label]] if not isinstance(label, list)
+                         else [positions[l] for l in label])
+            except (KeyError, TypeError):
+                return None
+            selected &= np.isin(self.keys[:, level], codes)
+        if not selected.any():
+            return None
+
+        dates = self.index.levels[-1]
+        try:
+            bounds = (dates.searchsorted(date_from, side='left'),
+                      dates.searchsorted(date_to, side='right'))
+        except (TypeError, ValueError):
+            return None
+        date_codes = self.index.codes[-1]
+        ranges = []
+        for start, end in zip(self.starts[selected], self.ends[selected]):
+            first, last = date_codes[start:end].searchsorted(bounds)
+            ranges.append(np.arange(start + first, start + last))
+        return np.concatenate(ranges)
+
+
+def _result_rows(es):
+    """ Returns the results of an energy system as list of rows (dictionaries
+    of the bus label, the type and the object label of the values `val` of
+    an object).
+    """
+    rows_list = []
+    for k, v in es.results.items():
+        if 'Bus' in str(k.__class__):
+            for kk, vv in v.items():
+                row = dict()
+                row['bus_label'] = k.label
+                if k is kk:
+                    row['type'] = 'other'
+                else:
+                    row['type'] = 'from_bus'
+                if k is kk:
+                    row['obj_label'] = 'duals'
+                elif isinstance(kk, str):
+                    row['obj_label'] = 'kk'
+                else:
+                    row['obj_label'] = kk.label
+                row['datetime'] = es.timeindex
+                row['val'] = vv
+                rows_list.append(row)
+        else:
+            if k in v.keys():
+                # self ref. components (results[component][component])
+                for kk, vv in v.items():
+                    if k is kk:
+                        # self ref. comp. (results[component][component])
+                        row = dict()
+                        row['bus_label'] = list(k.outputs.keys())[0].label
+                        row['type'] = 'other'
+                        row['obj_label'] = k.label
+                        row['datetime'] = es.timeindex
+                        row['val'] = vv
+                        rows_list.append(row)
+                    else:
+                        # bus inputs (only self ref. components)
+                        row = dict()
+                        row['bus_label'] = list(k.outputs.keys())[0].label
+                        row['type'] = 'to_bus'
+                        row['obj_label'] = k.label
+                        row['datetime'] = es.timeindex
+                        row['val'] = v.get(list(k.outputs.keys())[0])
+                        rows_list.append(row)
+            else:
+                for kk, vv in v.items():
+                    # bus inputs (results[component][bus])
+                    row = dict()
+                    row['bus_label'] = kk.label
+                    row['type'] = 'to_bus'
+                    row['obj_label'] = k.label
+                    row['datetime'] = es.timeindex
+                    row['val'] = vv
+                    rows_list.append(row)
+
+    return rows_list
+
+
+def _long_frame(rows_list, timeindex):
+    """ Returns a frame of the values of `rows_list` (see
+    :func:`_result_rows`) with one row per value, indexed by the labels of
+    the rows and the dates of `timeindex`.
+    """
+    rows_list = [item for item in rows_list if item['val'] is not None]
+    date_codes, dates = pd.factorize(timeindex, sort=True)
+
+    # codes of the labels of the rows, rows sorted by labels
+    levels = []
+    codes = []
+    for name in INDEX[:-1]:
+        level_codes, level = pd.factorize(
+            [item[name] for item in rows_list], sort=True)
+        levels.append(level)
+        codes.append(level_codes)
+    order = np.lexsort(codes[::-1])
+
+    # values of a row are paired with the dates as by zip and sorted by
+    # date
+    values = [_array(rows_list[r]['val'])[:len(dates)] for r in order]
+    lengths = np.array([len(v) for v in values], dtype=int)
+    codes = [np.repeat(c[order].astype(_code_dtype(len(l))), lengths)
+             for c, l in zip(codes, levels)]
+    date_codes = date_codes.astype(_code_dtype(len(dates)))
+    if (lengths == len(date_codes)).all():
+        date_order = np.argsort(date_codes, kind='stable')
+        values = (np.concatenate(values) if values else
+                  np.empty(0, dtype=float))
+        if (date_order != np.arange(len(date_order))).any():
+            values = values.reshape(len(lengths), -1)[:, date_order]
+        codes.append(np.tile(date_codes[date_order], len(lengths)))
+    else:
+        date_orders = [np.argsort(date_codes[:n], kind='stable')
+                       for n in lengths]
+        values = np.concatenate([v[o] for v, o in zip(values,
+                                                      date_orders)])
+        codes.append(np.concatenate(
+            [date_codes[:n][o] for n, o in zip(lengths, date_orders)]))
+    values = values.ravel()
+    multiindex = pd.MultiIndex(levels=levels + [dates], codes=codes,
+                               names=INDEX, verify_integrity=False)
+    return pd.DataFrame({'val': values}, index=multiindex)
+
+
+def _labels(labels):
+    return [labels] if isinstance(labels, str) else labels
+
+
+def _file_format(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in FILE_FORMATS:
+        raise ValueError("Unknown file extension {0!r}, use one of "
+                         "{1}.".format(extension, sorted(FILE_FORMATS)))
+    return FILE_FORMATS[extension]
+
+
+def _to_columns(df):
+    """ Returns the results in columns, the labels as categoricals of the
+    codes of the index.
+    """
+    index = df.index
+    columns = {name: pd.Categorical.from_codes(index.codes[i],
+                                               index.levels[i])
+               for i, name in enumerate(INDEX[:-1])}
+    columns['datetime'] = index.levels[-1].take(index.codes[-1])
+    columns['val'] = df['val'].values
+    return pd.DataFrame(columns)
+
+
+def _from_columns(columns):
+    """ Returns the results of columns as frame with MultiIndex, built from
+    the codes of categorical columns.
+    """
+    levels = []
+    codes = []
+    for name in INDEX:
+        column = columns[name]
+        if not isinstance(column.dtype, pd.CategoricalDtype):
+            column = column.astype('category')
+        levels.append(column.cat.categories)
+        codes.append(column.cat.codes.values)
+    index = pd.MultiIndex(levels=levels, codes=codes, names=INDEX,
+                          verify_integrity=False).remove_unused_levels()
+    df = pd.DataFrame({'val': columns['val'].values}, index=index)
+    if not index.is_monotonic_increasing:
+        df = df.sort_index()
+    return df
+
+
+def _write_parquet(columns, filename, compression, row_groups):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if row_groups == 'bus_label':
+        keys = columns['bus_label'].cat.codes.values
+    elif row_groups is not None:
+        dates = pd.factorize(columns['datetime'], sort=True)[0]
+        keys = dates // row_groups
+        order = np.argsort(keys, kind='stable')
+        columns = columns.take(order)
+        keys = keys[order]
+    table = pa.Table.from_pandas(columns, preserve_index=False)
+    if row_groups is None:
+        pq.write_table(table, filename, compression=compression)
+        return
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(keys)) + 1])
+    ends = np.append(starts[1:], len(keys))
+    writer = pq.ParquetWriter(filename, table.schema, compression=compression)
+    try:
+        for start, end in zip(starts, ends):
+            writer.write_table(table.slice(start, end - start))
+    finally:
+        writer.close()
+
+
+def _array(values):
+    """ Returns the result values of an object as numpy array."""
+    if isinstance(values, UserList):
+        # converting the list itself is faster than the UserList
+        values = values.data
+    return np.asarray(values)
+
+
+def _code_dtype(length):
+    """ Smallest integer type of the codes of a level of `length` values."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if length < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
 class DataFramePlot(ResultsDataFrame):
     r"""Creates plots based on the subset of a multi-indexed pandas dataframe
     of the :class:`ResultsDataFrame class
@@ -444,6 +801,7 @@ class DataFramePlot(ResultsDataFrame):
             line_kwa = dict()
 
         if self.ax is None:
+            import matplotlib.pyplot as plt
             fig = plt.figure()
             self.ax = fig.add_subplot(1, 1, 1)
 
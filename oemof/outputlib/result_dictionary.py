@@ -1,9 +1,138 @@
 from collections import UserDict, UserList
-from itertools import groupby
-from ..solph.network import Storage
+import numpy as np
 from ..solph.options import Investment
 
 
+class ResultArrays:
+    """ Values of the flows, the storage capacities and the duals of the bus
+    balances of a solved optimization model in contiguous numpy arrays with
+    one row per object and one column per timestep.
+
+    Missing values (e.g. variables without a value or duals of bus balances
+    which are not part of the model) are nan.
+
+    Attributes
+    ----------
+    flows : numpy.ndarray
+        Values of all flows, the rows are given by :attr:`flow_keys`.
+    flow_keys : list
+        `(source, target)` tuples of the rows of :attr:`flows`.
+    capacities : numpy.ndarray
+        Capacities of all storages, the rows are given by :attr:`storages`.
+    storages : list
+    duals : numpy.ndarray
+        Duals of the balances of all buses, the rows are given by
+        :attr:`buses`. Empty if the model does not receive duals.
+    buses : list
+    """
+    def __init__(self, om):
+        self.flow_keys, self.flows = _flow_array(om)
+        self.storages = []
+        capacities = []
+        for block in ['Storage', 'InvestmentStorage']:
+            if hasattr(om, block) and hasattr(getattr(om, block), 'capacity'):
+                keys, values = _var_array(getattr(om, block).capacity,
+                                          len(om.TIMESTEPS))
+                self.storages.extend(keys)
+                capacities.append(values)
+        self.capacities = (np.concatenate(capacities) if capacities else
+                           np.empty((0, len(om.TIMESTEPS))))
+        self.buses, self.duals = _dual_array(om)
+        self._flow_rows = {key: row for row, key in enumerate(self.flow_keys)}
+        self._storage_rows = {n: row for row, n in enumerate(self.storages)}
+        self._bus_rows = {n: row for row, n in enumerate(self.buses)}
+
+    def flow(self, source, target):
+        """ Returns a view of the values of the flow from `source` to
+        `target`.
+        """
+        return self.flows[self._flow_rows[source, target]]
+
+    def capacity(self, storage):
+        """ Returns a view of the capacities of `storage`."""
+        return self.capacities[self._storage_rows[storage]]
+
+    def dual(self, bus):
+        """ Returns a view of the duals of the balance of `bus`."""
+        return self.duals[self._bus_rows[bus]]
+
+
+def _data(component):
+    """ Returns the indices and the data objects of an indexed pyomo
+    component in the order of their construction.
+    """
+    # the private data dictionary of pyomo is read directly if it exists, as
+    # the items() method of the component looks up every index in the index
+    # set, which takes much longer
+    data = getattr(component, '_data', None)
+    if not isinstance(data, dict):
+        data = dict(component.items())
+    return list(data), list(data.values())
+
+
+def _prefix(key):
+    return key[:-1] if len(key) > 2 else key[0]
+
+
+def _array(keys, values, length, rows=None):
+    """ Returns the row keys and an array of `values` indexed by `keys` of
+    the form `(..., timestep)` with one row per row key, i.e. the first
+    parts of the keys. The row numbers can be given as dictionary `rows`.
+    """
+    timesteps = [key[-1] for key in keys]
+    if (rows is None and
+            timesteps == list(range(length)) * (len(keys) // length)):
+        # all timesteps in order, one row after another
+        return ([_prefix(key) for key in keys[::length]],
+                values.reshape(-1, length))
+    if rows is None:
+        rows = {key: row for row, key in enumerate(
+            dict.fromkeys(_prefix(key) for key in keys))}
+    array = np.full((len(rows), length), np.nan)
+    array[[rows[_prefix(key)] for key in keys], timesteps] = values
+    return list(rows), array
+
+
+def _values(components):
+    # None (no value) becomes nan
+    return np.array([c.value for c in components], dtype=float)
+
+
+def _var_array(var, length, rows=None):
+    """ Returns the row keys and the values of a variable indexed by
+    `(..., timestep)` as array (see :func:`_array`).
+    """
+    keys, variables = _data(var)
+    return _array(keys, _values(variables), length, rows)
+
+
+def _flow_array(om):
+    """ Returns the `(source, target)` tuples of all flows and their values
+    including the values of presolved flows in one array.
+    """
+    length = len(om.TIMESTEPS)
+    presolved = getattr(om, 'presolved_flows', {})
+    if not presolved:
+        return _var_array(om.flow, length)
+
+    rows = {key: row for row, key in enumerate(om.FLOWS)}
+    keys, values = _var_array(om.flow, length, rows)
+    for key, v in presolved.items():
+        values[rows[key]] = np.where(np.isnan(v), values[rows[key]], v)
+    return keys, values
+
+
+def _dual_array(om):
+    """ Returns the balanced buses and the duals of their balances."""
+    length = len(om.TIMESTEPS)
+    balances = getattr(getattr(om, 'Bus', None), 'balance', None)
+    if not hasattr(om, 'dual') or balances is None:
+        return [], np.empty((0, length))
+    keys, constraints = _data(balances)
+    return _array(keys, np.array([om.dual.get(c) for c in constraints],
+                                 dtype=float), length)
+
+
 def result_dict(om):
     """ Returns a nested dictionary of the results of an optimization
     model.
@@ -41,47 +170,39 @@ def result_dict(om):
     The value of the objective function is stored under the
     :attr:`om.results().objective` attribute.
 
+    The values are read from the model at once (see :class:`ResultArrays`),
+    the arrays are available as :attr:`om.results().arrays`.
+
     Note that the optimization model has to be solved prior to invoking
     this method.
     """
     # TODO: Make the results dictionary a proper object?
+    arrays = ResultArrays(om)
     result = UserDict()
     result.objective = om.objective()
+    result.arrays = arrays
     investment = UserDict()
-    for i, o in om.flows:
-
+    for (i, o), values in zip(arrays.flow_keys, arrays.flows.tolist()):
         result[i] = result.get(i, UserDict())
-        result[i][o] = UserList([om.flow[i, o, t].value
-                                 for t in om.TIMESTEPS])
-
-        if isinstance(i, Storage):
-            if i.investment is None:
-                result[i][i] = UserList(
-                    [om.Storage.capacity[i, t].value
-                     for t in om.TIMESTEPS])
-            else:
-                result[i][i] = UserList(
-                    [om.InvestmentStorage.capacity[i, t].value
-                     for t in om.TIMESTEPS])
+        result[i][o] = UserList(values)
 
         if isinstance(om.flows[i, o].investment, Investment):
             setattr(result[i][o], 'invest',
                     om.InvestmentFlow.invest[i, o].value)
             investment[(i, o)] = om.InvestmentFlow.invest[i, o].value
-            if isinstance(i, Storage):
-                setattr(result[i][i], 'invest',
-                        om.InvestmentStorage.invest[i].value)
-                investment[(i, i)] = om.InvestmentStorage.invest[i].value
+
+    for n, values in zip(arrays.storages, arrays.capacities.tolist()):
+        result[n] = result.get(n, UserDict())
+        result[n][n] = UserList(values)
+        if n.investment is not None:
+            setattr(result[n][n], 'invest',
+                    om.InvestmentStorage.invest[n].value)
+            investment[(n, n)] = om.InvestmentStorage.invest[n].value
+
     # add results of dual variables for balanced buses
-    if hasattr(om, "dual"):
-        # grouped = [(b1, [(b1, 0), (b1, 1)]), (b2, [(b2, 0), (b2, 1)])]
-        grouped = groupby(sorted(om.Bus.balance.iterkeys()),
-                          lambda pair: pair[0])
-
-        for bus, timesteps in grouped:
-            result[bus] = result.get(bus, UserDict())
-            result[bus][bus] = [om.dual[om.Bus.balance[bus, t]]
-                                for _, t in timesteps]
+    for bus, values in zip(arrays.buses, arrays.duals.tolist()):
+        result[bus] = result.get(bus, UserDict())
+        result[bus][bus] = values
 
     result.investment = investment
 
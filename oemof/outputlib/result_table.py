@@ -0,0 +1,164 @@
+# -*- coding: utf-8
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+from .result_dataframe import ResultsDataFrame, _array, _result_rows
+
+
+class ResultTable:
+    r"""Holds the results of an energy system in wide format, one float64
+    column per flow, storage and bus with a common time index.
+
+    The values of every column are contiguous. The columns of the flows of a
+    node and of the balance of a bus are looked up in an index built once,
+    so :meth:`flows_of` and :meth:`bus_balance` do not unstack the long
+    format of a :class:`ResultsDataFrame
+    <oemof.outputlib.result_dataframe.ResultsDataFrame>`.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Values with one row per column of the table and one column per
+        timestep.
+    keys : list
+        `(bus_label, type, obj_label)` tuples of the rows of `values`, the
+        labels of the index of a ResultsDataFrame.
+    timeindex : pandas.DatetimeIndex
+
+    Attributes
+    ----------
+    columns : pandas.MultiIndex
+        `(source, target)` labels of the columns. Capacities of storages and
+        duals of buses are labelled `(label, label)`.
+    """
+
+    def __init__(self, values, keys, timeindex):
+        self.values = np.ascontiguousarray(values, dtype=float)
+        self.keys = list(keys)
+        self.timeindex = timeindex
+        flow_keys = [_flow_key(key) for key in self.keys]
+        self.columns = pd.MultiIndex.from_arrays(
+            [[s for s, t in flow_keys], [t for s, t in flow_keys]],
+            names=['source', 'target'])
+
+        # columns of the flows of every node and of the balance of every bus
+        self._flows = defaultdict(list)
+        self._balances = defaultdict(list)
+        for column, (key, (source, target)) in enumerate(
+                zip(self.keys, flow_keys)):
+            self._balances[key[0]].append(column)
+            if source != target:
+                self._flows[source].append(column)
+                self._flows[target].append(column)
+        for columns in self._balances.values():
+            columns.sort(key=lambda c: self.keys[c][1:])
+
+    @classmethod
+    def from_energy_system(cls, es):
+        """
+        Create a ResultTable from the results of a solved energy system.
+
+        Parameters
+        ----------
+        es : oemof.solph.EnergySystem
+        """
+        rows = [row for row in _result_rows(es) if row['val'] is not None]
+        values = np.full((len(rows), len(es.timeindex)), np.nan)
+        for target, row in zip(values, rows):
+            source = _array(row['val'])[:len(target)]
+            target[:len(source)] = source
+        return cls(values, [(row['bus_label'], row['type'], row['obj_label'])
+                            for row in rows], es.timeindex)
+
+    @classmethod
+    def from_long(cls, df):
+        """
+        Create a ResultTable from a ResultsDataFrame (long format).
+
+        Parameters
+        ----------
+        df : oemof.outputlib.ResultsDataFrame
+        """
+        index = df.index.remove_unused_levels()
+        codes = [c.astype(np.int64) for c in index.codes]
+        sizes = [len(level) for level in index.levels]
+        # one number per (bus_label, type, obj_label) key
+        combined = (codes[0] * sizes[1] + codes[1]) * sizes[2] + codes[2]
+        rows, keys = pd.factorize(combined, sort=True)
+        timeindex = index.levels[3]
+        values = np.full((len(keys), len(timeindex)), np.nan)
+        values[rows, codes[3]] = df['val'].values
+        keys, obj_labels = np.divmod(keys, sizes[2])
+        bus_labels, types = np.divmod(keys, sizes[1])
+        return cls(values, zip(index.levels[0][bus_labels],
+                               index.levels[1][types],
+                               index.levels[2][obj_labels]), timeindex)
+
+    def to_long(self):
+        """ Returns the results as ResultsDataFrame (long format)."""
+        return ResultsDataFrame(result_table=self)
+
+    @property
+    def frame(self):
+        """ The results as DataFrame with the :attr:`columns` of the table,
+        which shares the values of the table.
+        """
+        return pd.DataFrame(self.values.T, index=self.timeindex,
+                            columns=self.columns)
+
+    def flows_of(self, node):
+        r"""Returns the flows into and out of a node.
+
+        Parameters
+        ----------
+        node : Node or label of a node
+
+        Returns
+        -------
+        pandas.DataFrame
+            The flows with `(source, target)` columns.
+        """
+        columns = self._flows.get(_label(node), [])
+        return pd.DataFrame(self.values[columns].T, index=self.timeindex,
+                            columns=self.columns[columns])
+
+    def bus_balance(self, bus):
+        r"""Returns the balance around a bus with inputs, outputs and other
+        values like :meth:`ResultsDataFrame.slice_bus_balance
+        <oemof.outputlib.result_dataframe.ResultsDataFrame.slice_bus_balance>`.
+
+        Parameters
+        ----------
+        bus : Bus or label of a bus
+
+        Returns
+        -------
+        pandas.DataFrame
+            The values with `(type, obj_label)` columns, sorted like the
+            index of a ResultsDataFrame.
+        """
+        columns = self._balances.get(_label(bus), [])
+        keys = [self.keys[c] for c in columns]
+        return pd.DataFrame(
+            self.values[columns].T, index=self.timeindex,
+            columns=pd.MultiIndex.from_arrays(
+                [[k[1] for k in keys], [k[2] for k in keys]],
+                names=['type', 'obj_label']))
+
+
+def _label(node):
+    return getattr(node, 'label', node)
+
+
+def _flow_key(key):
+    """ Returns the `(source, target)` labels of the values with the labels
+    `(bus_label, type, obj_label)` of the long format.
+    """
+    bus_label, type, obj_label = key
+    if type == 'to_bus':
+        return obj_label, bus_label
+    if type == 'from_bus':
+        return bus_label, obj_label
+    if obj_label == 'duals':
+        return bus_label, bus_label
+    return obj_label, obj_label
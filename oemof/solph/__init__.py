@@ -1,12 +1,45 @@
+"""Solph's classes are imported on first access (see :func:`__getattr__`),
+so `import oemof.solph` does not load pyomo, pandas or the csv reader until
+they are used.
 """
+from importlib import import_module
+import sys
 
+from oemof.tools.helpers import _submodule
 
-"""
-from oemof.solph.network import (Sink, Source, LinearTransformer, Storage, Bus,
-                                 Flow, EnergySystem, LinearN1Transformer,
-                                 VariableFractionTransformer)
-
-from oemof.solph.models import OperationalModel
-from oemof.solph.groupings import GROUPINGS
-from oemof.solph.options import (Investment, BinaryFlow, DiscreteFlow)
-from oemof.solph.inputlib.csv_tools import NodesFromCSV
+
+# public name -> module which defines it
+_EXPORTS = {
+    'Sink': 'network', 'Source': 'network', 'LinearTransformer': 'network',
+    'Storage': 'network', 'Bus': 'network', 'Flow': 'network',
+    'EnergySystem': 'network', 'LinearN1Transformer': 'network',
+    'VariableFractionTransformer': 'network',
+    'OperationalModel': 'models',
+    'GROUPINGS': 'groupings',
+    'Investment': 'options', 'BinaryFlow': 'options',
+    'DiscreteFlow': 'options',
+    'NodesFromCSV': 'inputlib.csv_tools'}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    """ Imports the module defining `name` on the first access of
+    `oemof.solph.<name>` (PEP 562). Other names are imported as submodules,
+    e.g. `oemof.solph.blocks`.
+    """
+    if name not in _EXPORTS:
+        return _submodule(__name__, name)
+    value = getattr(import_module('.' + _EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+if sys.version_info < (3, 7):
+    # module level __getattr__ is not supported, import everything at once
+    for _name in __all__:
+        __getattr__(_name)
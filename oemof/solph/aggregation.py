@@ -0,0 +1,552 @@
+# -*- coding: utf-8 -*-
+"""Aggregation of the time series of an energy system into typical periods.
+
+The time horizon is split into periods of equal length (e.g. days). The
+periods are clustered by the time series of all flows and nodes and every
+cluster is represented by one typical period. The reduced model
+(:class:`TypicalPeriodModel`) is built on the typical periods only. Its
+variable costs are weighted with the number of periods a typical period
+represents, and the storage levels are linked across the original periods.
+Results are mapped back onto the full time index.
+
+Examples
+--------
+>>> import numpy as np
+>>> X = np.array([[0., 0.], [0., 1.], [10., 10.], [10., 11.], [0., 0.5]])
+>>> labels, representatives = _cluster(X, 2, 'kmedoids',
+...                                   np.random.RandomState(1))
+>>> labels
+array([0, 0, 1, 1, 0])
+>>> representatives
+array([4, 2])
+
+"""
+from collections import UserDict, UserList
+import numpy as np
+from pyomo.core import (Var, Set, Constraint, Expression, NonNegativeReals,
+                        NonPositiveReals)
+from pyomo.core.base.block import SimpleBlock
+from . import blocks
+from .blocks import quicksum
+from .models import OperationalModel
+from .network import Storage
+from .options import Investment
+from .plumbing import sequence_array
+from .rolling_horizon import replaced_sequences, sequences
+
+
+class TypicalPeriods:
+    """ Clusters the periods of the time series of an energy system into
+    typical periods.
+
+    Parameters
+    ----------
+    es : EnergySystem object
+        Energy system whose time index is a multiple of `period_length`.
+    n_periods : int
+        Number of typical periods.
+    period_length : int
+        Number of timesteps of one period. Defaults to 24.
+    method : str
+        'kmeans' (typical periods are the means of the clusters), 'kmedoids'
+        or 'hierarchical' (Ward's method). The typical periods of the latter
+        two are the medoids of the clusters. Defaults to 'kmeans'.
+    seed : int
+        Seed of the random initialization of 'kmeans' and 'kmedoids'.
+
+    Attributes
+    ----------
+    cluster_order : numpy.ndarray
+        The typical period of every period of the time horizon.
+    weights : numpy.ndarray
+        The number of periods represented by every typical period.
+    representatives : numpy.ndarray
+        The period used as typical period of every cluster (None for
+        'kmeans').
+
+    Note
+    ----
+    Every sequence which is no scalar is clustered. The sequences are scaled
+    to the range from 0 to 1 before clustering, so all of them have the same
+    influence.
+    """
+    def __init__(self, es, n_periods, period_length=24, method='kmeans',
+                 seed=None):
+        periods, remainder = divmod(len(es.timeindex), period_length)
+        if remainder:
+            raise ValueError("The length of the time index ({0}) is no "
+                             "multiple of the period length ({1}).".format(
+                                 len(es.timeindex), period_length))
+        if not 0 < n_periods <= periods:
+            raise ValueError("The number of typical periods has to be between "
+                             "1 and the number of periods ({0}).".format(
+                                 periods))
+        self.es = es
+        self.n_periods = n_periods
+        self.period_length = period_length
+        self.periods = periods
+        self.method = method
+
+        # one array of shape (periods, period_length) per distinct sequence
+        self._profiles = {}
+        for s in sequences(es):
+            if id(s) not in self._profiles:
+                self._profiles[id(s)] = sequence_array(
+                    s, periods * period_length).reshape(periods,
+                                                        period_length)
+        features = [_scaled(p) for p in self._profiles.values()
+                    if not np.isnan(p).any()]
+        if features:
+            X = np.hstack(features)
+        else:
+            X = np.zeros((periods, 1))
+
+        labels, self.representatives = _cluster(
+            X, n_periods, method, np.random.RandomState(seed))
+        self.cluster_order = labels
+        self.weights = np.bincount(labels, minlength=n_periods)
+
+        self._data = {}
+        for key, profile in self._profiles.items():
+            if self.representatives is None:
+                typical = np.array([profile[labels == c].mean(axis=0)
+                                    for c in range(n_periods)])
+            else:
+                typical = profile[self.representatives]
+            self._data[key] = typical.ravel()
+
+    @property
+    def timeindex(self):
+        """ The time index of the typical periods, i.e. the beginning of the
+        time index of the energy system.
+        """
+        return self.es.timeindex[:self.n_periods * self.period_length]
+
+    @property
+    def objective_weighting(self):
+        """ The weight of every timestep of the typical periods."""
+        return np.repeat(self.weights, self.period_length).astype(float)
+
+    def reduced(self):
+        """ Context manager replacing the time index and all sequences of the
+        energy system by their typical periods.
+        """
+        # the time index is read before it is replaced
+        return replaced_sequences(self.es, self.timeindex,
+                                  lambda value: self._data[id(value)])
+
+    def model(self, **kwargs):
+        """ Returns the :class:`TypicalPeriodModel` of the energy system.
+        The keyword arguments are passed to the model.
+        """
+        return TypicalPeriodModel(self.es, self, **kwargs)
+
+    def disaggregate(self, values):
+        """ Maps values of the timesteps of the typical periods onto the full
+        time index.
+
+        Parameters
+        ----------
+        values : array-like
+            One value per timestep of the typical periods.
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        values = np.asarray(values, dtype=float).reshape(
+            self.n_periods, self.period_length)
+        return values[self.cluster_order].ravel()
+
+
+class TypicalPeriodModel(OperationalModel):
+    r""" An :class:`.OperationalModel` of the typical periods of an energy
+    system (see :class:`TypicalPeriods`).
+
+    The variable costs are weighted with the number of periods represented by
+    a typical period. Storages are modelled by the
+    :class:`TypicalPeriodStorage` block, which links the storage levels
+    across all periods of the time horizon. The results (see
+    :meth:`results`) cover the full time index of the energy system.
+
+    Parameters
+    ----------
+    es : EnergySystem object
+    aggregation : TypicalPeriods object
+    \**kwargs : keyword arguments
+        See :class:`.OperationalModel`.
+    """
+    CONSTRAINT_GROUPS = [
+        group for group in OperationalModel.CONSTRAINT_GROUPS
+        if group not in (blocks.Storage, blocks.InvestmentStorage)]
+
+    def __init__(self, es, aggregation, **kwargs):
+        self.aggregation = aggregation
+        kwargs['objective_weighting'] = aggregation.objective_weighting
+        kwargs['constraint_groups'] = (
+            kwargs.get('constraint_groups', []) + [TypicalPeriodStorage])
+        with aggregation.reduced():
+            super().__init__(es, **kwargs)
+
+    def _presolve_excluded(self):
+        # flows of storages are part of the TypicalPeriodStorage constraints
+        return super()._presolve_excluded() | set(
+            n for n in self.es.nodes if isinstance(n, Storage))
+
+    def results(self):
+        """ Returns a nested dictionary of the results of the full time index
+        like :func:`oemof.outputlib.result_dict`.
+        """
+        disaggregate = self.aggregation.disaggregate
+        result = UserDict()
+        result.objective = self.objective()
+        investment = UserDict()
+        for i, o in self.flows:
+            result[i] = result.get(i, UserDict())
+            result[i][o] = UserList(
+                disaggregate(self.flow_values(i, o)).tolist())
+            if isinstance(self.flows[i, o].investment, Investment):
+                setattr(result[i][o], 'invest',
+                        self.InvestmentFlow.invest[i, o].value)
+                investment[(i, o)] = self.InvestmentFlow.invest[i, o].value
+
+        block = self.TypicalPeriodStorage
+        for n in getattr(block, 'STORAGES', []):
+            result[n] = result.get(n, UserDict())
+            result[n][n] = UserList(block.levels(n).tolist())
+            if n in block.INVESTSTORAGES:
+                setattr(result[n][n], 'invest', block.invest[n].value)
+                investment[(n, n)] = block.invest[n].value
+        result.investment = investment
+        return result
+
+
+class TypicalPeriodStorage(SimpleBlock):
+    """ Storages (with and without investment) of a
+    :class:`TypicalPeriodModel`.
+
+    The level of a storage is split into the level at the beginning of every
+    period of the time horizon (`capacity_inter`) and the change of the level
+    within the typical periods (`capacity`). The change starts at zero at the
+    beginning of every typical period. The level at the beginning of the next
+    period is the decayed level at the beginning of the period plus the
+    change at the end of its typical period. The level has to stay within its
+    bounds, which is checked with the maximum and minimum change within the
+    typical periods.
+
+    **The following sets are created:**
+
+    STORAGES
+        All storages of the energy system.
+    INVESTSTORAGES
+        Storages with an :class:`.Investment` object.
+    PERIODS
+        The beginnings of all periods and the end of the time horizon.
+
+    **The following variables are created:**
+
+    capacity
+        Change of the level within the typical periods, indexed by STORAGES
+        and TIMESTEPS.
+    capacity_inter
+        Level at the beginning of every period, indexed by STORAGES and
+        PERIODS.
+    change_max, change_min
+        Maximum and minimum change within every typical period.
+    invest
+        Nominal capacity of the investment storages.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    def _create(self, group=None):
+        """ Creates the storages of all storages of the energy system, the
+        `group` is not used.
+        """
+        m = self.parent_block()
+        group = sorted((n for n in m.es.nodes if isinstance(n, Storage)),
+                       key=str)
+        if not group:
+            return None
+
+        aggregation = m.aggregation
+        length = aggregation.period_length
+        typical_periods = range(aggregation.n_periods)
+        order = aggregation.cluster_order
+        timesteps = len(m.timesteps)
+
+        I = {n: [i for i in n.inputs][0] for n in group}
+        O = {n: [o for o in n.outputs][0] for n in group}
+
+        # decay of the level within the typical periods and the bounds of the
+        # level in every typical period
+        self._decay = {}
+        capacity_max = {}
+        capacity_min = {}
+        for n in group:
+            loss = sequence_array(n.capacity_loss, timesteps).reshape(
+                -1, length)
+            self._decay[n] = np.cumprod(1 - loss, axis=1)
+            capacity_max[n] = sequence_array(n.capacity_max, timesteps)\
+                .reshape(-1, length).min(axis=1)
+            capacity_min[n] = sequence_array(n.capacity_min, timesteps)\
+                .reshape(-1, length).max(axis=1)
+
+        self.STORAGES = Set(initialize=group, ordered=True)
+        self.INVESTSTORAGES = Set(initialize=[
+            n for n in group if isinstance(n.investment, Investment)])
+        self.PERIODS = Set(initialize=range(aggregation.periods + 1),
+                           ordered=True)
+
+        # ######################### Variables  ################################
+        self.capacity = Var(self.STORAGES, m.TIMESTEPS)
+        self.capacity_inter = Var(self.STORAGES, self.PERIODS,
+                                  within=NonNegativeReals)
+        self.change_max = Var(self.STORAGES, typical_periods,
+                              within=NonNegativeReals)
+        self.change_min = Var(self.STORAGES, typical_periods,
+                              within=NonPositiveReals)
+
+        def _invest_bound_rule(block, n):
+            return 0, n.investment.maximum
+        self.invest = Var(self.INVESTSTORAGES, within=NonNegativeReals,
+                          bounds=_invest_bound_rule)
+
+        def _nominal_capacity(n):
+            if n in self.INVESTSTORAGES:
+                return self.invest[n]
+            return n.nominal_capacity
+
+        # ######################### CONSTRAINTS ###############################
+        def _storage_balance_rule(block, n, t):
+            """Rule definition of the balance within the typical periods."""
+            expr = 0
+            expr += block.capacity[n, t]
+            if t % length:
+                expr += - block.capacity[n, t - 1] * (1 - n.capacity_loss[t])
+            expr += (- m.flow[I[n], n, t] *
+                     n.inflow_conversion_factor[t]) * m.timeincrement[t]
+            expr += (m.flow[n, O[n], t] /
+                     n.outflow_conversion_factor[t]) * m.timeincrement[t]
+            return expr == 0
+        self.balance = Constraint(self.STORAGES, m.TIMESTEPS,
+                                  rule=_storage_balance_rule)
+
+        def _change_max_rule(block, n, t):
+            return block.capacity[n, t] <= block.change_max[n, t // length]
+        self.max_change = Constraint(self.STORAGES, m.TIMESTEPS,
+                                     rule=_change_max_rule)
+
+        def _change_min_rule(block, n, t):
+            return block.capacity[n, t] >= block.change_min[n, t // length]
+        self.min_change = Constraint(self.STORAGES, m.TIMESTEPS,
+                                     rule=_change_min_rule)
+
+        def _inter_balance_rule(block, n, p):
+            """Rule definition of the balance across the periods."""
+            if p == aggregation.periods:
+                # cyclic condition
+                return (block.capacity_inter[n, p] ==
+                        block.capacity_inter[n, 0])
+            c = order[p]
+            return (block.capacity_inter[n, p + 1] ==
+                    block.capacity_inter[n, p] * self._decay[n][c, -1] +
+                    block.capacity[n, c * length + length - 1])
+        self.inter_balance = Constraint(self.STORAGES, self.PERIODS,
+                                        rule=_inter_balance_rule)
+
+        def _initial_capacity_rule(block, n):
+            return (block.capacity_inter[n, 0] ==
+                    n.initial_capacity * _nominal_capacity(n))
+        self.initial_capacity = Constraint(
+            [n for n in group if n.initial_capacity is not None],
+            rule=_initial_capacity_rule)
+
+        def _max_capacity_rule(block, n, p):
+            if p == aggregation.periods:
+                return Constraint.Skip
+            c = order[p]
+            return (block.capacity_inter[n, p] + block.change_max[n, c] <=
+                    capacity_max[n][c] * _nominal_capacity(n))
+        self.max_capacity = Constraint(self.STORAGES, self.PERIODS,
+                                       rule=_max_capacity_rule)
+
+        def _min_capacity_rule(block, n, p):
+            # the decay at the end of the period gives a conservative bound
+            if p == aggregation.periods:
+                return Constraint.Skip
+            c = order[p]
+            return (block.capacity_inter[n, p] * self._decay[n][c, -1] +
+                    block.change_min[n, c] >=
+                    capacity_min[n][c] * _nominal_capacity(n))
+        self.min_capacity = Constraint(self.STORAGES, self.PERIODS,
+                                       rule=_min_capacity_rule)
+
+        def _storage_capacity_inflow_invest_rule(block, n):
+            return (m.InvestmentFlow.invest[I[n], n] ==
+                    block.invest[n] * n.nominal_input_capacity_ratio)
+        self.storage_capacity_inflow = Constraint(
+            self.INVESTSTORAGES, rule=_storage_capacity_inflow_invest_rule)
+
+        def _storage_capacity_outflow_invest_rule(block, n):
+            return (m.InvestmentFlow.invest[n, O[n]] ==
+                    block.invest[n] * n.nominal_output_capacity_ratio)
+        self.storage_capacity_outflow = Constraint(
+            self.INVESTSTORAGES, rule=_storage_capacity_outflow_invest_rule)
+
+    def _objective_expression(self):
+        """Objective expression with fixed and investment costs.
+        """
+        if not hasattr(self, 'STORAGES'):
+            return 0
+
+        if any(n.investment.ep_costs is None for n in self.INVESTSTORAGES):
+            raise ValueError("Missing value for investment costs!")
+
+        investment_costs = quicksum(self.invest[n] * n.investment.ep_costs
+                                    for n in self.INVESTSTORAGES)
+        fixed_costs = quicksum(
+            (self.invest[n] if n in self.INVESTSTORAGES else
+             n.nominal_capacity) * n.fixed_costs
+            for n in self.STORAGES if n.fixed_costs is not None)
+        self.investment_costs = Expression(expr=investment_costs)
+        self.fixed_costs = Expression(expr=fixed_costs)
+
+        return quicksum([fixed_costs, investment_costs])
+
+    def levels(self, n):
+        """ Returns the level of storage `n` for the full time index of a
+        solved model.
+        """
+        aggregation = self.parent_block().aggregation
+        order = aggregation.cluster_order
+        inter = np.array([self.capacity_inter[n, p].value
+                          for p in range(aggregation.periods)])
+        change = np.array([self.capacity[n, t].value
+                           for t in self.parent_block().TIMESTEPS]).reshape(
+                               -1, aggregation.period_length)
+        return (inter[:, None] * self._decay[n][order] +
+                change[order]).ravel()
+
+
+def _scaled(profile):
+    """ Scales the values of a profile to the range from 0 to 1."""
+    span = profile.max() - profile.min()
+    if span == 0:
+        return np.zeros_like(profile)
+    return (profile - profile.min()) / span
+
+
+def _cluster(X, k, method, rand=None, iterations=300):
+    """ Clusters the rows of `X` into `k` clusters. Returns the label of
+    every row and the index of the representative row of every cluster (None
+    for 'kmeans'). The clusters are numbered in the order of their first
+    occurrence.
+    """
+    if rand is None:
+        rand = np.random.RandomState()
+    if method == 'kmeans':
+        labels = _kmeans(X, k, rand, iterations)
+        representatives = None
+    elif method == 'kmedoids':
+        labels, representatives = _kmedoids(X, k, rand, iterations)
+    elif method == 'hierarchical':
+        labels = _hierarchical(X, k)
+        representatives = np.array([_medoid(X, labels == c)
+                                    for c in range(k)])
+    else:
+        raise ValueError("Unknown clustering method {0!r}.".format(method))
+
+    # number the clusters by their first occurrence
+    first = np.unique(labels, return_index=True)[1]
+    renumber = np.empty(k, dtype=int)
+    renumber[labels[np.sort(first)]] = np.arange(k)
+    if representatives is not None:
+        representatives = representatives[np.argsort(renumber)]
+    return renumber[labels], representatives
+
+
+def _distances(X, Y):
+    """ Squared euclidean distances between the rows of `X` and `Y`."""
+    d = ((X ** 2).sum(axis=1)[:, None] + (Y ** 2).sum(axis=1)[None, :] -
+         2 * X.dot(Y.T))
+    return np.maximum(d, 0)
+
+
+def _initial_centers(X, k, rand):
+    """ Indices of `k` rows of `X` chosen by the k-means++ rule."""
+    centers = [rand.randint(len(X))]
+    for _ in range(1, k):
+        d = _distances(X, X[centers]).min(axis=1)
+        if d.sum() == 0:
+            centers.append(rand.choice(np.setdiff1d(np.arange(len(X)),
+                                                    centers)))
+        else:
+            centers.append(rand.choice(len(X), p=d / d.sum()))
+    return np.array(centers)
+
+
+def _kmeans(X, k, rand, iterations):
+    centers = X[_initial_centers(X, k, rand)]
+    labels = None
+    for _ in range(iterations):
+        new = _distances(X, centers).argmin(axis=1)
+        if labels is not None and (new == labels).all():
+            break
+        labels = new
+        for c in range(k):
+            if not (labels == c).any():
+                # an empty cluster takes the row farthest from its center
+                d = _distances(X, centers)[np.arange(len(X)), labels]
+                d[np.bincount(labels, minlength=k)[labels] == 1] = -1
+                labels[d.argmax()] = c
+            centers[c] = X[labels == c].mean(axis=0)
+    return labels
+
+
+def _medoid(X, members):
+    """ Index of the row of `X` among `members` (boolean mask) with the
+    smallest sum of distances to the other members.
+    """
+    index = np.flatnonzero(members)
+    return index[_distances(X[index], X[index]).sum(axis=1).argmin()]
+
+
+def _kmedoids(X, k, rand, iterations):
+    medoids = _initial_centers(X, k, rand)
+    labels = None
+    for _ in range(iterations):
+        new = _distances(X, X[medoids]).argmin(axis=1)
+        new[medoids] = np.arange(k)
+        if labels is not None and (new == labels).all():
+            break
+        labels = new
+        medoids = np.array([_medoid(X, labels == c) for c in range(k)])
+    return labels, medoids
+
+
+def _hierarchical(X, k):
+    """ Agglomerative clustering with Ward's method, using the Lance-Williams
+    update of the distances of merged clusters.
+    """
+    n = len(X)
+    d = _distances(X, X)
+    np.fill_diagonal(d, np.inf)
+    sizes = np.ones(n)
+    labels = np.arange(n)
+    active = np.ones(n, dtype=bool)
+    for _ in range(n - k):
+        i, j = np.unravel_index(d.argmin(), d.shape)
+        if i > j:
+            i, j = j, i
+        si, sj = sizes[i], sizes[j]
+        merged = ((si + sizes) * d[i] + (sj + sizes) * d[j] -
+                  sizes * d[i, j]) / (si + sj + sizes)
+        merged[~active] = np.inf
+        merged[i] = np.inf
+        d[i, :] = d[:, i] = merged
+        d[j, :] = d[:, j] = np.inf
+        active[j] = False
+        sizes[i] += sj
+        labels[labels == j] = i
+    return np.unique(labels, return_inverse=True)[1]
@@ -3,9 +3,16 @@
 for the specified groups.
 """
 
-from pyomo.core import (Var, Set, Constraint, BuildAction, Expression,
-                        NonNegativeReals, Binary, NonNegativeIntegers)
+from pyomo.core import (Var, Set, Param, Constraint, BuildAction,
+                        Expression, NonNegativeReals, Binary,
+                        NonNegativeIntegers)
 from pyomo.core.base.block import SimpleBlock
+try:
+    from pyomo.core import quicksum
+except ImportError:  # pyomo < 5
+    quicksum = sum
+import numpy as np
+from .plumbing import is_none, sequence_array
 
 
 class Storage(SimpleBlock):
@@ -24,6 +31,10 @@ class Storage(SimpleBlock):
         Capacity (level) for every storage and timestep. The value for the
         capacity at the beginning is set by the parameter `initial_capacity` or
         not set if `initial_capacity` is None.
+        If the model is not periodic (see :class:`.OperationalModel`), the
+        capacity of the last timestep is free and the balance of the first
+        timestep refers to the `initial_capacity` (an empty storage if it is
+        None).
         The variable of storage s and timestep t can be accessed by:
         `om.Storage.capacity[s, t]`
 
@@ -76,7 +87,7 @@ class Storage(SimpleBlock):
 
         # set the initial capacity of the storage
         for n in group:
-            if n.initial_capacity is not None:
+            if n.initial_capacity is not None and m.periodic:
                 self.capacity[n, m.timesteps[-1]] = (n.initial_capacity *
                                                      n.nominal_capacity)
                 self.capacity[n, m.timesteps[-1]].fix()
@@ -86,10 +97,15 @@ class Storage(SimpleBlock):
             """Rule definition for the storage balance of every storage n and
             timestep t
             """
+            if t == m.timesteps[0] and not m.periodic:
+                # the capacity before the first timestep is a parameter
+                previous_capacity = (n.initial_capacity or 0) * (
+                    n.nominal_capacity)
+            else:
+                previous_capacity = block.capacity[n, m.previous_timesteps[t]]
             expr = 0
             expr += block.capacity[n, t]
-            expr += - block.capacity[n, m.previous_timesteps[t]] * (
-                1 - n.capacity_loss[t])
+            expr += - previous_capacity * (1 - n.capacity_loss[t])
             expr += (- m.flow[I[n], n, t] *
                      n.inflow_conversion_factor[t]) * m.timeincrement[t]
             expr += (m.flow[n, O[n], t] /
@@ -106,11 +122,9 @@ class Storage(SimpleBlock):
         if not hasattr(self, 'STORAGES'):
             return 0
 
-        fixed_costs = 0
-
-        for n in self.STORAGES:
-            if n.fixed_costs is not None:
-                fixed_costs += n.nominal_capacity * n.fixed_costs
+        fixed_costs = quicksum(n.nominal_capacity * n.fixed_costs
+                               for n in self.STORAGES
+                               if n.fixed_costs is not None)
 
         self.fixed_costs = Expression(expr=fixed_costs)
 
@@ -309,21 +323,18 @@ class InvestmentStorage(SimpleBlock):
         if not hasattr(self, 'INVESTSTORAGES'):
             return 0
 
-        investment_costs = 0
-        fixed_costs = 0
-
-        for n in self.INVESTSTORAGES:
-            if n.investment.ep_costs is not None:
-                investment_costs += self.invest[n] * n.investment.ep_costs
-            else:
-                raise ValueError("Missing value for investment costs!")
+        if any(n.investment.ep_costs is None for n in self.INVESTSTORAGES):
+            raise ValueError("Missing value for investment costs!")
 
-            if n.fixed_costs is not None:
-                fixed_costs += self.invest[n] * n.fixed_costs
+        investment_costs = quicksum(self.invest[n] * n.investment.ep_costs
+                                    for n in self.INVESTSTORAGES)
+        fixed_costs = quicksum(self.invest[n] * n.fixed_costs
+                               for n in self.INVESTSTORAGES
+                               if n.fixed_costs is not None)
         self.investment_costs = Expression(expr=investment_costs)
         self.fixed_costs = Expression(expr=fixed_costs)
 
-        return fixed_costs + investment_costs
+        return quicksum([fixed_costs, investment_costs])
 
 
 class Flow(SimpleBlock):
@@ -382,6 +393,11 @@ class Flow(SimpleBlock):
     The expression can be accessed by :attr:`om.Flow.fixed_costs` and
     their value after optimization by :meth:`om.Flow.fixed_costs()` .
     This works similar for variable costs with :attr:`*.variable_costs`.
+
+    The cost coefficients of the flow variables (variable costs multiplied
+    by the time increment and the objective weighting) are the mutable
+    parameters :attr:`om.Flow.variable_cost_coefficient[i, o, t]`, so
+    changed variable costs are updated in the existing objective.
     """
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -413,20 +429,20 @@ class Flow(SimpleBlock):
 
         self.NEGATIVE_GRADIENT_FLOWS = Set(
             initialize=[(g[0], g[1]) for g in group
-                        if g[2].negative_gradient[0] is not None])
+                        if not is_none(g[2].negative_gradient[0])])
 
         self.POSITIVE_GRADIENT_FLOWS = Set(
             initialize=[(g[0], g[1]) for g in group
-                        if g[2].positive_gradient[0] is not None])
+                        if not is_none(g[2].positive_gradient[0])])
 
         # ######################### Variables  ################################
         # set upper bound of gradient variable
         for i, o, f in group:
-            if m.flows[i, o].positive_gradient[0] is not None:
+            if not is_none(m.flows[i, o].positive_gradient[0]):
                 for t in m.TIMESTEPS:
                     m.positive_flow_gradient[i, o, t].setub(
                         f.positive_gradient[t] * f.nominal_value)
-            if m.flows[i, o].negative_gradient[0] is not None:
+            if not is_none(m.flows[i, o].negative_gradient[0]):
                 for t in m.TIMESTEPS:
                     m.negative_flow_gradient[i, o, t].setub(
                         f.negative_gradient[t] * f.nominal_value)
@@ -437,8 +453,8 @@ class Flow(SimpleBlock):
             """Rule definition for build action of max. sum flow constraint.
             """
             for inp, out in self.SUMMED_MAX_FLOWS:
-                lhs = sum(m.flow[inp, out, ts] * m.timeincrement[ts]
-                          for ts in m.TIMESTEPS)
+                lhs = sum(m.flow[inp, out, ts] * m.timeincrement[ts] *
+                          m.objective_weighting[ts] for ts in m.TIMESTEPS)
                 rhs = (m.flows[inp, out].summed_max *
                        m.flows[inp, out].nominal_value)
                 self.summed_max.add((inp, out), lhs <= rhs)
@@ -449,8 +465,8 @@ class Flow(SimpleBlock):
             """Rule definition for build action of min. sum flow constraint.
             """
             for inp, out in self.SUMMED_MIN_FLOWS:
-                lhs = sum(m.flow[inp, out, ts] * m.timeincrement[ts]
-                          for ts in m.TIMESTEPS)
+                lhs = sum(m.flow[inp, out, ts] * m.timeincrement[ts] *
+                          m.objective_weighting[ts] for ts in m.TIMESTEPS)
                 rhs = (m.flows[inp, out].summed_min *
                        m.flows[inp, out].nominal_value)
                 self.summed_min.add((inp, out), lhs >= rhs)
@@ -497,26 +513,78 @@ class Flow(SimpleBlock):
         """
         m = self.parent_block()
 
-        variable_costs = 0
+        # the cost coefficients of every flow are computed as one array and
+        # all terms are summed in a single pass
+        coefficients = {}
+        presolved_costs = {}
         fixed_costs = 0
 
         for i, o in m.FLOWS:
-            for t in m.TIMESTEPS:
-                # add variable costs
-                if m.flows[i, o].variable_costs[0] is not None:
-                    variable_costs += (m.flow[i, o, t] * m.timeincrement[t] *
-                                       m.flows[i, o].variable_costs[t])
+            # add variable costs
+            if not is_none(m.flows[i, o].variable_costs[0]):
+                timesteps, values, presolved_costs[i, o] = (
+                    self._cost_coefficients(i, o))
+                coefficients.update(((i, o, t), c) for t, c in
+                                    zip(timesteps, values))
             # add fixed costs if nominal_value is not None
             if (m.flows[i, o].fixed_costs and
                     m.flows[i, o].nominal_value is not None):
                 fixed_costs += (m.flows[i, o].nominal_value *
                                 m.flows[i, o].fixed_costs)
 
+        self.VARIABLE_COST_FLOWS = Set(initialize=list(presolved_costs),
+                                       ordered=True, dimen=2)
+        self.VARIABLE_COST_TIMESTEPS = Set(initialize=list(coefficients),
+                                           ordered=True, dimen=3)
+        self.variable_cost_coefficient = Param(
+            self.VARIABLE_COST_TIMESTEPS, mutable=True,
+            initialize=coefficients)
+        # costs of presolved flows are summed to one constant per flow
+        self.presolved_costs = Param(self.VARIABLE_COST_FLOWS, mutable=True,
+                                     initialize=presolved_costs)
+        terms = [self.presolved_costs[i, o] for i, o in presolved_costs
+                 if (i, o) in m.presolved_flows]
+        terms.extend(m.flow[i, o, t] * self.variable_cost_coefficient[i, o, t]
+                     for i, o, t in coefficients)
+        variable_costs = quicksum(terms)
+
         # add the costs expression to the block
         self.fixed_costs = Expression(expr=fixed_costs)
         self.variable_costs = Expression(expr=variable_costs)
 
-        return fixed_costs + variable_costs
+        return quicksum([fixed_costs, variable_costs])
+
+    def _cost_coefficients(self, i, o):
+        """ Returns the timesteps in which the flow from `i` to `o` is a
+        variable, the cost coefficients of the flow in these timesteps and
+        the costs of the presolved timesteps.
+        """
+        m = self.parent_block()
+        length = len(m.timesteps)
+        costs = np.zeros(length)
+        if not is_none(m.flows[i, o].variable_costs[0]):
+            costs = (sequence_array(m.flows[i, o].variable_costs, length) *
+                     sequence_array(m.timeincrement, length) *
+                     sequence_array(m.objective_weighting, length))
+        timesteps = m._flow_timesteps(i, o)
+        presolved = m.presolved_flows.get((i, o))
+        constant = 0.0
+        if presolved is not None:
+            constant = np.nansum(presolved * costs).item()
+        return timesteps, costs[timesteps].tolist(), constant
+
+    def _update_costs(self, i, o):
+        """ Updates the cost coefficients of the flow from `i` to `o` to its
+        current variable costs. Returns False if the flow has no cost
+        coefficients in the objective.
+        """
+        if (i, o) not in self.VARIABLE_COST_FLOWS:
+            return False
+        timesteps, values, constant = self._cost_coefficients(i, o)
+        for t, c in zip(timesteps, values):
+            self.variable_cost_coefficient[i, o, t] = c
+        self.presolved_costs[i, o] = constant
+        return True
 
 
 class InvestmentFlow(SimpleBlock):
@@ -666,6 +734,10 @@ class InvestmentFlow(SimpleBlock):
         self.max = Constraint(self.FLOWS, m.TIMESTEPS,
                               rule=_max_investflow_rule)
 
+        # rules needed to update the constraints of a flow, see _update_flow
+        self._fixed_rule = _investflow_fixed_rule
+        self._max_rule = _max_investflow_rule
+
         def _min_investflow_rule(block, i, o, t):
             """Rule definition of constraint setting a lower bound on flow
             variable in investment case.
@@ -680,8 +752,8 @@ class InvestmentFlow(SimpleBlock):
             """Rule definition for build action of max. sum flow constraint
             in investment case.
             """
-            expr = (sum(m.flow[i, o, t] * m.timeincrement[t]
-                        for t in m.TIMESTEPS) <=
+            expr = (sum(m.flow[i, o, t] * m.timeincrement[t] *
+                        m.objective_weighting[t] for t in m.TIMESTEPS) <=
                     m.flows[i, o].summed_max * self.invest[i, o])
             return expr
         self.summed_max = Constraint(self.SUMMED_MAX_FLOWS,
@@ -691,13 +763,26 @@ class InvestmentFlow(SimpleBlock):
             """Rule definition for build action of min. sum flow constraint
             in investment case.
             """
-            expr = (sum(m.flow[i, o, t] * m.timeincrement[t]
-                        for t in m.TIMESTEPS) >=
+            expr = (sum(m.flow[i, o, t] * m.timeincrement[t] *
+                        m.objective_weighting[t] for t in m.TIMESTEPS) >=
                     m.flows[i, o].summed_min * self.invest[i, o])
             return expr
         self.summed_min = Constraint(self.SUMMED_MIN_FLOWS,
                                      rule=_summed_min_investflow_rule)
 
+    def _update_flow(self, i, o):
+        """ Updates the fixed and max constraints of the flow from `i` to `o`
+        with its current attributes `actual_value` and `max`.
+        """
+        if not hasattr(self, 'FLOWS') or (i, o) not in self.FLOWS:
+            return None
+
+        m = self.parent_block()
+        for t in m.TIMESTEPS:
+            if (i, o) in self.FIXED_FLOWS:
+                self.fixed[i, o, t].set_value(self._fixed_rule(self, i, o, t))
+            self.max[i, o, t].set_value(self._max_rule(self, i, o, t))
+
     def _objective_expression(self):
         """ Objective expression for flows with investment attribute of type
         class:`.Investment`. The returned costs are fixed, variable and
@@ -707,27 +792,23 @@ class InvestmentFlow(SimpleBlock):
             return 0
 
         m = self.parent_block()
-        fixed_costs = 0
-        variable_costs = 0
-        investment_costs = 0
+        if any(m.flows[i, o].investment.ep_costs is None
+               for i, o in self.FLOWS):
+            raise ValueError("Missing value for investment costs!")
 
-        for i, o in self.FLOWS:
-            # fixed costs
-            if m.flows[i, o].fixed_costs is not None:
-                fixed_costs += (self.invest[i, o] *
-                                m.flows[i, o].fixed_costs)
-            # investment costs
-            if m.flows[i, o].investment.ep_costs is not None:
-                investment_costs += (self.invest[i, o] *
-                                     m.flows[i, o].investment.ep_costs)
-            else:
-                raise ValueError("Missing value for investment costs!")
+        fixed_costs = quicksum(self.invest[i, o] * m.flows[i, o].fixed_costs
+                               for i, o in self.FLOWS
+                               if m.flows[i, o].fixed_costs is not None)
+        variable_costs = 0
+        investment_costs = quicksum(
+            self.invest[i, o] * m.flows[i, o].investment.ep_costs
+            for i, o in self.FLOWS)
 
         self.investment_costs = Expression(expr=investment_costs)
         self.fixed_costs = Expression(expr=fixed_costs)
         self.variable_costs = Expression(expr=variable_costs)
 
-        return fixed_costs + variable_costs + investment_costs
+        return quicksum([fixed_costs, variable_costs, investment_costs])
 
 
 class Bus(SimpleBlock):
@@ -769,13 +850,16 @@ class Bus(SimpleBlock):
         def _busbalance_rule(block):
             for t in m.TIMESTEPS:
                 for n in group:
-                    lhs = sum(m.flow[i, n, t] * m.timeincrement[t]
+                    lhs = sum(m.flow_expression(i, n, t) * m.timeincrement[t]
                               for i in I[n])
-                    rhs = sum(m.flow[n, o, t] * m.timeincrement[t]
+                    rhs = sum(m.flow_expression(n, o, t) * m.timeincrement[t]
                               for o in O[n])
                     expr = (lhs == rhs)
-                    # no inflows no outflows yield: 0 == 0 which is True
-                    if expr is not True:
+                    # no inflows no outflows yield: 0 == 0 which is True,
+                    # presolved flows may yield constants on both sides
+                    if isinstance(expr, (bool, np.bool_)):
+                        _check_presolved(lhs, rhs, n, t)
+                    else:
                         block.balance.add((n, t), expr)
         self.balance = Constraint(group, noruleinit=True)
         self.balance_build = BuildAction(rule=_busbalance_rule)
@@ -834,14 +918,18 @@ class LinearTransformer(SimpleBlock):
                 for n in group:
                     for o in O[n]:
                         try:
-                            lhs = m.flow[I[n], n, t] * \
+                            lhs = m.flow_expression(I[n], n, t) * \
                                   n.conversion_factors[o][t]
-                            rhs = m.flow[n, o, t]
+                            rhs = m.flow_expression(n, o, t)
                         except:
                             raise ValueError("Error in constraint creation",
                                              "source: {0}, target: {1}".format(
                                                  n.label, o.label))
-                        block.relation.add((n, o, t), (lhs == rhs))
+                        expr = (lhs == rhs)
+                        if isinstance(expr, (bool, np.bool_)):
+                            _check_presolved(lhs, rhs, n, t)
+                        else:
+                            block.relation.add((n, o, t), expr)
         self.relation_build = BuildAction(rule=_input_output_relation)
 
 
@@ -1148,6 +1236,8 @@ class BinaryFlow(SimpleBlock):
             return expr
         self.max = Constraint(self.MIN_FLOWS, m.TIMESTEPS,
                               rule=_maximum_flow_rule)
+        # rule needed to update the constraints of a flow, see _update_flow
+        self._max_rule = _maximum_flow_rule
 
         def _startup_rule(block, i, o, t):
             """Rule definition for startup constraint of binary flows.
@@ -1179,6 +1269,17 @@ class BinaryFlow(SimpleBlock):
         # TODO: Add gradient constraints for binary block / flows
         # TODO: Add  min-up/min-downtime constraints
 
+    def _update_flow(self, i, o):
+        """ Updates the max constraint of the flow from `i` to `o` with its
+        current attribute `max`.
+        """
+        if not hasattr(self, 'MIN_FLOWS') or (i, o) not in self.MIN_FLOWS:
+            return None
+
+        m = self.parent_block()
+        for t in m.TIMESTEPS:
+            self.max[i, o, t].set_value(self._max_rule(self, i, o, t))
+
     def _objective_expression(self):
         """Objective expression for binary flows.
         """
@@ -1191,20 +1292,22 @@ class BinaryFlow(SimpleBlock):
         shutdowncosts = 0
 
         if self.STARTUPFLOWS:
-            startcosts += sum(self.startup[i, o, t] *
-                              m.flows[i, o].binary.startup_costs
-                              for i, o in self.STARTUPFLOWS
-                              for t in m.TIMESTEPS)
+            startcosts = quicksum(self.startup[i, o, t] *
+                                  m.flows[i, o].binary.startup_costs *
+                                  m.objective_weighting[t]
+                                  for i, o in self.STARTUPFLOWS
+                                  for t in m.TIMESTEPS)
             self.startcosts = Expression(expr=startcosts)
 
         if self.SHUTDOWNFLOWS:
-            shutdowncosts += sum(self.shutdown[i, o, t] *
-                                 m.flows[i, o].binary.shutdown_costs
-                                 for i, o in self.SHUTDOWNFLOWS
-                                 for t in m.TIMESTEPS)
+            shutdowncosts = quicksum(self.shutdown[i, o, t] *
+                                     m.flows[i, o].binary.shutdown_costs *
+                                     m.objective_weighting[t]
+                                     for i, o in self.SHUTDOWNFLOWS
+                                     for t in m.TIMESTEPS)
             self.shudowcosts = Expression(expr=shutdowncosts)
 
-        return startcosts + shutdowncosts
+        return quicksum([startcosts, shutdowncosts])
 
 
 class DiscreteFlow(SimpleBlock):
@@ -1248,3 +1351,13 @@ class DiscreteFlow(SimpleBlock):
             return expr
         self.integer_flow = Constraint(self.DISCRETE_FLOWS, m.TIMESTEPS,
                                        rule=_discrete_flow_rule)
+
+
+def _check_presolved(lhs, rhs, n, t):
+    """ Raises a ValueError if the constant sides of a constraint of node `n`
+    in timestep `t`, which only contains presolved flows, differ.
+    """
+    if not np.isclose(lhs, rhs):
+        raise ValueError(
+            "The presolved flows of {0} violate its constraint in timestep "
+            "{1}: {2} != {3}".format(n, t, lhs, rhs))
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""Synthetic energy systems of arbitrary size for scaling tests and benchmarks.
+
+:func:`generate_energy_system` creates an energy system with a given number
+of buses, linear transformers and storages and a given number of timesteps.
+Every bus has a demand with a fixed profile, a renewable source limited by a
+profile and a costly shortage source, which keeps every generated model
+feasible. Transformers connect random pairs of buses, storages are spread
+over the buses. Shares of the transformers and storages can be given
+investment options (:class:`.Investment`), further transformers binary flows
+(:class:`.BinaryFlow`).
+
+The system has `3 * buses + 2 * transformers + 2 * storages` flows. All random
+numbers are drawn from one seeded :class:`numpy.random.RandomState` in a fixed
+order, so the same arguments always result in the same system.
+
+The profiles are taken from a pool of `profiles` arrays per kind (see
+:func:`profile_pool`), which are shared by the flows without copying. The
+memory of the profiles therefore does not grow with the number of buses.
+:func:`generate_nodes` yields the nodes one by one without adding them to an
+energy system, so very large systems can be built in a stream, e.g. added in
+batches with :meth:`EnergySystem.add_many
+<oemof.energy_system.EnergySystem.add_many>`.
+
+Examples
+--------
+>>> es = generate_energy_system(buses=4, transformers=6, storages=2,
+...                             timesteps=24)
+>>> len(es.entities), len(es.flows())
+(24, 28)
+>>> again = generate_energy_system(buses=4, transformers=6, storages=2,
+...                                timesteps=24)
+>>> [n.label for n in again.entities] == [n.label for n in es.entities]
+True
+
+"""
+import numpy as np
+import pandas as pd
+from oemof.network import Node
+from .network import (Bus, EnergySystem, Flow, LinearTransformer, Sink,
+                      Source, Storage)
+from .options import BinaryFlow, Investment
+
+
+def profile_pool(number, timesteps, kind='demand', rand=None):
+    r"""Returns `number` random profiles of `timesteps` hourly values between
+    0 and 1 as rows of an array.
+
+    Parameters
+    ----------
+    kind : str
+        'demand' for profiles with a daily and weekly cycle plus noise,
+        'renewable' for smooth random walks.
+    rand : numpy.random.RandomState
+        The random number generator, a new one with seed 1 if not given.
+    """
+    if rand is None:
+        rand = np.random.RandomState(1)
+    hours = np.arange(timesteps)
+    if kind == 'demand':
+        phase = rand.uniform(0, 2 * np.pi, size=(number, 1))
+        daily = np.sin(2 * np.pi * hours / 24 - phase)
+        weekly = np.where(hours // 24 % 7 < 5, 0.1, -0.1)
+        noise = rand.normal(0, 0.05, size=(number, timesteps))
+        profiles = 0.6 + 0.25 * daily + weekly + noise
+    elif kind == 'renewable':
+        steps = rand.normal(0, 0.08, size=(number, timesteps))
+        walk = np.cumsum(steps, axis=1) + rand.uniform(size=(number, 1))
+        # reflect the walk into [0, 1]
+        profiles = 1 - np.abs(walk % 2 - 1)
+    else:
+        raise ValueError("Unknown kind of profiles {0!r}.".format(kind))
+    return np.clip(profiles, 0, 1)
+
+
+def generate_nodes(buses=10, transformers=10, storages=5, timesteps=24,
+                   investment=0, binary=0, profiles=100, seed=1):
+    r"""Yields the nodes of a synthetic energy system, the buses first.
+
+    Unlike other nodes, the nodes are not added to the :attr:`registry
+    <oemof.network.Node.registry>`.
+
+    Parameters
+    ----------
+    buses, transformers, storages : int
+        Number of buses, linear transformers and storages.
+    timesteps : int
+        Length of the profiles.
+    investment : float
+        Share of the transformers and storages whose capacity is optimized
+        (:class:`.Investment`).
+    binary : float
+        Share of the transformers with binary output flows
+        (:class:`.BinaryFlow`). Transformers with investment options have no
+        binary flows.
+    profiles : int
+        Number of distinct demand and renewable profiles.
+    seed : int
+        Seed of the random numbers.
+    """
+    if buses < 1:
+        raise ValueError("An energy system needs at least one bus.")
+    if investment + binary > 1:
+        raise ValueError("The shares of investment and binary flows must not "
+                         "exceed 1.")
+    rand = np.random.RandomState(seed)
+    profiles = max(1, min(profiles, buses))
+    demands = profile_pool(profiles, timesteps, 'demand', rand)
+    renewables = profile_pool(profiles, timesteps, 'renewable', rand)
+
+    # parameters of all nodes, drawn at once
+    demand_values = rand.uniform(10, 100, size=buses)
+    renewable_values = rand.uniform(0, 80, size=buses)
+    renewable_costs = rand.uniform(0, 1, size=buses)
+    inputs = rand.randint(buses, size=transformers)
+    # the output bus differs from the input bus if there are several buses
+    outputs = (inputs + 1 + rand.randint(max(buses - 1, 1),
+                                         size=transformers)) % buses
+    efficiencies = rand.uniform(0.3, 0.6, size=transformers)
+    capacities = rand.uniform(20, 200, size=transformers)
+    costs = rand.uniform(5, 50, size=transformers)
+    options = rand.uniform(size=transformers)
+    storage_buses = rand.randint(buses, size=storages)
+    storage_capacities = rand.uniform(50, 500, size=storages)
+    storage_options = rand.uniform(size=storages)
+
+    nodes = [_unregistered(Bus, label='bus_{0}'.format(i))
+             for i in range(buses)]
+    yield from nodes
+    for i, bus in enumerate(nodes):
+        yield _unregistered(Sink, label='demand_{0}'.format(i), inputs={
+            bus: Flow(actual_value=demands[i % profiles],
+                      nominal_value=demand_values[i], fixed=True)})
+        yield _unregistered(Source, label='renewable_{0}'.format(i), outputs={
+            bus: Flow(max=renewables[i % profiles],
+                      nominal_value=renewable_values[i],
+                      variable_costs=renewable_costs[i])})
+        yield _unregistered(Source, label='shortage_{0}'.format(i),
+                            outputs={bus: Flow(variable_costs=1000)})
+    for j in range(transformers):
+        b_in, b_out = nodes[inputs[j]], nodes[outputs[j]]
+        if options[j] < investment:
+            output = Flow(variable_costs=costs[j],
+                          investment=Investment(ep_costs=capacities[j]))
+        elif options[j] < investment + binary:
+            output = Flow(nominal_value=capacities[j], min=0.2,
+                          variable_costs=costs[j], binary=BinaryFlow())
+        else:
+            output = Flow(nominal_value=capacities[j],
+                          variable_costs=costs[j])
+        yield _unregistered(LinearTransformer,
+                            label='transformer_{0}'.format(j),
+                            inputs={b_in: Flow()}, outputs={b_out: output},
+                            conversion_factors={b_out: efficiencies[j]})
+    for k in range(storages):
+        bus = nodes[storage_buses[k]]
+        if storage_options[k] < investment:
+            parameters = {'investment': Investment(
+                ep_costs=storage_capacities[k] / 10)}
+        else:
+            parameters = {'nominal_capacity': storage_capacities[k]}
+        yield _unregistered(Storage, label='storage_{0}'.format(k),
+                            inputs={bus: Flow(variable_costs=1)},
+                            outputs={bus: Flow()},
+                            capacity_loss=0.01,
+                            nominal_input_capacity_ratio=1/6,
+                            nominal_output_capacity_ratio=1/6,
+                            inflow_conversion_factor=0.95,
+                            outflow_conversion_factor=0.95,
+                            **parameters)
+
+
+def generate_energy_system(buses=10, transformers=10, storages=5,
+                           timesteps=24, investment=0, binary=0,
+                           profiles=100, seed=1, start='1/1/2012', freq='H'):
+    r"""Creates a synthetic energy system of the nodes of
+    :func:`generate_nodes` (see there for the parameters) with an hourly
+    time index of `timesteps` starting at `start`.
+
+    Returns
+    -------
+    :class:`oemof.solph.network.EnergySystem`
+    """
+    es = EnergySystem(timeindex=pd.date_range(start, periods=timesteps,
+                                              freq=freq))
+    es.add_many(generate_nodes(buses=buses, transformers=transformers,
+                               storages=storages, timesteps=timesteps,
+                               investment=investment, binary=binary,
+                               profiles=profiles, seed=seed))
+    return es
+
+
+def _unregistered(cls, **kwargs):
+    """ Creates a node of `cls` which is not added to the registry."""
+    registry, Node.registry = Node.registry, None
+    try:
+        return cls(**kwargs)
+    finally:
+        Node.registry = registry
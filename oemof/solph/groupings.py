@@ -17,6 +17,7 @@ groupings specified like this:
 
 """
 
+from itertools import chain
 from .network import (Bus, LinearTransformer, Storage, LinearN1Transformer,
                       VariableFractionTransformer)
 from .options import Investment
@@ -24,34 +25,117 @@ from . import blocks
 import oemof.groupings as groupings
 
 
+# node class -> block class or function returning the block class of a node
+CONSTRAINT_GROUPS = {}
+
+# resolved entries of CONSTRAINT_GROUPS per concrete node class
+_resolved_constraint_groups = {}
+
+
+def register_constraint_group(node_class, group):
+    """ Declares the constraint block of the nodes of `node_class` and its
+    subclasses, which do not declare a block themselves.
+
+    Parameters
+    ----------
+    node_class : type
+    group : block class, function or None
+        The block whose constraints are created for the nodes, a function
+        returning the block of a given node (e.g. depending on its attributes)
+        or None if the nodes need no constraint block.
+
+    Examples
+    --------
+    >>> class MyTransformer(LinearTransformer):
+    ...     pass
+    >>> register_constraint_group(MyTransformer, blocks.LinearN1Transformer)
+    >>> constraint_grouping(MyTransformer()) is blocks.LinearN1Transformer
+    True
+    >>> del CONSTRAINT_GROUPS[MyTransformer]
+    """
+    CONSTRAINT_GROUPS[node_class] = group
+    _resolved_constraint_groups.clear()
+
+
 def constraint_grouping(node):
     """Grouping function for constraints.
 
     This function can be passed in a list to :attr:`groupings` of
-    :class:`oemof.solph.network.EnergySystem`.
+    :class:`oemof.solph.network.EnergySystem`. It returns the block declared
+    for the class of the node, or the closest base class of it, via
+    :func:`register_constraint_group`. The declaration is looked up once per
+    node class.
+    """
+    node_class = type(node)
+    try:
+        group = _resolved_constraint_groups[node_class]
+    except KeyError:
+        group = next((CONSTRAINT_GROUPS[c] for c in node_class.__mro__
+                      if c in CONSTRAINT_GROUPS), None)
+        _resolved_constraint_groups[node_class] = group
+    if group is None or isinstance(group, type):
+        return group
+    return group(node)
+
+
+register_constraint_group(
+    Bus, lambda n: blocks.Bus if n.balanced else None)
+register_constraint_group(
+    VariableFractionTransformer, blocks.VariableFractionTransformer)
+register_constraint_group(LinearTransformer, blocks.LinearTransformer)
+register_constraint_group(LinearN1Transformer, blocks.LinearN1Transformer)
+register_constraint_group(
+    Storage, lambda n: (blocks.InvestmentStorage
+                        if isinstance(n.investment, Investment)
+                        else blocks.Storage))
+
+
+class FlowGrouping(groupings.Grouping):
+    """ Groups the flows of every node into sets of `(source, target, flow)`
+    tuples stored under the keys of all flow groups a flow belongs to.
+
+    Unlike one :class:`FlowsWithNodes <oemof.groupings.FlowsWithNodes>`
+    grouping per key, the flows of a node are traversed once for all keys.
+
+    Parameters
+    ----------
+    flow_groups : list
+        `(key, filter)` tuples. A flow is stored under `key` if `filter` is
+        None or `filter(flow)` is true. The list may be extended later on
+        (see :func:`register_flow_group`).
     """
-    # TODO: Refactor this for looser coupling between modules.
-    # This code causes an unwanted tight coupling between the `groupings` and
-    # `network` modules, resulting in having to do an import at runtime in the
-    # init method of solph's `EnergySystem`. A better way would be to add a
-    # method (maybe `constraints`, `constraint_group`, `constraint_type` or
-    # something like that) to solph's node hirarchy, which gets overriden in
-    # each subclass to return the appropriate value. Then we can just call the
-    # method here.
-    # This even gives other users/us the ability to customize/extend how
-    # constraints are grouped by overriding the method in future subclasses.
-    if isinstance(node, Bus) and node.balanced:
-        return blocks.Bus
-    if isinstance(node, VariableFractionTransformer):
-        return blocks.VariableFractionTransformer
-    if isinstance(node, LinearTransformer):
-        return blocks.LinearTransformer
-    if isinstance(node, LinearN1Transformer):
-        return blocks.LinearN1Transformer
-    if isinstance(node, Storage) and isinstance(node.investment, Investment):
-        return blocks.InvestmentStorage
-    if isinstance(node, Storage):
-        return blocks.Storage
+    def __init__(self, flow_groups):
+        self.flow_groups = flow_groups
+
+    def __call__(self, n, d):
+        for stf in chain(((n, t, f) for (t, f) in n.outputs.items()),
+                         ((s, n, f) for (s, f) in n.inputs.items())):
+            for key, filter in self.flow_groups:
+                if filter is None or filter(stf[2]):
+                    group = d.get(key)
+                    if group is None:
+                        d[key] = {stf}
+                    else:
+                        group.add(stf)
+
+
+# (block class, filter) tuples of the flow groups
+FLOW_GROUPS = [
+    (blocks.InvestmentFlow, lambda f: f.investment is not None),
+    (blocks.Flow, None),
+    (blocks.BinaryFlow, lambda f: f.binary is not None),
+    (blocks.DiscreteFlow, lambda f: f.discrete is not None)]
+
+
+def register_flow_group(block, filter=None):
+    """ Declares a block whose constraints are created for all flows for
+    which `filter(flow)` is true (or all flows if `filter` is None). The block
+    gets the set of `(source, target, flow)` tuples of these flows as group.
+    """
+    FLOW_GROUPS.append((block, filter))
+
+
+flow_grouping = FlowGrouping(FLOW_GROUPS)
 
 
 investment_flow_grouping = groupings.FlowsWithNodes(
@@ -71,6 +155,4 @@ discrete_flow_grouping = groupings.FlowsWithNodes(
     filter=lambda stf: stf[2].discrete is not None)
 
 
-GROUPINGS = [constraint_grouping, investment_flow_grouping,
-             standard_flow_grouping, binary_flow_grouping,
-             discrete_flow_grouping]
+GROUPINGS = [constraint_grouping, flow_grouping]
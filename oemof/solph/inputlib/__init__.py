@@ -1,2 +1,8 @@
 # -*- coding: utf-8 -*-
+from oemof.tools.helpers import _submodule
 
+
+def __getattr__(name):
+    # the modules are imported on first access, e.g. of
+    # `oemof.solph.inputlib.csv_tools` after `import oemof.solph`
+    return _submodule(__name__, name)
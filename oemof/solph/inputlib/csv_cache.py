@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""On-disk cache of parsed csv input files.
+
+Parsing the csv files of a scenario (see :func:`.csv_tools.NodesFromCSV` and
+:func:`.csv_tools.merge_csv_files`) takes much longer than reading the parsed
+tables and arrays from a binary file. A :class:`ParsedCache` stores the result
+of parsing a file as pickle (numpy arrays and dataframes are written as
+binary blocks) and serves it again as long as the file is unchanged.
+
+A file is unchanged if its size and modification time are the same as when
+it was parsed. Otherwise the hash of its content is compared, so touched but
+unchanged files are still served from the cache. The least recently used
+entries are evicted if the entries exceed the size limit. Several threads
+and processes can use the same cache, the index of the entries is locked
+while it is updated.
+
+The location and the size limit of the default cache can be set in the
+`csv_cache` section of the oemof config file (see :mod:`oemof.tools.config`):
+
+.. code-block:: ini
+
+    [csv_cache]
+    path = /path/to/the/cache
+    max_size = 1024
+
+The size limit is given in MB. The default location is `~/.oemof/cache`.
+"""
+from contextlib import contextmanager
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from oemof.tools import config, helpers
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# size limit of the default cache in MB if not set in the config file
+MAX_SIZE = 1024
+
+INDEX = 'index.json'
+
+# file locked while the index is read and written by a process
+INDEX_LOCK = 'index.lock'
+
+# guards the index of all caches against concurrent loads in threads
+_LOCK = threading.RLock()
+
+
+class ParsedCache:
+    """ Cache of the results of parsing files.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the cache, created if necessary.
+    max_size : numeric
+        Size limit of all entries in MB.
+
+    Examples
+    --------
+    >>> import tempfile
+    >>> cache = ParsedCache(tempfile.mkdtemp())
+    >>> filename = os.path.join(cache.path, 'numbers.txt')
+    >>> with open(filename, 'w') as f:
+    ...     _ = f.write('1 2 3')
+    >>> def parse(filename):
+    ...     print('parsing')
+    ...     with open(filename) as f:
+    ...         return [int(x) for x in f.read().split()]
+    >>> cache.load(filename, parse)
+    parsing
+    [1, 2, 3]
+    >>> cache.load(filename, parse)
+    [1, 2, 3]
+    """
+    def __init__(self, path, max_size=MAX_SIZE):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.max_size = max_size
+
+    def load(self, filename, parse, *args):
+        """ Returns `parse(filename, *args)`, read from the cache if the file
+        was parsed before with the same function and arguments.
+
+        The result of `parse` has to be picklable. Files can be loaded
+        concurrently in threads and processes, they are parsed outside of
+        the lock of the cache index.
+        """
+        parser = '{0}.{1}{2!r}'.format(parse.__module__, parse.__qualname__,
+                                       args)
+        source = _hash(os.path.abspath(filename) + '\n' + parser)
+        stat = os.stat(filename)
+        with self._locked():
+            index = self._read_index()
+            known = index['sources'].get(source)
+        if (known is not None and known['size'] == stat.st_size and
+                known['mtime'] == stat.st_mtime_ns):
+            entry = known['entry']
+        else:
+            entry = _content_hash(filename) + '-' + _hash(parser)[:16]
+        seen = {'size': stat.st_size, 'mtime': stat.st_mtime_ns,
+                'entry': entry}
+
+        if entry in index['entries']:
+            try:
+                with open(os.path.join(self.path, entry), 'rb') as f:
+                    result = pickle.load(f)
+            except Exception as e:
+                logging.warning("Dropping unreadable cache entry of {0} "
+                                "({1!r}).".format(filename, e))
+                with self._locked():
+                    index = self._read_index()
+                    self._remove(index, entry)
+                    self._write_index(index)
+            else:
+                with self._locked():
+                    index = self._read_index()
+                    if entry in index['entries']:
+                        index['entries'][entry]['used'] = time.time()
+                        index['sources'][source] = seen
+                        self._write_index(index)
+                return result
+
+        result = parse(filename, *args)
+        self._store(entry, result)
+        with self._locked():
+            index = self._read_index()
+            index['entries'][entry] = {
+                'size': os.path.getsize(os.path.join(self.path, entry)),
+                'used': time.time()}
+            index['sources'][source] = seen
+            self._evict(index, keep=entry)
+            self._write_index(index)
+        return result
+
+    @property
+    def size(self):
+        """ Size of all entries in bytes."""
+        return sum(e['size'] for e in self._read_index()['entries'].values())
+
+    def clear(self):
+        """ Removes all entries."""
+        with self._locked():
+            index = self._read_index()
+            for entry in list(index['entries']):
+                self._remove(index, entry)
+            self._write_index(index)
+
+    @contextmanager
+    def _locked(self):
+        """ Locks the index against other threads and processes."""
+        with _LOCK, open(os.path.join(self.path, INDEX_LOCK), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:  # still locked after ten seconds
+                        pass
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _store(self, entry, result):
+        filename = os.path.join(self.path, entry)
+        temporary = _temporary(filename)
+        with open(temporary, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, filename)
+
+    def _evict(self, index, keep):
+        """ Removes the least recently used entries except `keep` until the
+        entries do not exceed the size limit.
+        """
+        entries = index['entries']
+        total = sum(e['size'] for e in entries.values())
+        for entry in sorted(entries, key=lambda e: entries[e]['used']):
+            if total <= self.max_size * 2 ** 20:
+                break
+            if entry != keep:
+                total -= entries[entry]['size']
+                self._remove(index, entry)
+
+    def _remove(self, index, entry):
+        index['entries'].pop(entry, None)
+        index['sources'] = {k: v for k, v in index['sources'].items()
+                            if v['entry'] != entry}
+        try:
+            os.remove(os.path.join(self.path, entry))
+        except OSError:
+            pass
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self.path, INDEX)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'entries': {}, 'sources': {}}
+
+    def _write_index(self, index):
+        filename = os.path.join(self.path, INDEX)
+        temporary = _temporary(filename)
+        with open(temporary, 'w') as f:
+            json.dump(index, f)
+        os.replace(temporary, filename)
+
+
+def _hash(string):
+    return hashlib.sha1(string.encode()).hexdigest()
+
+
+def _temporary(filename):
+    """ Name of a temporary file of this process and thread, which replaces
+    `filename` when it is complete.
+    """
+    return '{0}.{1}-{2}.tmp'.format(filename, os.getpid(),
+                                    threading.get_ident())
+
+
+def _content_hash(filename):
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(2 ** 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def default_cache():
+    """ Returns the cache at the location given in the oemof config file (see
+    the module documentation).
+    """
+    try:
+        path = config.get('csv_cache', 'path')
+    except Exception:
+        path = os.path.join(helpers.get_basic_path(), 'cache')
+    try:
+        max_size = config.get('csv_cache', 'max_size')
+    except Exception:
+        max_size = MAX_SIZE
+    return ParsedCache(path, max_size)
+
+
+def load(filename, parse, *args, cache=True):
+    """ Returns `parse(filename, *args)`, read from `cache` if possible.
+
+    Parameters
+    ----------
+    cache : boolean or :class:`ParsedCache`
+        The cache to use. True uses the :func:`default_cache`, False parses
+        the file without caching.
+    """
+    if cache is False or cache is None:
+        return parse(filename, *args)
+    if cache is True:
+        cache = default_cache()
+    return cache.load(filename, parse, *args)
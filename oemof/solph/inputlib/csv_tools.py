@@ -1,22 +1,33 @@
 # -*- coding: utf-8 -*-
 
+from contextlib import ExitStack
+import concurrent.futures as cf
+import numpy as np
 import pandas as pd
 import os
 import logging
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Tick
 from oemof import network
 from ..options import BinaryFlow, Investment
 from ..plumbing import sequence
 from ..network import (Bus, Source, Sink, Flow, LinearTransformer, Storage)
+from . import csv_cache
 
 
 def NodesFromCSV(file_nodes_flows, file_nodes_flows_sequences,
                  delimiter=',', additional_classes=None,
                  additional_seq_attributes=None,
-                 additional_flow_attributes=None):
+                 additional_flow_attributes=None, cache=True):
     """ Creates nodes with their respective flows and sequences from
     a pre-defined CSV structure. An example has been provided in the
     development examples
 
+    The table is converted column by column: missing values, 'seq' entries
+    and the conversion into solph sequences are handled for whole columns,
+    sequences are views of the columns of one array holding the sequence
+    file and the attributes of every node are collected once per label.
+
     Parameters
     ----------
     file_nodes_flows : string
@@ -34,6 +45,10 @@ def NodesFromCSV(file_nodes_flows, file_nodes_flows_sequences,
     additional_flow_attributes : iterable
         List of string with attributes that shall be recognized inside the
         csv file and set as flow attribute
+    cache : boolean or :class:`.csv_cache.ParsedCache`
+        The parsed csv files are read from and written to this cache (True
+        uses the default cache, see :mod:`.csv_cache`). Pass False to parse
+        the files on every call.
 
     """
     # Check attributes for None values
@@ -44,17 +59,6 @@ def NodesFromCSV(file_nodes_flows, file_nodes_flows_sequences,
     if additional_flow_attributes is None:
         additional_flow_attributes = list()
 
-    # dataframe creation and manipulation
-    nodes_flows = pd.read_csv(file_nodes_flows, sep=delimiter)
-    nodes_flows_seq = pd.read_csv(file_nodes_flows_sequences, sep=delimiter,
-                                  header=None)
-    nodes_flows_seq.dropna(axis=0, how='all', inplace=True)
-    nodes_flows_seq.drop(0, axis=1, inplace=True)
-    nodes_flows_seq = nodes_flows_seq.transpose()
-    nodes_flows_seq.set_index([0, 1, 2, 3, 4], inplace=True)
-    nodes_flows_seq.columns = range(0, len(nodes_flows_seq.columns))
-    nodes_flows_seq = nodes_flows_seq.astype(float)
-
     # class dictionary for dynamic instantiation
     classes = {'Source': Source, 'Sink': Sink,
                'LinearTransformer': LinearTransformer,
@@ -70,207 +74,222 @@ def NodesFromCSV(file_nodes_flows, file_nodes_flows_sequences,
 
     # attributes of different classes
     flow_attrs = list(vars(Flow()).keys()) + additional_flow_attributes
-    bus_attrs = vars(Bus()).keys()
+    bus_attrs = ['balanced']
+    invest_attrs = list(vars(Investment()).keys())
+    binary_attrs = list(vars(BinaryFlow()).keys())
+    # investment is a node attribute of storages as well
+    node_attrs_excluded = set(flow_attrs) - {'investment'}
+    node_attrs_excluded.update(('class', 'label', 'source', 'target',
+                                'conversion_factors'))
+
+    # dataframe creation, only lines holding a valid class hold data, other
+    # lines are just for visual purposes, e.g. blank lines or explanations
+    nodes_flows = csv_cache.load(file_nodes_flows, _read_csv, delimiter,
+                                 cache=cache)
+    nodes_flows = nodes_flows[nodes_flows['class'].isin(list(classes))]
+    sequences = _sequence_columns(*csv_cache.load(
+        file_nodes_flows_sequences, _read_sequences, delimiter, cache=cache))
+
+    lines = (nodes_flows.index + 2).tolist()
+    ids = [nodes_flows[c].tolist()
+           for c in ('class', 'label', 'source', 'target')]
+    labels = ids[1]
+
+    # column-wise conversion into one dictionary of the values per row,
+    # missing values are left out, flows only get attributes whose value in
+    # the file is not zero or False
+    rows = [{} for _ in lines]
+    flow_rows = [{} for _ in lines]
+    node_attrs = {}
+    for attr in nodes_flows.columns:
+        column = _convert_column(
+            nodes_flows[attr], attr, ids, sequences,
+            attr in seq_attributes or attr == 'conversion_factors', lines)
+        for i, value, nonzero in column:
+            rows[i][attr] = value
+            if nonzero:
+                flow_rows[i][attr] = value
+        if attr not in node_attrs_excluded:
+            # the line of every attribute of a node, the last line holding a
+            # value wins
+            for i, value, nonzero in column:
+                node_attrs.setdefault(labels[i], {})[attr] = i
 
-    # iteration over dataframe rows to create objects
     nodes = {}
-    for i, r in nodes_flows.iterrows():
-
-        # check if current line holds valid data or is just for visual purposes
-        # e.g. a blank line or a line that contains data explanations
-        if isinstance(r['class'], str) and r['class'] in classes.keys():
-
-            # drop NaN values from series
-            r = r.dropna()
-            # save column labels and row values in dict
-            row = dict(zip(r.index.values, r.values))
-
-            # create node if not existent and set attributes
-            # (attributes must be placed either in the first line or in all
-            #  lines of multiple node entries (flows) in csv file)
-            try:
-                if row['class'] in classes.keys():
-                    node = nodes.get(row['label'])
-                    if node is None:
-                        node = classes[row['class']](label=row['label'])
-                # for the if check below we use all flow_attrs except
-                # investment
-                # because for storages investment needs to be set as a node
-                # attribute (and a flow attribute)
-                flow_attrs_ = [i for i in flow_attrs if i != 'investment']
-                for attr in row.keys():
-                    if (attr not in flow_attrs_ and
-                       attr not in ('class', 'label', 'source', 'target',
-                                    'conversion_factors')):
-                            if row[attr] != 'seq':
-                                if attr in seq_attributes:
-                                    row[attr] = sequence(float(row[attr]))
-                                # again from investment storage the next lines
-                                # are a little hacky as we need to create an
-                                # solph.options.Investment() object
-                                if (isinstance(node, Storage) and
-                                        attr == 'investment'):
-                                    setattr(node, attr, Investment())
-                                    invest_attrs = vars(Investment()).keys()
-                                    for iattr in invest_attrs:
-                                        if iattr in row.keys() and row[attr]:
-                                            setattr(node.investment,
-                                                    iattr, row[iattr])
-                                # for all 'normal' attributes
-                                else:
-                                    setattr(node, attr, row[attr])
-
-                            else:
-                                seq = nodes_flows_seq.loc[row['class'],
-                                                          row['label'],
-                                                          row['source'],
-                                                          row['target'],
-                                                          attr]
-                                if attr in seq_attributes:
-                                    seq = [i for i in seq]
-                                    seq = sequence(seq)
-                                else:
-                                    seq = [i for i in seq.values]
-                                setattr(node, attr, seq)
-            except:
-                print('Error with node creation in line', i+2, 'in csv file.')
-                print('Label:', row['label'])
-                raise
-
-            # create flow and set attributes
-            try:
-                flow = Flow()
-                for attr in flow_attrs:
-                    if attr in row.keys() and row[attr]:
-                        if row[attr] != 'seq':
-                            if attr in seq_attributes:
-                                row[attr] = sequence(float(row[attr]))
-                            setattr(flow, attr, row[attr])
-                        if row[attr] == 'seq':
-                            seq = nodes_flows_seq.loc[row['class'],
-                                                      row['label'],
-                                                      row['source'],
-                                                      row['target'],
-                                                      attr]
-                            if attr in seq_attributes:
-                                seq = [i for i in seq]
-                                seq = sequence(seq)
-                            else:
-                                seq = [i for i in seq.values]
-                            setattr(flow, attr, seq)
-                        # this block is only for binary flows!
-                        if attr == 'binary' and row[attr] is True:
-                            # create binary object for flow
-                            setattr(flow, attr, BinaryFlow())
-                            binary_attrs = vars(BinaryFlow()).keys()
-                            for battr in binary_attrs:
-                                if battr in row.keys() and row[attr]:
-                                    setattr(flow.binary, battr, row[battr])
-                        # this block is only for investment flows!
-                        if attr == 'investment' and row[attr] is True:
-                            if isinstance(node, Storage):
-                                # set the flows of the storage to Investment as
-                                # without attributes, as costs etc are set at
-                                # the node
-                                setattr(flow, attr, Investment())
-                            else:
-                                # create binary object for flow
-                                setattr(flow, attr, Investment())
-                                invest_attrs = vars(Investment()).keys()
-                                for iattr in invest_attrs:
-                                    if iattr in row.keys() and row[attr]:
-                                        setattr(flow.investment, iattr,
-                                                row[iattr])
-            except:
-                print('Error with flow creation in line', i+2, 'in csv file.')
-                print('Label:', row['label'])
-                raise
-
-            # create an input entry for the current line
-            try:
-                if row['label'] == row['target']:
-                    if row['source'] not in nodes.keys():
-                        nodes[row['source']] = Bus(label=row['source'])
-                        for attr in bus_attrs:
-                            if attr in row.keys() and row[attr] is not None:
-                                setattr(nodes[row['source']], attr, row[attr])
-                    inputs = {nodes[row['source']]: flow}
-                else:
-                    inputs = {}
-            except:
-                print('Error with input creation in line', i+2, 'in csv file.')
-                print('Label:', row['label'])
-                raise
-
-            # create an output entry for the current line
-            try:
-                if row['label'] == row['source']:
-                    if row['target'] not in nodes.keys():
-                        nodes[row['target']] = Bus(label=row['target'])
-                        for attr in bus_attrs:
-                            if attr in row.keys() and row[attr] is not None:
-                                setattr(nodes[row['target']], attr, row[attr])
-                    outputs = {nodes[row['target']]: flow}
-                else:
-                    outputs = {}
-            except:
-                print('Error with output creation in line', i+2,
-                      'in csv file.')
-                print('Label:', row['label'])
-                raise
-
-            # create a conversion_factor entry for the current line
-            try:
-                if row['target'] and 'conversion_factors' in row:
-                    if row['conversion_factors'] == 'seq':
-                        seq = nodes_flows_seq.loc[row['class'],
-                                                  row['label'],
-                                                  row['source'],
-                                                  row['target'],
-                                                  'conversion_factors']
-                        seq = [i for i in seq]
-                        seq = sequence(seq)
-                        conversion_factors = {nodes[row['target']]: seq}
-                    else:
-                        conversion_factors = \
-                            {nodes[row['target']]:
-                                sequence(float(row['conversion_factors']))}
-                else:
-                    conversion_factors = {}
-            except:
-                print('Error with conversion factor creation in line', i+2,
-                      'in csv file.')
-                print('Label:', row['label'])
-                raise
-
-            # add node to dict and assign attributes depending on
-            # if there are multiple lines per node or not
-            try:
-                for source, f in inputs.items():
-                    network.flow[source, node] = f
-                for target, f in outputs.items():
-                    network.flow[node, target] = f
-                if node.label in nodes.keys():
-                    if not isinstance(node, Bus):
-                        node.conversion_factors.update(conversion_factors)
-                else:
-                    if not isinstance(node, Bus):
-                        node.conversion_factors = conversion_factors
-                        nodes[node.label] = node
-            except:
-                print('Error adding node to dict in line', i+2, 'in csv file.')
-                print('Label:', row['label'])
-                raise
+    configured = set()
+    for i, row in enumerate(rows):
+        try:
+            node = nodes.get(row['label'])
+            if node is None or row['label'] not in configured:
+                node = _create_node(node, row, rows, classes,
+                                    node_attrs.get(row['label'], {}),
+                                    invest_attrs)
+                configured.add(row['label'])
+            _add_flow(node, row, flow_rows[i], nodes, flow_attrs, bus_attrs,
+                      invest_attrs, binary_attrs)
+        except:
+            print('Error with node creation in line', lines[i],
+                  'in csv file.')
+            print('Label:', labels[i])
+            raise
 
     return nodes
 
 
-def merge_csv_files(path=None, output_path=None, write=True):
+def _read_csv(filename, delimiter=','):
+    return pd.read_csv(filename, sep=delimiter)
+
+
+def _read_sequence_frame(filename):
+    return pd.read_csv(filename, index_col=[0], header=[0, 1, 2, 3, 4])
+
+
+def _read_sequences(file_nodes_flows_sequences, delimiter):
+    """ Reads the sequence file into one float array with one column per
+    sequence (stored column by column) and returns it with the list of the
+    `(class, label, source, target, attribute)` tuples of its columns.
+    """
+    seq = pd.read_csv(file_nodes_flows_sequences, sep=delimiter,
+                      header=[0, 1, 2, 3, 4], index_col=0)
+    # lines without any value are left out
+    empty = seq.isnull().all(axis=1).values & seq.index.isnull()
+    values = np.asfortranarray(seq.values[~empty], dtype=float)
+    return values, seq.columns.tolist()
+
+
+def _sequence_columns(values, keys):
+    """ Returns a function returning the column of `values` of a key."""
+    columns = {}
+    for i, key in enumerate(keys):
+        columns.setdefault(key, i)
+
+    def sequence_column(key):
+        return values[:, columns[key]]
+
+    return sequence_column
+
+
+def _convert_column(column, attr, ids, sequences, to_sequence, lines):
+    """ Returns `(row, value, nonzero)` tuples of all rows of the column
+    holding a value. Entries 'seq' are replaced by the sequence of the row,
+    other values of sequence attributes are converted into solph sequences.
+    `nonzero` is the truth value of the entry in the file.
+    """
+    rows = np.flatnonzero(column.notnull().values).tolist()
+    values = column.tolist()
+    is_seq = (column == 'seq').values
+    converted = []
+    for i in rows:
+        value = values[i]
+        nonzero = bool(value)
+        try:
+            if is_seq[i]:
+                value = sequences(
+                    (ids[0][i], ids[1][i], ids[2][i], ids[3][i], attr))
+                value = sequence(value) if to_sequence else value.tolist()
+            elif to_sequence:
+                value = sequence(float(value))
+        except:
+            print('Error with attribute', attr, 'in line', lines[i],
+                  'in csv file.')
+            print('Label:', ids[1][i])
+            raise
+        converted.append((i, value, nonzero))
+    return converted
+
+
+def _create_node(node, row, rows, classes, attrs, invest_attrs):
+    """ Creates the node of a row if `node` is None and sets its attributes.
+    `attrs` maps the attributes of the node to the line holding their value.
+    """
+    if node is None:
+        node = classes[row['class']](label=row['label'])
+    for attr, i in attrs.items():
+        # again from investment storage the next lines are a little hacky as
+        # we need to create an solph.options.Investment() object
+        if isinstance(node, Storage) and attr == 'investment':
+            node.investment = Investment()
+            for iattr in invest_attrs:
+                if iattr in rows[i] and rows[i][attr]:
+                    setattr(node.investment, iattr, rows[i][iattr])
+        else:
+            setattr(node, attr, rows[i][attr])
+    return node
+
+
+def _add_flow(node, row, flow_row, nodes, flow_attrs, bus_attrs,
+              invest_attrs, binary_attrs):
+    """ Creates the flow of a row with the attributes in `flow_row`, the bus
+    at the other end of the flow (if not existent) and adds the node to
+    `nodes`.
+    """
+    label = row['label']
+    flow = Flow()
+    for attr in flow_attrs:
+        if attr not in flow_row:
+            continue
+        value = flow_row[attr]
+        # this block is only for binary flows!
+        if attr == 'binary' and value is True:
+            flow.binary = BinaryFlow()
+            for battr in binary_attrs:
+                if battr in row:
+                    setattr(flow.binary, battr, row[battr])
+        # this block is only for investment flows!
+        elif attr == 'investment' and value is True:
+            # the costs etc. of storages are set at the node
+            flow.investment = Investment()
+            if not isinstance(node, Storage):
+                for iattr in invest_attrs:
+                    if iattr in row:
+                        setattr(flow.investment, iattr, row[iattr])
+        else:
+            setattr(flow, attr, value)
+
+    # create an input or output entry and the bus at its other end
+    inputs = outputs = {}
+    if label == row['target']:
+        _create_bus(row, 'source', nodes, bus_attrs)
+        inputs = {nodes[row['source']]: flow}
+    if label == row['source']:
+        _create_bus(row, 'target', nodes, bus_attrs)
+        outputs = {nodes[row['target']]: flow}
+
+    if row['target'] and 'conversion_factors' in row:
+        conversion_factors = {nodes[row['target']]: row['conversion_factors']}
+    else:
+        conversion_factors = {}
+
+    for source, f in inputs.items():
+        network.flow[source, node] = f
+    for target, f in outputs.items():
+        network.flow[node, target] = f
+    if label in nodes:
+        if not isinstance(node, Bus):
+            node.conversion_factors.update(conversion_factors)
+    elif not isinstance(node, Bus):
+        node.conversion_factors = conversion_factors
+        nodes[label] = node
+
+
+def _create_bus(row, end, nodes, bus_attrs):
+    if row[end] not in nodes:
+        nodes[row[end]] = Bus(label=row[end])
+        for attr in bus_attrs:
+            if attr in row:
+                setattr(nodes[row[end]], attr, row[attr])
+
+
+def merge_csv_files(path=None, output_path=None, write=True, cache=True,
+                    workers=None, output_format='csv'):
     """
     Merge csv files from a specified directory. All files with 'seq' will be
     merged and all other files. Make sure that no other csv-files than the ones
     to be merged are inside the specified directory.
 
+    The files are read concurrently in a thread pool and the tables are
+    concatenated once.
+
     Parameters
     ----------
     path: str
@@ -279,34 +298,52 @@ def merge_csv_files(path=None, output_path=None, write=True):
         Path where the merged files are written to (default is `path` above)
     write : boolean
         Indicating if new, merged dataframes should be written to csv
+    cache : boolean or :class:`.csv_cache.ParsedCache`
+        Cache of the parsed csv files, see :func:`NodesFromCSV`.
+    workers : int
+        Maximal number of threads reading files (default of
+        :class:`concurrent.futures.ThreadPoolExecutor` if None).
+    output_format : str
+        Format of the merged files: 'csv', 'hdf' (HDF5 file with the table
+        under the key 'nodes_flows' or 'nodes_flows_seq', requires pytables)
+        or 'pickle'.
 
     Returns
     -------
     Tuple of dataframes (nodes_flows, nodes_flows_seq)
     """
+    if output_format not in MERGED_FORMATS:
+        raise ValueError("Unknown output format {0!r}, use one of {1}.".format(
+            output_format, sorted(MERGED_FORMATS)))
     if output_path is None:
         output_path = path
 
     files = [f for f in os.listdir(path) if f.endswith('.csv')]
 
-    nodes_flows = pd.DataFrame()
-    nodes_flows_seq = pd.DataFrame()
-
-    for f in files:
+    def read(f):
         if 'seq' in f:
-            tmp_df = pd.read_csv(os.path.join(path, f), index_col=[0],
-                                 header=[0, 1, 2, 3, 4])
-            nodes_flows_seq = pd.concat([nodes_flows_seq, tmp_df], axis=1)
-        else:
-            tmp_df = pd.read_csv(os.path.join(path, f))
-            nodes_flows = pd.concat([nodes_flows, tmp_df])
+            return csv_cache.load(os.path.join(path, f),
+                                  _read_sequence_frame, cache=cache)
+        return csv_cache.load(os.path.join(path, f), _read_csv, cache=cache)
+
+    with cf.ThreadPoolExecutor(max_workers=workers) as executor:
+        frames = list(executor.map(read, files))
+    tables = [df for f, df in zip(files, frames) if 'seq' not in f]
+    sequences = [df for f, df in zip(files, frames) if 'seq' in f]
+
+    nodes_flows = pd.concat(tables) if tables else pd.DataFrame()
+    nodes_flows_seq = (pd.concat(sequences, axis=1) if sequences else
+                       pd.DataFrame())
 
     if write is True:
-        nodes_flows.to_csv(os.path.join(output_path,
-                                        'merged_nodes_flows.csv'), index=False)
+        extension, write_frame = MERGED_FORMATS[output_format]
+        write_frame(nodes_flows, os.path.join(
+            output_path, 'merged_nodes_flows' + extension),
+            'nodes_flows', index=False)
         if isinstance(nodes_flows_seq.columns, pd.MultiIndex):
-            nodes_flows_seq.to_csv(os.path.join(output_path,
-                                   'merged_nodes_flows_seq.csv'))
+            write_frame(nodes_flows_seq, os.path.join(
+                output_path, 'merged_nodes_flows_seq' + extension),
+                'nodes_flows_seq')
         else:
             raise ValueError('Columns of merge seq-csvfile is not Multiindex.'
                              'Did you use unique column-headers across all '
@@ -315,9 +352,31 @@ def merge_csv_files(path=None, output_path=None, write=True):
     return nodes_flows, nodes_flows_seq
 
 
+def _write_csv(df, filename, key, index=True):
+    df.to_csv(filename, index=index)
+
+
+def _write_hdf(df, filename, key, index=True):
+    if not index:
+        df = df.reset_index(drop=True)
+    df.to_hdf(filename, key, mode='w')
+
+
+def _write_pickle(df, filename, key, index=True):
+    if not index:
+        df = df.reset_index(drop=True)
+    df.to_pickle(filename)
+
+
+# file extension and writer of the output formats of `merge_csv_files`
+MERGED_FORMATS = {'csv': ('.csv', _write_csv),
+                  'hdf': ('.h5', _write_hdf),
+                  'pickle': ('.pkl', _write_pickle)}
+
+
 def resample_sequence(seq_base_file=None, output_path=None,
                       samples=None, file_prefix=None, file_suffix='_seq',
-                      header=[0, 1, 2, 3, 4]):
+                      header=[0, 1, 2, 3, 4], how='mean', chunksize=8760):
     """
     This function can be used for resampling the sequence csv-data file.
     The file is read  from the specified path: `seq_base_file`, resampled and,
@@ -325,14 +384,18 @@ def resample_sequence(seq_base_file=None, output_path=None,
     are expected to have a timeindex column that can be parsed by
     pandas, with entries like: '2014-01-01 00:00:00+00:00'
 
+    The file is read once in chunks of `chunksize` rows and all samples are
+    written in this pass. A sample is aggregated from the coarsest other
+    sample whose periods it consists of (e.g. '24H' from '8H', '8H' from
+    '4H'), other samples are aggregated from the rows of the file.
 
     Parameters
     ----------
     seq_base_file : string
         File that contains data to be resampled.
     output_path : string
-        Path for resampled seq-files. If no path is specified,
-        attr:`seq_base_file` path will be used.
+        Path for resampled seq-files. If no path is specified, the directory
+        of :attr:`seq_base_file` will be used.
     samples : list
         List of strings with the resampling rate e.g. ['4H', '2H']. See
         `pandas.DataFrame.resample` method for more information on format.
@@ -344,48 +407,208 @@ def resample_sequence(seq_base_file=None, output_path=None,
         file_prefix.
     header : list
         List of integers to specifiy the header lines
+    how : str or dict
+        Aggregation of the values of a period: 'mean', 'sum' or 'max'. A
+        dictionary maps columns (tuples of the header entries) to their
+        aggregation, other columns are averaged.
+    chunksize : int
+        Number of rows read at once.
+
+    Returns
+    -------
+    dict
+        The names of the written files by sample.
     """
     if samples is None:
         raise ValueError('Missing sample attribute. Please specifiy!')
     if output_path is None:
         logging.info('No output_path specified' +
                      ', setting output_path to seq_path!')
-        output_path = seq_base_file
+        output_path = os.path.dirname(seq_base_file)
 
     if not os.path.exists(output_path):
             os.makedirs(output_path, exist_ok=True)
 
     seq_path, seq_file = os.path.split(seq_base_file)
-
-    # read the file and parse the dates from the first column (index 0)
-    seq = pd.read_csv(os.path.join(seq_path, seq_file),
-                      header=header, parse_dates=[0])
-
-    # store the first column name for reuse
-    first_col = seq.columns[0]
-    # set the index as datetimeindex from column with parsed dates
-    seq.index = seq[first_col]
-    # set timeindex
-
-    # convert columns to numeric values, except the datetimecolumn, but!
-    # which we keep for reuse
-    for col in seq:
-        if col == first_col:
-            seq[col] = -999999
-        else:
-            seq[col] = seq[col].astype(float)
-
-    for s in samples:
-        # resample dataframes
-        seq_sampled = seq.resample(s).mean()
-        # assign the resampled datetimeindex values to the first columns,
-        # replacing the -999999
-        seq_sampled[first_col] = seq_sampled.index
-        if file_prefix is None:
-            file_prefix = seq_file.split('seq')[0]
-            logging.info('Setting filename prefix to: {}'.format(file_prefix))
-
-        filename = os.path.join(output_path, file_prefix+s+file_suffix+'.csv')
-        logging.info('Writing sample file to {0}.'.format(filename))
-        seq_sampled.to_csv(filename, index=False)
-    return seq_sampled
+    if file_prefix is None:
+        file_prefix = seq_file.split('seq')[0]
+        logging.info('Setting filename prefix to: {}'.format(file_prefix))
+
+    # read the file in chunks and parse the dates from the first column
+    chunks = pd.read_csv(os.path.join(seq_path, seq_file), header=header,
+                         index_col=0, parse_dates=True, chunksize=chunksize)
+    filenames = {}
+    with ExitStack() as files:
+        root = None
+        for chunk in chunks:
+            values = chunk.values.astype(float)
+            if root is None:
+                # the periods of all chunks start at the first day
+                origin = chunk.index[0].floor('D')
+                aggregation = [how if isinstance(how, str) else
+                               how.get(c, 'mean') for c in chunk]
+                root = _Period(None, chunk.columns, origin, aggregation)
+                periods = [root]
+                for s in sorted(samples, key=_period_length):
+                    filenames[s] = os.path.join(
+                        output_path, file_prefix + s + file_suffix + '.csv')
+                    logging.info('Writing sample file to {0}.'.format(
+                        filenames[s]))
+                    period = _Period(s, chunk.columns, origin, aggregation,
+                                     files.enter_context(
+                                         open(filenames[s], 'w')),
+                                     chunksize)
+                    # aggregate from the coarsest rate it consists of
+                    parent = max((p for p in periods if period.consists_of(p)),
+                                 key=lambda p: _period_length(p.rate))
+                    parent.children.append(period)
+                    periods.append(period)
+            missing = np.isnan(values)
+            root.add(chunk.index.asi8, np.where(missing, 0, values),
+                     (~missing).astype(float), values)
+        if root is not None:
+            root.close()
+    return filenames
+
+
+def _period_length(rate):
+    """ Length of the periods of `rate` in nanoseconds, 0 for the rows of
+    the file and infinite for rates of varying length (e.g. months).
+    """
+    if rate is None:
+        return 0
+    offset = to_offset(rate)
+    return offset.nanos if isinstance(offset, Tick) else float('inf')
+
+
+class _Period:
+    """ Aggregates the sums, counts and maxima of the values of the columns
+    to the periods of one resampling rate.
+
+    The values are passed as arrays with one row per timestamp (nanoseconds,
+    ordered by time). The rows of a period are reduced at once with
+    :func:`numpy.add.reduceat`; the periods of rates of fixed length are
+    computed from the timestamps, the periods of other rates (e.g. months)
+    are taken from :meth:`pandas.DataFrame.resample`.
+
+    Completed periods are passed on to the coarser rates in
+    :attr:`children`, which consist of whole periods of this rate, and
+    written to `output` in blocks of at least `rows` rows. The last period
+    stays pending until the next values arrive or the period is closed.
+    """
+    def __init__(self, rate, columns, origin, aggregation, output=None,
+                 rows=8760):
+        self.rate = rate
+        self.columns = columns
+        self.origin = origin
+        self.output = output
+        self.length = _period_length(rate)
+        self.aggregation = {
+            how: np.array([i for i, a in enumerate(aggregation) if a == how],
+                          dtype=int)
+            for how in ('mean', 'sum', 'max')}
+        unknown = set(aggregation) - set(self.aggregation)
+        if unknown:
+            raise ValueError("Unknown aggregation(s) {0}, use 'mean', 'sum' "
+                             "or 'max'.".format(sorted(unknown)))
+        self.children = []
+        self.pending = None
+        self.rows = rows
+        self.buffer = []
+
+    def consists_of(self, other):
+        """ True if every period of this rate consists of whole periods of
+        `other`.
+        """
+        if other.rate is None:
+            return True
+        return (self.length < float('inf') and
+                self.length % other.length == 0)
+
+    def periods(self, timestamps):
+        """ Returns the start (or label) of the period of every timestamp."""
+        if self.length < float('inf'):
+            origin = self.origin.value
+            return origin + (timestamps - origin) // self.length * self.length
+        index = pd.DatetimeIndex(timestamps).tz_localize('UTC').tz_convert(
+            self.origin.tz)
+        counts = pd.Series(1, index=index).resample(self.rate).count()
+        return np.repeat(counts.index.asi8, counts.values)
+
+    def all_periods(self, first, last):
+        """ Returns the periods from `first` to `last` including empty ones.
+        """
+        if self.length < float('inf'):
+            number = (last - first) // self.length + 1
+            return first + np.arange(number, dtype=np.int64) * self.length
+        return pd.date_range(pd.Timestamp(first, tz='UTC'),
+                             pd.Timestamp(last, tz='UTC'),
+                             freq=self.rate).asi8
+
+    def add(self, timestamps, sums, counts, maxima):
+        if self.rate is None:
+            self.emit(timestamps, sums, counts, maxima)
+            return
+        periods = self.periods(timestamps)
+        if self.pending is not None:
+            periods, sums, counts, maxima = (
+                np.concatenate([p, a]) for p, a in zip(
+                    self.pending, (periods, sums, counts, maxima)))
+        starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+        periods = periods[starts]
+        sums = np.add.reduceat(sums, starts)
+        counts = np.add.reduceat(counts, starts)
+        maxima = np.fmax.reduceat(maxima, starts)
+
+        complete = self.all_periods(periods[0], periods[-1])
+        if len(complete) != len(periods):
+            # periods without rows: sum 0, count 0 and no maximum
+            rows = np.searchsorted(complete, periods)
+            shape = (len(complete), sums.shape[1])
+            filled = np.zeros(shape), np.zeros(shape), np.full(shape, np.nan)
+            for f, a in zip(filled, (sums, counts, maxima)):
+                f[rows] = a
+            periods, (sums, counts, maxima) = complete, filled
+
+        self.pending = (periods[-1:], sums[-1:], counts[-1:], maxima[-1:])
+        self.emit(periods[:-1], sums[:-1], counts[:-1], maxima[:-1])
+
+    def close(self):
+        if self.pending is not None:
+            self.emit(*self.pending)
+            self.pending = None
+        self.write()
+        for child in self.children:
+            child.close()
+
+    def write(self):
+        """ Writes the buffered periods to the output."""
+        if not self.buffer:
+            return
+        periods = np.concatenate([p for p, v in self.buffer])
+        frame = pd.DataFrame(np.concatenate([v for p, v in self.buffer]),
+                             columns=self.columns)
+        frame.insert(0, tuple(self.columns.names), pd.DatetimeIndex(
+            periods).tz_localize('UTC').tz_convert(self.origin.tz))
+        frame.to_csv(self.output, index=False,
+                     header=self.output.tell() == 0)
+        self.buffer = []
+
+    def emit(self, periods, sums, counts, maxima):
+        if not len(periods):
+            return
+        if self.output is not None:
+            mean, total, most = (self.aggregation[how]
+                                 for how in ('mean', 'sum', 'max'))
+            values = np.empty(sums.shape)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values[:, mean] = np.where(counts[:, mean] > 0,
+                                           sums[:, mean] / counts[:, mean],
+                                           np.nan)
+            values[:, total] = sums[:, total]
+            values[:, most] = maxima[:, most]
+            self.buffer.append((periods, values))
+            if sum(len(p) for p, v in self.buffer) >= self.rows:
+                self.write()
+        for child in self.children:
+            child.add(periods, sums, counts, maxima)
@@ -0,0 +1,968 @@
+# -*- coding: utf-8 -*-
+"""Matrix generation backend writing LP and MPS files directly from the
+constraint groups of an energy system.
+
+Instead of building pyomo expressions term by term, the builders of this
+module emit the coefficients of every constraint block of
+:mod:`oemof.solph.blocks` as sparse COO triplets `(row, column, value)`
+computed with numpy over all timesteps. The :class:`MatrixModel` assembles
+them into the constraint matrix, the bounds and the cost vector of the
+problem and writes LP or MPS files straight from these arrays.
+
+The written LP files are identical to the ones written by
+:class:`~oemof.solph.models.OperationalModel` with symbolic solver labels.
+"""
+
+import re
+
+import numpy as np
+
+from oemof.solph import blocks
+from .models import OperationalModel
+from .plumbing import is_none, sequence, sequence_array
+
+
+# Brackets in labels of LP files are written as parentheses, all characters
+# other than ASCII letters, digits, underscores and parentheses are replaced
+# by an underscore (as done by pyomo's `cpxlp_label_from_name`).
+_BRACKETS = str.maketrans('[]{}', '()()')
+_INVALID_CHARACTERS = re.compile(r'[^A-Za-z0-9_()]')
+
+_LP_SENSES = {'==': ('c_e_', '='), '<=': ('c_u_', '<='),
+              '>=': ('c_l_', '>=')}
+
+_MPS_SENSES = {'==': 'E', '<=': 'L', '>=': 'G'}
+
+
+def _label(name, index):
+    """ Returns the label of the variable or constraint `name[index]`.
+    """
+    label = "{0}[{1}]".format(name, ",".join(str(i) for i in index))
+    return _INVALID_CHARACTERS.sub('_', label.translate(_BRACKETS))
+
+
+def _labels(name, index):
+    """ Generates the labels of all entries of a variable or constraint with
+    the index `index` (see :class:`_Variable` and :class:`_Constraint`).
+    """
+    for key, steps in index:
+        if steps is None:
+            yield _label(name, key)
+        else:
+            prefix = _label(name, key + ('',))[:-1]
+            for t in steps:
+                yield "{0}{1})".format(prefix, t)
+
+
+def _number(value):
+    """ Formats a number the way pyomo's LP writer does (no negative zero).
+    """
+    return "%.17g" % (value if value != 0 else 0)
+
+
+class _Variable:
+    """ A variable of a :class:`MatrixModel`, i.e. a consecutive range of
+    columns of the constraint matrix.
+
+    The variable is indexed by `keys` and, if `timesteps` is given, by all
+    timesteps, so the columns of a key are consecutive.
+    """
+    def __init__(self, name, keys, offset, timesteps=None, lower=0,
+                 upper=np.inf, domain='continuous'):
+        self.name = name
+        self.keys = list(keys)
+        self.positions = {key: pos for pos, key in enumerate(self.keys)}
+        self.timesteps = timesteps
+        self.width = 1 if timesteps is None else len(timesteps)
+        self.offset = offset
+        self.size = len(self.keys) * self.width
+        self.domain = domain
+        self.lower = np.full(self.size, lower, dtype=float)
+        self.upper = np.full(self.size, upper, dtype=float)
+        # values of fixed columns, `nan` if the column is not fixed
+        self.value = np.full(self.size, np.nan)
+
+    def local(self, key):
+        """ Returns the slice of the (local) entries of `key`.
+        """
+        start = self.positions[key] * self.width
+        return slice(start, start + self.width)
+
+    def columns(self, key):
+        """ Returns the column of `key` or an array with the columns of `key`
+        for all timesteps.
+        """
+        start = self.offset + self.positions[key] * self.width
+        if self.timesteps is None:
+            return start
+        return np.arange(start, start + self.width)
+
+    def labels(self):
+        return _labels(self.name, [(key, self.timesteps) for key in self.keys])
+
+
+class _Constraint:
+    """ A constraint of a :class:`MatrixModel`, i.e. a consecutive range of
+    rows of the constraint matrix with the same sense.
+    """
+    def __init__(self, name, sense):
+        self.name = name
+        self.sense = sense
+        self.index = []
+        self.size = 0
+        self.rhs = []
+        self.triplets = []
+
+    def add_rows(self, key, steps=None, rhs=0):
+        """ Adds a row for `key` or, if `steps` is given, a row for `key` and
+        every timestep in `steps`. Returns the (local) row or rows.
+        """
+        length = 1 if steps is None else len(steps)
+        rows = np.arange(self.size, self.size + length)
+        self.index.append((key, steps))
+        self.size += length
+        self.rhs.append(np.broadcast_to(np.asarray(rhs, dtype=float),
+                                        (length,)))
+        return rows[0] if steps is None else rows
+
+    def add_terms(self, rows, columns, coefficients):
+        """ Adds the terms `coefficient * column` to the rows `rows`.
+        Arguments are broadcast against each other.
+        """
+        self.triplets.append(
+            [np.ravel(a) for a in np.broadcast_arrays(rows, columns,
+                                                      coefficients)])
+
+    def labels(self):
+        return _labels(self.name, self.index)
+
+
+class MatrixModel:
+    """ An energy system model written directly as constraint matrix.
+
+    The model contains the same sets of variables and constraints as the
+    :class:`~oemof.solph.models.OperationalModel` of the energy system, but
+    no pyomo components. It can be written to LP or MPS files which can be
+    passed to a solver.
+
+    Parameters
+    ----------
+    es : EnergySystem object
+        Object that holds the nodes of an oemof energy system graph
+    constraint_groups : list
+        Additional constraint groups. A builder has to be registered for every
+        group in :attr:`MatrixModel.BUILDERS`.
+    name : str
+        Name of the model written to the files. Defaults to
+        'OperationalModel'.
+
+    Other arguments of the :class:`~oemof.solph.models.OperationalModel`
+    (e.g. `periodic`, `presolve` or `objective_weighting`) are not supported
+    and raise a TypeError. The model is always periodic and not presolved.
+
+    **The following attributes are created**:
+
+    rows, columns, coefficients :
+        Arrays with the (sorted) COO triplets of the constraint matrix.
+    senses, rhs :
+        The sense ('==', '<=' or '>=') and right-hand side of every row.
+    lower, upper :
+        Lower and upper bounds of every column. Fixed columns are removed from
+        the constraints and the objective and do not appear in the files.
+    costs, objective_constant :
+        Cost coefficient of every column and constant part of the objective.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> from oemof.solph import Bus, EnergySystem, Flow, Sink, Source
+    >>> es = EnergySystem(timeindex=pd.date_range('1/1/2012', periods=3,
+    ...                                           freq='H'))
+    >>> bel = Bus(label='electricity')
+    >>> pp = Source(label='pp', outputs={bel: Flow(nominal_value=10,
+    ...                                            variable_costs=2)})
+    >>> demand = Sink(label='demand', inputs={bel: Flow(
+    ...     nominal_value=5, actual_value=[1, 0.8, 0.5], fixed=True)})
+    >>> mm = MatrixModel(es)
+    >>> len(mm.rhs), len(mm.coefficients)
+    (3, 3)
+    >>> mm.rhs
+    array([5. , 4. , 2.5])
+    """
+    def __init__(self, es, **kwargs):
+        unknown = set(kwargs) - {'name', 'constraint_groups'}
+        if unknown:
+            raise TypeError("Arguments {0} are not supported by the "
+                            "MatrixModel.".format(sorted(unknown)))
+        self.name = kwargs.get('name', 'OperationalModel')
+        self.es = es
+        self.timeindex = es.timeindex
+        self.timesteps = range(len(self.timeindex))
+        self.timeincrement = sequence_array(
+            sequence(self.timeindex.freq.nanos / 3.6e12), len(self.timesteps))
+
+        self._constraint_groups = (OperationalModel.CONSTRAINT_GROUPS +
+                                   kwargs.get('constraint_groups', []))
+
+        self.flows = es.flows()
+
+        self.variables = {}
+        self.constraints = []
+        self._size = 0
+        self._objective = []
+        self.objective_constant = 0
+
+        # ######################### FLOW VARIABLE #############################
+        self.flow = self.add_variable('flow', sorted(self.flows),
+                                      timesteps=self.timesteps)
+        for (o, i), f in self.flows.items():
+            self._set_flow_bounds(o, i, f)
+
+        self.positive_flow_gradient = self.add_variable(
+            'positive_flow_gradient',
+            sorted((n, t) for n in es.nodes for (t, f) in n.outputs.items()
+                   if not is_none(f.positive_gradient[0])),
+            timesteps=self.timesteps)
+
+        self.negative_flow_gradient = self.add_variable(
+            'negative_flow_gradient',
+            sorted((n, t) for n in es.nodes for (t, f) in n.outputs.items()
+                   if not is_none(f.negative_gradient[0])),
+            timesteps=self.timesteps)
+
+        # ########################### CONSTRAINTS #############################
+        for group in self._constraint_groups:
+            builder = self.BUILDERS.get(group)
+            if builder is None:
+                raise ValueError(
+                    "No matrix builder for constraint group {0}.".format(
+                        group.__name__))
+            builder(self, self.es.groups.get(group))
+
+        self._assemble()
+
+    def _set_flow_bounds(self, o, i, f):
+        """ Sets bounds and fixed values of the flow variable like
+        :meth:`OperationalModel._set_flow_bounds`.
+        """
+        if f.nominal_value is None:
+            return
+        local = self.flow.local((o, i))
+        length = len(self.timesteps)
+        if f.fixed:
+            self.flow.value[local] = (sequence_array(f.actual_value, length) *
+                                      f.nominal_value)
+        if f.binary is None:
+            self.flow.lower[local] = (sequence_array(f.min, length) *
+                                      f.nominal_value)
+            self.flow.upper[local] = (sequence_array(f.max, length) *
+                                      f.nominal_value)
+
+    def add_variable(self, name, keys, timesteps=None, **kwargs):
+        """ Adds a variable indexed by `keys` (and `timesteps`) and returns
+        it. Keyword arguments are passed to :class:`_Variable`.
+        """
+        variable = _Variable(name, keys, self._size, timesteps=timesteps,
+                             **kwargs)
+        self._size += variable.size
+        self.variables[name] = variable
+        return variable
+
+    def add_constraint(self, name, sense):
+        """ Adds an (empty) constraint with sense '==', '<=' or '>=' and
+        returns it. Rows have to be added in the sorted order of their index.
+        """
+        constraint = _Constraint(name, sense)
+        self.constraints.append(constraint)
+        return constraint
+
+    def add_objective_terms(self, columns, coefficients):
+        """ Adds the terms `coefficient * column` to the objective.
+        """
+        self._objective.append(
+            [np.ravel(a) for a in np.broadcast_arrays(columns, coefficients)])
+
+    def _assemble(self):
+        """ Assembles constraint matrix, bounds and costs from the variables,
+        constraints and objective terms.
+        """
+        variables = list(self.variables.values())
+        self.lower = np.concatenate([v.lower for v in variables])
+        self.upper = np.concatenate([v.upper for v in variables])
+        value = np.concatenate([v.value for v in variables])
+        fixed = ~np.isnan(value)
+
+        offsets = np.cumsum([0] + [c.size for c in self.constraints])
+        triplets = [(rows + offset, cols, values)
+                    for c, offset in zip(self.constraints, offsets)
+                    for rows, cols, values in c.triplets]
+        rows, cols, values = (
+            np.concatenate([t[i] for t in triplets] + [np.empty(0)])
+            for i in range(3))
+        rows, cols = rows.astype(int), cols.astype(int)
+        for constraint in self.constraints:
+            constraint.triplets = []
+        self.senses = np.concatenate(
+            [np.repeat(c.sense, c.size) for c in self.constraints] +
+            [np.empty(0, dtype='<U2')])
+        rhs = np.concatenate([r for c in self.constraints for r in c.rhs] +
+                             [np.empty(0)])
+
+        # pyomo drops terms with a coefficient of zero, fixed columns are
+        # constants which are moved to the right-hand side
+        nonzero = values != 0
+        rows, cols, values = rows[nonzero], cols[nonzero], values[nonzero]
+        constant = fixed[cols]
+        self.rhs = rhs - np.bincount(
+            rows[constant], weights=values[constant] * value[cols[constant]],
+            minlength=len(rhs))
+        self.rows, self.columns, self.coefficients = _combine(
+            rows[~constant], cols[~constant], values[~constant])
+
+        cols, values = (np.concatenate([t[i] for t in self._objective] +
+                                       [np.empty(0)]) for i in range(2))
+        cols = cols.astype(int)
+        nonzero = values != 0
+        cols, values = cols[nonzero], values[nonzero]
+        constant = fixed[cols]
+        self.objective_constant += float(np.sum(
+            values[constant] * value[cols[constant]]))
+        _, self._objective_columns, objective = _combine(
+            np.zeros(len(cols[~constant]), dtype=int), cols[~constant],
+            values[~constant])
+        self.costs = np.zeros(self._size)
+        self.costs[self._objective_columns] = objective
+
+        self.used = np.zeros(self._size, dtype=bool)
+        self.used[self.columns] = True
+        self.used[self._objective_columns] = True
+
+    def _column_labels(self):
+        return [label for v in self.variables.values() for label in v.labels()]
+
+    def write(self, filename, format=None):
+        """ Writes the model to the file `filename`.
+
+        Parameters
+        ----------
+        filename : str
+            Path of the file.
+        format : str
+            'lp' or 'mps'. Defaults to 'mps' for files ending with '.mps' and
+            to 'lp' otherwise.
+        """
+        if format is None:
+            format = 'mps' if filename.lower().endswith('.mps') else 'lp'
+        writers = {'lp': self._write_lp, 'mps': self._write_mps}
+        if format not in writers:
+            raise ValueError("Unknown file format: {0}".format(format))
+        with open(filename, 'w') as output:
+            writers[format](output)
+        return filename
+
+    def _write_lp(self, output):
+        labels = self._column_labels()
+        rank = np.empty(len(labels), dtype=int)
+        rank[sorted(range(len(labels)), key=labels.__getitem__)] = np.arange(
+            len(labels))
+
+        # the header is the one written by pyomo, so files of both backends
+        # can be compared directly
+        output.write("\\* Source Pyomo model name={0} *\\\n\n".format(
+            self.name))
+        output.write("min \nobjective:\n")
+        columns = self._objective_columns[
+            np.argsort(rank[self._objective_columns], kind='mergesort')]
+        output.writelines("%+.17g %s\n" % (self.costs[c], labels[c])
+                          for c in columns.tolist())
+        if self.objective_constant != 0 or len(columns) == 0:
+            output.write("%+.17g ONE_VAR_CONSTANT\n" % self.objective_constant)
+        output.write("\ns.t.\n\n")
+
+        order = np.lexsort((rank[self.columns], self.rows))
+        columns, values = self.columns[order], self.coefficients[order]
+        bounds = np.searchsorted(self.rows[order],
+                                 np.arange(len(self.rhs) + 1))
+        row = 0
+        for constraint in self.constraints:
+            prefix, sense = _LP_SENSES[constraint.sense]
+            # terms are formatted constraint by constraint to limit memory
+            start = bounds[row]
+            terms = ["%+.17g %s\n" % (value, labels[c]) for value, c in zip(
+                values[start:bounds[row + constraint.size]].tolist(),
+                columns[start:bounds[row + constraint.size]].tolist())]
+            for label in constraint.labels():
+                output.write("{0}{1}_:\n".format(prefix, label))
+                output.writelines(
+                    terms[bounds[row] - start:bounds[row + 1] - start] or
+                    ["+0 ONE_VAR_CONSTANT\n"])
+                output.write("{0} {1}\n\n".format(sense,
+                                                  _number(self.rhs[row])))
+                row += 1
+
+        output.write("c_e_ONE_VAR_CONSTANT: \nONE_VAR_CONSTANT = 1.0\n\n")
+
+        output.write("bounds\n")
+        used = np.flatnonzero(self.used)
+        for c, lower, upper in zip(used.tolist(), self.lower[used].tolist(),
+                                   self.upper[used].tolist()):
+            output.write("   {0} <= {1} <= {2}\n".format(
+                "-inf" if lower == -np.inf else _number(lower), labels[c],
+                "+inf" if upper == np.inf else _number(upper)))
+        for section, domain in [('general', 'integer'), ('binary', 'binary')]:
+            names = [labels[c] for c in self._domain_columns(domain)]
+            if names:
+                output.write(section + "\n")
+                output.writelines("  {0}\n".format(name) for name in names)
+        output.write("end\n")
+
+    def _write_mps(self, output):
+        labels = self._column_labels()
+        row_labels = [prefix + label + "_" for constraint in self.constraints
+                      for prefix in [_LP_SENSES[constraint.sense][0]]
+                      for label in constraint.labels()]
+
+        output.write("* Source:     oemof.solph MatrixModel\n"
+                     "* Format:     Free MPS\n*\n")
+        output.write("NAME {0}\nOBJSENSE\n    MIN\nROWS\n"
+                     " N  objective\n".format(self.name))
+        output.writelines(" {0}  {1}\n".format(_MPS_SENSES[sense], label)
+                          for sense, label in zip(self.senses, row_labels))
+        output.write(" E  c_e_ONE_VAR_CONSTANT\n")
+
+        output.write("COLUMNS\n")
+        order = np.lexsort((self.rows, self.columns))
+        rows, values = self.rows[order].tolist(), self.coefficients[order]
+        bounds = np.searchsorted(self.columns[order],
+                                 np.arange(self._size + 1))
+        integer = np.zeros(self._size, dtype=bool)
+        integer[self._domain_columns('integer')] = True
+        integer[self._domain_columns('binary')] = True
+        marker = False
+        for c in np.flatnonzero(self.used).tolist():
+            if integer[c] != marker:
+                marker = integer[c]
+                output.write("    MARKER 'MARKER' '{0}'\n".format(
+                    'INTORG' if marker else 'INTEND'))
+            if self.costs[c] != 0:
+                output.write("    {0} objective {1}\n".format(
+                    labels[c], _number(self.costs[c])))
+            output.writelines(
+                "    {0} {1} {2}\n".format(labels[c], row_labels[r],
+                                           _number(v))
+                for r, v in zip(rows[bounds[c]:bounds[c + 1]],
+                                values[bounds[c]:bounds[c + 1]].tolist()))
+        if marker:
+            output.write("    MARKER 'MARKER' 'INTEND'\n")
+        output.write("    ONE_VAR_CONSTANT objective {0}\n".format(
+            _number(self.objective_constant)))
+        output.write("    ONE_VAR_CONSTANT c_e_ONE_VAR_CONSTANT 1\n")
+
+        output.write("RHS\n")
+        output.writelines("    RHS {0} {1}\n".format(row_labels[r],
+                                                     _number(self.rhs[r]))
+                          for r in np.flatnonzero(self.rhs).tolist())
+        output.write("    RHS c_e_ONE_VAR_CONSTANT 1\n")
+
+        output.write("BOUNDS\n")
+        binary = np.zeros(self._size, dtype=bool)
+        binary[self._domain_columns('binary')] = True
+        for c in np.flatnonzero(self.used).tolist():
+            lower, upper = self.lower[c], self.upper[c]
+            if binary[c]:
+                output.write(" BV BOUND {0}\n".format(labels[c]))
+            elif lower == upper:
+                output.write(" FX BOUND {0} {1}\n".format(labels[c],
+                                                          _number(lower)))
+            else:
+                if lower == -np.inf:
+                    output.write(" MI BOUND {0}\n".format(labels[c]))
+                elif lower != 0:
+                    output.write(" LO BOUND {0} {1}\n".format(
+                        labels[c], _number(lower)))
+                if upper != np.inf:
+                    output.write(" UP BOUND {0} {1}\n".format(
+                        labels[c], _number(upper)))
+                elif integer[c]:
+                    output.write(" PL BOUND {0}\n".format(labels[c]))
+        output.write("ENDATA\n")
+
+    def _domain_columns(self, domain):
+        """ Returns the used columns of all variables of the given domain.
+        """
+        columns = [np.arange(v.offset, v.offset + v.size)
+                   for v in self.variables.values() if v.domain == domain]
+        columns = np.concatenate(columns + [np.empty(0, dtype=int)])
+        return columns[self.used[columns]]
+
+
+def _combine(rows, cols, values):
+    """ Sorts COO triplets by row and column and sums up the values of
+    duplicate entries.
+    """
+    order = np.lexsort((cols, rows))
+    rows, cols, values = rows[order], cols[order], values[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+    starts = np.flatnonzero(first)
+    if len(starts) == len(rows):
+        return rows, cols, values
+    return rows[starts], cols[starts], np.add.reduceat(values, starts)
+
+
+def _flow_keys(group):
+    """ Returns the `(source, target, flow)` tuples of a group sorted by
+    source and target.
+    """
+    return sorted(group, key=lambda stf: stf[:2])
+
+
+# #############################################################################
+#
+# Matrix builders for the blocks in oemof.solph.blocks
+#
+# #############################################################################
+
+def _bus(m, group):
+    """ Bus balance, see :class:`~oemof.solph.blocks.Bus`.
+    """
+    if group is None:
+        return None
+
+    balance = m.add_constraint('Bus.balance', '==')
+    for n in sorted(group):
+        if not len(n.inputs) and not len(n.outputs):
+            continue
+        rows = balance.add_rows((n,), m.timesteps)
+        for i in n.inputs:
+            balance.add_terms(rows, m.flow.columns((i, n)), m.timeincrement)
+        # a bus without inputs is written as `outputs == 0` by pyomo
+        sign = -1 if len(n.inputs) else 1
+        for o in n.outputs:
+            balance.add_terms(rows, m.flow.columns((n, o)),
+                              sign * m.timeincrement)
+
+
+def _linear_transformer(m, group):
+    """ Linear relation, see :class:`~oemof.solph.blocks.LinearTransformer`.
+    """
+    if group is None:
+        return None
+
+    length = len(m.timesteps)
+    relation = m.add_constraint('LinearTransformer.relation', '==')
+    for n in sorted(group):
+        i = [i for i in n.inputs][0]
+        for o in sorted(n.outputs):
+            try:
+                conversion_factor = sequence_array(n.conversion_factors[o],
+                                                   length)
+            except KeyError:
+                raise ValueError("Error in constraint creation",
+                                 "source: {0}, target: {1}".format(
+                                     n.label, o.label))
+            rows = relation.add_rows((n, o), m.timesteps)
+            relation.add_terms(rows, m.flow.columns((i, n)),
+                               conversion_factor)
+            relation.add_terms(rows, m.flow.columns((n, o)), -1)
+
+
+def _linear_n1_transformer(m, group):
+    """ Linear relation, see :class:`~oemof.solph.blocks.LinearN1Transformer`.
+    """
+    if group is None:
+        return None
+
+    length = len(m.timesteps)
+    relation = m.add_constraint('LinearN1Transformer.relation', '==')
+    for n in sorted(group):
+        o = [o for o in n.outputs][0]
+        for i in sorted(n.inputs):
+            try:
+                conversion_factor = sequence_array(n.conversion_factors[i],
+                                                   length)
+            except KeyError:
+                raise ValueError("Error in constraint creation",
+                                 "source: {0}, target: {1}".format(
+                                     i.label, n.label))
+            rows = relation.add_rows((n, i), m.timesteps)
+            relation.add_terms(rows, m.flow.columns((n, o)), 1)
+            relation.add_terms(rows, m.flow.columns((i, n)),
+                               -conversion_factor)
+
+
+def _variable_fraction_transformer(m, group):
+    """ Input/output relations, see
+    :class:`~oemof.solph.blocks.VariableFractionTransformer`.
+    """
+    if group is None:
+        return None
+
+    length = len(m.timesteps)
+    input_output = m.add_constraint(
+        'VariableFractionTransformer.input_output_relation', '==')
+    # `main >= tapped * index` is written as `tapped * index - main <= 0`
+    out_flow = m.add_constraint(
+        'VariableFractionTransformer.out_flow_relation', '<=')
+    for n in sorted(group):
+        inflow = list(n.inputs)[0]
+        label_main_flow = str(list(n.conversion_factor_single_flow)[0])
+        main_output = [o for o in n.outputs if label_main_flow == o.label][0]
+        tapped_output = [o for o in n.outputs
+                         if label_main_flow != o.label][0]
+        single_flow = sequence_array(
+            n.conversion_factor_single_flow[main_output], length)
+        main = sequence_array(n.conversion_factors[main_output], length)
+        tapped = sequence_array(n.conversion_factors[tapped_output], length)
+        flow_relation_index = main / tapped
+        main_flow_loss_index = (single_flow - main) / tapped
+
+        rows = input_output.add_rows((n,), m.timesteps)
+        input_output.add_terms(rows, m.flow.columns((inflow, n)), 1)
+        input_output.add_terms(rows, m.flow.columns((n, main_output)),
+                               -1 / single_flow)
+        input_output.add_terms(rows, m.flow.columns((n, tapped_output)),
+                               -main_flow_loss_index / single_flow)
+
+        rows = out_flow.add_rows((n,), m.timesteps)
+        out_flow.add_terms(rows, m.flow.columns((n, main_output)), -1)
+        out_flow.add_terms(rows, m.flow.columns((n, tapped_output)),
+                           flow_relation_index)
+
+
+def _storage_balance(m, balance, capacity, n):
+    """ Adds the storage balance rows of storage `n` to `balance`.
+    """
+    length = len(m.timesteps)
+    i = [i for i in n.inputs][0]
+    o = [o for o in n.outputs][0]
+    columns = capacity.columns((n,))
+    previous = np.array([m.timesteps[-1]] + list(m.timesteps[:-1]))
+
+    rows = balance.add_rows((n,), m.timesteps)
+    balance.add_terms(rows, columns, 1)
+    balance.add_terms(rows, columns[previous],
+                      -(1 - sequence_array(n.capacity_loss, length)))
+    balance.add_terms(rows, m.flow.columns((i, n)),
+                      -sequence_array(n.inflow_conversion_factor, length) *
+                      m.timeincrement)
+    balance.add_terms(rows, m.flow.columns((n, o)),
+                      1 / sequence_array(n.outflow_conversion_factor, length) *
+                      m.timeincrement)
+
+
+def _storage(m, group):
+    """ Storage balance and capacity bounds, see
+    :class:`~oemof.solph.blocks.Storage`.
+    """
+    if group is None:
+        return None
+
+    length = len(m.timesteps)
+    storages = sorted(group)
+    capacity = m.add_variable('Storage.capacity', [(n,) for n in storages],
+                              timesteps=m.timesteps)
+    for n in storages:
+        local = capacity.local((n,))
+        capacity.lower[local] = n.nominal_capacity * sequence_array(
+            n.capacity_min, length)
+        capacity.upper[local] = n.nominal_capacity * sequence_array(
+            n.capacity_max, length)
+        if n.initial_capacity is not None:
+            capacity.value[local][-1] = (n.initial_capacity *
+                                         n.nominal_capacity)
+        if n.fixed_costs is not None:
+            m.objective_constant += n.nominal_capacity * n.fixed_costs
+
+    balance = m.add_constraint('Storage.balance', '==')
+    for n in storages:
+        _storage_balance(m, balance, capacity, n)
+
+
+def _investment_storage(m, group):
+    """ Storage balance and invest constraints, see
+    :class:`~oemof.solph.blocks.InvestmentStorage`.
+    """
+    if group is None:
+        return None
+
+    length = len(m.timesteps)
+    storages = sorted(group)
+    capacity = m.add_variable('InvestmentStorage.capacity',
+                              [(n,) for n in storages], timesteps=m.timesteps)
+    invest = m.add_variable('InvestmentStorage.invest',
+                            [(n,) for n in storages])
+    invest.upper[:] = [n.investment.maximum for n in storages]
+    invest_flow = m.variables['InvestmentFlow.invest']
+
+    balance = m.add_constraint('InvestmentStorage.balance', '==')
+    for n in storages:
+        _storage_balance(m, balance, capacity, n)
+
+    initial_capacity = m.add_constraint('InvestmentStorage.initial_capacity',
+                                        '==')
+    for n in storages:
+        if n.initial_capacity is not None:
+            row = initial_capacity.add_rows((n,))
+            initial_capacity.add_terms(row, capacity.columns((n,))[-1], 1)
+            initial_capacity.add_terms(row, invest.columns((n,)),
+                                       -n.initial_capacity)
+
+    inflow = m.add_constraint('InvestmentStorage.storage_capacity_inflow',
+                              '==')
+    outflow = m.add_constraint('InvestmentStorage.storage_capacity_outflow',
+                               '==')
+    for n in storages:
+        i = [i for i in n.inputs][0]
+        o = [o for o in n.outputs][0]
+        row = inflow.add_rows((n,))
+        inflow.add_terms(row, invest_flow.columns((i, n)), 1)
+        inflow.add_terms(row, invest.columns((n,)),
+                         -n.nominal_input_capacity_ratio)
+    for n in storages:
+        o = [o for o in n.outputs][0]
+        row = outflow.add_rows((n,))
+        outflow.add_terms(row, invest_flow.columns((n, o)), 1)
+        outflow.add_terms(row, invest.columns((n,)),
+                          -n.nominal_output_capacity_ratio)
+
+    max_capacity = m.add_constraint('InvestmentStorage.max_capacity', '<=')
+    for n in storages:
+        rows = max_capacity.add_rows((n,), m.timesteps)
+        max_capacity.add_terms(rows, capacity.columns((n,)), 1)
+        max_capacity.add_terms(rows, invest.columns((n,)),
+                               -sequence_array(n.capacity_max, length))
+
+    min_capacity = m.add_constraint('InvestmentStorage.min_capacity', '<=')
+    for n in storages:
+        capacity_min = sequence_array(n.capacity_min, length)
+        if capacity_min.sum() > 0:
+            rows = min_capacity.add_rows((n,), m.timesteps)
+            min_capacity.add_terms(rows, capacity.columns((n,)), -1)
+            min_capacity.add_terms(rows, invest.columns((n,)), capacity_min)
+
+    for n in storages:
+        if n.investment.ep_costs is None:
+            raise ValueError("Missing value for investment costs!")
+        m.add_objective_terms(invest.columns((n,)), n.investment.ep_costs)
+        if n.fixed_costs is not None:
+            m.add_objective_terms(invest.columns((n,)), n.fixed_costs)
+
+
+def _flow(m, group):
+    """ Summed flow and gradient constraints and costs of all flows, see
+    :class:`~oemof.solph.blocks.Flow`.
+    """
+    length = len(m.timesteps)
+    for (i, o), f in m.flows.items():
+        if not is_none(f.variable_costs[0]):
+            m.add_objective_terms(
+                m.flow.columns((i, o)),
+                m.timeincrement * sequence_array(f.variable_costs, length))
+        if f.fixed_costs and f.nominal_value is not None:
+            m.objective_constant += f.nominal_value * f.fixed_costs
+
+    if group is None:
+        return None
+
+    flows = _flow_keys(group)
+    for i, o, f in flows:
+        if not is_none(f.positive_gradient[0]):
+            m.positive_flow_gradient.upper[
+                m.positive_flow_gradient.local((i, o))] = (
+                    sequence_array(f.positive_gradient, length) *
+                    f.nominal_value)
+        if not is_none(f.negative_gradient[0]):
+            m.negative_flow_gradient.upper[
+                m.negative_flow_gradient.local((i, o))] = (
+                    sequence_array(f.negative_gradient, length) *
+                    f.nominal_value)
+
+    summed_max = m.add_constraint('Flow.summed_max', '<=')
+    summed_min = m.add_constraint('Flow.summed_min', '>=')
+    for constraint, attribute in [(summed_max, 'summed_max'),
+                                  (summed_min, 'summed_min')]:
+        for i, o, f in flows:
+            if getattr(f, attribute) is not None and (
+                    f.nominal_value is not None):
+                row = constraint.add_rows(
+                    (i, o), rhs=getattr(f, attribute) * f.nominal_value)
+                constraint.add_terms(row, m.flow.columns((i, o)),
+                                     m.timeincrement)
+
+    steps = m.timesteps[1:]
+    for name, variable, sign in [
+            ('Flow.positive_gradient_constr', m.positive_flow_gradient, 1),
+            ('Flow.negative_gradient_constr', m.negative_flow_gradient, -1)]:
+        gradient = m.add_constraint(name, '<=')
+        for i, o, f in flows:
+            if (i, o) in variable.positions:
+                rows = gradient.add_rows((i, o), steps)
+                columns = m.flow.columns((i, o))
+                gradient.add_terms(rows, columns[1:], sign)
+                gradient.add_terms(rows, columns[:-1], -sign)
+                gradient.add_terms(rows, variable.columns((i, o))[1:], -1)
+
+
+def _investment_flow(m, group):
+    """ Invest variables and constraints, see
+    :class:`~oemof.solph.blocks.InvestmentFlow`.
+    """
+    if group is None:
+        return None
+
+    length = len(m.timesteps)
+    flows = _flow_keys(group)
+    invest = m.add_variable('InvestmentFlow.invest',
+                            [(i, o) for i, o, f in flows])
+    invest.lower[:] = [f.investment.minimum for i, o, f in flows]
+    invest.upper[:] = [f.investment.maximum for i, o, f in flows]
+
+    fixed = m.add_constraint('InvestmentFlow.fixed', '==')
+    for i, o, f in flows:
+        if f.fixed:
+            rows = fixed.add_rows((i, o), m.timesteps)
+            fixed.add_terms(rows, m.flow.columns((i, o)), 1)
+            fixed.add_terms(rows, invest.columns((i, o)),
+                            -sequence_array(f.actual_value, length))
+
+    maximum = m.add_constraint('InvestmentFlow.max', '<=')
+    for i, o, f in flows:
+        rows = maximum.add_rows((i, o), m.timesteps)
+        maximum.add_terms(rows, m.flow.columns((i, o)), 1)
+        maximum.add_terms(rows, invest.columns((i, o)),
+                          -sequence_array(f.max, length))
+
+    minimum = m.add_constraint('InvestmentFlow.min', '<=')
+    for i, o, f in flows:
+        flow_min = sequence_array(f.min, length)
+        if flow_min.sum() > 0:
+            rows = minimum.add_rows((i, o), m.timesteps)
+            minimum.add_terms(rows, m.flow.columns((i, o)), -1)
+            minimum.add_terms(rows, invest.columns((i, o)), flow_min)
+
+    summed_max = m.add_constraint('InvestmentFlow.summed_max', '<=')
+    for i, o, f in flows:
+        if f.summed_max is not None:
+            row = summed_max.add_rows((i, o))
+            summed_max.add_terms(row, m.flow.columns((i, o)), m.timeincrement)
+            summed_max.add_terms(row, invest.columns((i, o)), -f.summed_max)
+
+    summed_min = m.add_constraint('InvestmentFlow.summed_min', '<=')
+    for i, o, f in flows:
+        if f.summed_min is not None:
+            row = summed_min.add_rows((i, o))
+            summed_min.add_terms(row, m.flow.columns((i, o)),
+                                 -m.timeincrement)
+            summed_min.add_terms(row, invest.columns((i, o)), f.summed_min)
+
+    for i, o, f in flows:
+        if f.fixed_costs is not None:
+            m.add_objective_terms(invest.columns((i, o)), f.fixed_costs)
+        if f.investment.ep_costs is None:
+            raise ValueError("Missing value for investment costs!")
+        m.add_objective_terms(invest.columns((i, o)), f.investment.ep_costs)
+
+
+def _binary_flow(m, group):
+    """ Status, startup and shutdown constraints, see
+    :class:`~oemof.solph.blocks.BinaryFlow`.
+    """
+    if group is None:
+        return None
+
+    length = len(m.timesteps)
+    flows = _flow_keys(group)
+    min_flows = [(i, o, f) for i, o, f in flows
+                 if sequence_array(f.min, length).sum() > 0]
+    startup_flows = [(i, o, f) for i, o, f in flows
+                     if f.binary.startup_costs is not None]
+    shutdown_flows = [(i, o, f) for i, o, f in flows
+                      if f.binary.shutdown_costs is not None]
+
+    status = m.add_variable('BinaryFlow.status',
+                            [(i, o) for i, o, f in flows],
+                            timesteps=m.timesteps, upper=1, domain='binary')
+    startup = m.add_variable('BinaryFlow.startup',
+                             [(i, o) for i, o, f in startup_flows],
+                             timesteps=m.timesteps, upper=1, domain='binary')
+    shutdown = m.add_variable('BinaryFlow.shutdown',
+                              [(i, o) for i, o, f in shutdown_flows],
+                              timesteps=m.timesteps, upper=1,
+                              domain='binary')
+
+    minimum = m.add_constraint('BinaryFlow.min', '<=')
+    for i, o, f in min_flows:
+        rows = minimum.add_rows((i, o), m.timesteps)
+        minimum.add_terms(rows, status.columns((i, o)),
+                          sequence_array(f.min, length) * f.nominal_value)
+        minimum.add_terms(rows, m.flow.columns((i, o)), -1)
+
+    maximum = m.add_constraint('BinaryFlow.max', '<=')
+    for i, o, f in min_flows:
+        rows = maximum.add_rows((i, o), m.timesteps)
+        maximum.add_terms(rows, m.flow.columns((i, o)), 1)
+        maximum.add_terms(rows, status.columns((i, o)),
+                          -sequence_array(f.max, length) * f.nominal_value)
+
+    startup_constr = m.add_constraint('BinaryFlow.startup_constr', '<=')
+    for i, o, f in startup_flows:
+        rhs = np.zeros(length)
+        rhs[0] = f.binary.initial_status
+        rows = startup_constr.add_rows((i, o), m.timesteps, rhs=rhs)
+        columns = status.columns((i, o))
+        startup_constr.add_terms(rows, columns, 1)
+        startup_constr.add_terms(rows[1:], columns[:-1], -1)
+        startup_constr.add_terms(rows, startup.columns((i, o)), -1)
+
+    shutdown_constr = m.add_constraint('BinaryFlow.shutdown_constr', '<=')
+    for i, o, f in shutdown_flows:
+        rhs = np.zeros(length)
+        rhs[0] = -f.binary.initial_status
+        rows = shutdown_constr.add_rows((i, o), m.timesteps, rhs=rhs)
+        columns = status.columns((i, o))
+        shutdown_constr.add_terms(rows[1:], columns[:-1], 1)
+        shutdown_constr.add_terms(rows, columns, -1)
+        shutdown_constr.add_terms(rows, shutdown.columns((i, o)), -1)
+
+    for i, o, f in startup_flows:
+        m.add_objective_terms(startup.columns((i, o)),
+                              f.binary.startup_costs)
+    for i, o, f in shutdown_flows:
+        m.add_objective_terms(shutdown.columns((i, o)),
+                              f.binary.shutdown_costs)
+
+
+def _discrete_flow(m, group):
+    """ Integer flows, see :class:`~oemof.solph.blocks.DiscreteFlow`.
+    """
+    if group is None:
+        return None
+
+    flows = _flow_keys(group)
+    discrete_flow = m.add_variable('DiscreteFlow.discrete_flow',
+                                   [(i, o) for i, o, f in flows],
+                                   timesteps=m.timesteps, domain='integer')
+    integer_flow = m.add_constraint('DiscreteFlow.integer_flow', '==')
+    for i, o, f in flows:
+        rows = integer_flow.add_rows((i, o), m.timesteps)
+        integer_flow.add_terms(rows, discrete_flow.columns((i, o)), 1)
+        integer_flow.add_terms(rows, m.flow.columns((i, o)), -1)
+
+
+MatrixModel.BUILDERS = {
+    blocks.Bus: _bus,
+    blocks.LinearTransformer: _linear_transformer,
+    blocks.LinearN1Transformer: _linear_n1_transformer,
+    blocks.VariableFractionTransformer: _variable_fraction_transformer,
+    blocks.Storage: _storage,
+    blocks.InvestmentFlow: _investment_flow,
+    blocks.InvestmentStorage: _investment_storage,
+    blocks.Flow: _flow,
+    blocks.BinaryFlow: _binary_flow,
+    blocks.DiscreteFlow: _discrete_flow}
+""" dict: Builders emitting the matrix coefficients of each constraint group.
+
+A builder is called with the :class:`MatrixModel` and the group of the energy
+system (or `None` if the energy system has no such group).
+"""
@@ -4,17 +4,29 @@
 """
 
 from collections import UserDict, UserList
+from contextlib import contextmanager
 from itertools import groupby
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
 import pyomo.environ as po
 from pyomo.opt import SolverFactory
 from pyomo.core.plugins.transform.relax_integrality import RelaxIntegrality
 from .network import Storage
 from oemof.solph import blocks
+from .blocks import quicksum
 from .options import Investment
-from .plumbing import sequence
+from .plumbing import is_none, sequence, sequence_array
 from ..outputlib import result_dictionary
 import logging
 
+try:
+    from pyomo.core.expr.visitor import identify_variables
+except ImportError:
+    # pyomo < 5.6
+    from pyomo.core.base.expr import identify_variables
+
 # #############################################################################
 #
 # Solph Optimization Models
@@ -33,6 +45,32 @@ class OperationalModel(po.ConcreteModel):
         Solph looks for these groups in the given energy system and uses them
         to create the constraints of the optimization problem.
         Defaults to :const:`OperationalModel.CONSTRAINTS`
+    periodic : boolean
+        If True (default) the storage balance of the first timestep refers to
+        the capacity of the last timestep, which is fixed to the
+        `initial_capacity` of the storage. If False the balance of the first
+        timestep refers to the `initial_capacity` and the capacity of the last
+        timestep is free, as needed for consecutive time windows (see
+        :mod:`oemof.solph.rolling_horizon`). Storages with an investment
+        object are always periodic.
+    objective_weighting : numeric (sequence or scalar)
+        Weight of every timestep in the variable costs of the objective and
+        in the summed flow limits (`summed_max`, `summed_min`), e.g. the
+        number of periods a typical period represents (see
+        :mod:`oemof.solph.aggregation`). Defaults to 1.
+    presolve : boolean
+        If True, flows which are fixed or whose lower and upper bound are
+        equal (e.g. `max` is 0) are not created as variables for the
+        timesteps concerned. Their values are used as constants in the bus
+        balances, the relations of linear transformers and the objective
+        and are reconstructed in the results. Only flows of nodes with
+        these constraints and without gradients, summed limits, investment,
+        binary or discrete options are presolved. Defaults to False.
+    profile : boolean
+        If True, the wall time, the peak memory and the number of variables,
+        constraints and nonzeros of every step of the model construction are
+        recorded in :attr:`build_profile` (see :meth:`build_report`).
+        Tracing the memory slows down the construction. Defaults to False.
 
     **The following sets are created**:
 
@@ -53,10 +91,16 @@ class OperationalModel(po.ConcreteModel):
         A subset of set FLOWS with all flows where attribute
         `positive_gradient` is set.
 
+    FLOW_TIMESTEPS :
+        A 3 dimensional set with the `(source, target, timestep)` index of
+        all flow variables which are not presolved. Only created if the model
+        is presolved.
+
     **The following variables are created**:
 
     flow
-        Flow from source to target indexed by FLOWS, TIMESTEPS.
+        Flow from source to target indexed by FLOWS, TIMESTEPS (or by
+        FLOW_TIMESTEPS if the model is presolved).
         Note: Bounds of this variable are set depending on attributes of
         the corresponding flow object.
 
@@ -76,6 +120,11 @@ class OperationalModel(po.ConcreteModel):
                          blocks.InvestmentStorage, blocks.Flow,
                          blocks.BinaryFlow, blocks.DiscreteFlow]
 
+    UPDATABLE_ATTRIBUTES = ['actual_value', 'variable_costs', 'max']
+
+    # constraint groups which can handle presolved flows (see _presolve)
+    PRESOLVE_GROUPS = [blocks.Bus, blocks.LinearTransformer, blocks.Flow]
+
     def __init__(self, es, **kwargs):
         super().__init__()
 
@@ -86,8 +135,14 @@ class OperationalModel(po.ConcreteModel):
         self.timeindex = es.timeindex
         self.timesteps = range(len(self.timeindex))
         self.timeincrement = sequence(self.timeindex.freq.nanos / 3.6e12)
-
-        self._constraint_groups = (OperationalModel.CONSTRAINT_GROUPS +
+        self.periodic = kwargs.get('periodic', True)
+        self.objective_weighting = sequence(
+            kwargs.get('objective_weighting', 1))
+        self.presolve = kwargs.get('presolve', False)
+        self.profile = kwargs.get('profile', False)
+        self.build_profile = {}
+
+        self._constraint_groups = (type(self).CONSTRAINT_GROUPS +
                                    kwargs.get('constraint_groups', []))
 
         # dictionary with all flows containing flow objects as values und
@@ -117,79 +172,334 @@ class OperationalModel(po.ConcreteModel):
         self.NEGATIVE_GRADIENT_FLOWS = po.Set(
             initialize=[(n, t) for n in self.es.nodes
                         for (t, f) in n.outputs.items()
-                        if f.negative_gradient[0] is not None],
+                        if not is_none(f.negative_gradient[0])],
             ordered=True, dimen=2)
 
         self.POSITIVE_GRADIENT_FLOWS = po.Set(
             initialize=[(n, t) for n in self.es.nodes
                         for (t, f) in n.outputs.items()
-                        if f.positive_gradient[0] is not None],
+                        if not is_none(f.positive_gradient[0])],
             ordered=True, dimen=2)
 
         # ######################### FLOW VARIABLE #############################
 
-        # non-negative pyomo variable for all existing flows in energysystem
-        self.flow = po.Var(self.FLOWS, self.TIMESTEPS,
-                           within=po.NonNegativeReals)
-
-        # loop over all flows and timesteps to set flow bounds / values
-        for (o, i) in self.FLOWS:
-            for t in self.TIMESTEPS:
-                if self.flows[o, i].actual_value[t] is not None and (
-                        self.flows[o, i].nominal_value is not None):
-                    # pre- optimized value of flow variable
-                    self.flow[o, i, t].value = (
-                        self.flows[o, i].actual_value[t] *
-                        self.flows[o, i].nominal_value)
-                    # fix variable if flow is fixed
-                    if self.flows[o, i].fixed:
-                        self.flow[o, i, t].fix()
-
-                if self.flows[o, i].nominal_value is not None and (
-                        self.flows[o, i].binary is None):
-                    # upper bound of flow variable
-                    self.flow[o, i, t].setub(self.flows[o, i].max[t] *
-                                             self.flows[o, i].nominal_value)
-                    # lower bound of flow variable
-                    self.flow[o, i, t].setlb(self.flows[o, i].min[t] *
-                                             self.flows[o, i].nominal_value)
-
-        self.positive_flow_gradient = po.Var(self.POSITIVE_GRADIENT_FLOWS,
-                                             self.TIMESTEPS,
-                                             within=po.NonNegativeReals)
-
-        self.negative_flow_gradient = po.Var(self.NEGATIVE_GRADIENT_FLOWS,
-                                             self.TIMESTEPS,
-                                             within=po.NonNegativeReals)
+        with self._profiled('flow'):
+            # values of fixed or trivially bounded flows, which are no
+            # variables, nan where the flow is a variable
+            self.presolved_flows = {}
+            if self.presolve:
+                self.presolved_flows = self._presolve()
+                self.FLOW_TIMESTEPS = po.Set(
+                    initialize=[(o, i, t) for (o, i) in self.FLOWS
+                                for t in self._flow_timesteps(o, i)],
+                    ordered=True, dimen=3)
+                self.flow = po.Var(self.FLOW_TIMESTEPS,
+                                   within=po.NonNegativeReals)
+            else:
+                # non-negative pyomo variable for all existing flows
+                self.flow = po.Var(self.FLOWS, self.TIMESTEPS,
+                                   within=po.NonNegativeReals)
+
+            # set bounds, values and fix flags of the flow variable flow by
+            # flow
+            for (o, i) in self.FLOWS:
+                self._set_flow_bounds(o, i)
+
+            self.positive_flow_gradient = po.Var(
+                self.POSITIVE_GRADIENT_FLOWS, self.TIMESTEPS,
+                within=po.NonNegativeReals)
+
+            self.negative_flow_gradient = po.Var(
+                self.NEGATIVE_GRADIENT_FLOWS, self.TIMESTEPS,
+                within=po.NonNegativeReals)
 
         # ########################### CONSTRAINTS #############################
         # loop over all constraint groups to add constraints to the model
         for group in self._constraint_groups:
             # create instance for block
             block = group()
-            # Add block to model
-            self.add_component(str(block), block)
-            # create constraints etc. related with block for all nodes
-            # in the group
-            block._create(group=self.es.groups.get(group))
+            with self._profiled(str(block)):
+                # Add block to model
+                self.add_component(str(block), block)
+                # create constraints etc. related with block for all nodes
+                # in the group
+                block._create(group=self.es.groups.get(group))
 
         # ########################### Objective ###############################
-        self.objective_function()
+        with self._profiled('objective'):
+            self.objective_function()
+
+        if self.profile:
+            logging.debug("Model construction:\n{0}".format(
+                self.build_report()))
+
+    @contextmanager
+    def _profiled(self, name):
+        """ Records wall time, peak memory and size of the components added
+        to the model within the context in :attr:`build_profile` under `name`
+        if the model is profiled.
+        """
+        if not self.profile:
+            yield
+            return
+        components = set(self.component_map())
+        # A trace started here begins with a peak of zero. The peak of a
+        # trace started elsewhere cannot be reset (before Python 3.9), so
+        # only a new peak reached within the context is recorded.
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        memory, peak_before = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+        if tracing and peak <= peak_before:
+            peak = max(current, memory)
+        peak -= memory
+
+        variables = []
+        constraints = []
+        objectives = []
+        for component_name, component in self.component_map().items():
+            if component_name in components:
+                continue
+            if isinstance(component, po.Block):
+                variables.extend(component.component_data_objects(po.Var))
+                constraints.extend(component.component_data_objects(
+                    po.Constraint, active=True))
+            elif isinstance(component, po.Var):
+                variables.extend(component.values())
+            elif isinstance(component, po.Constraint):
+                constraints.extend(component.values())
+            elif isinstance(component, po.Objective):
+                objectives.extend(component.values())
+        expressions = ([c.body for c in constraints] +
+                       [o.expr for o in objectives])
+        nonzeros = sum(
+            sum(1 for _ in identify_variables(expr, include_fixed=False))
+            for expr in expressions)
+        profile = {'seconds': seconds, 'memory': peak,
+                   'variables': len(variables),
+                   'constraints': len(constraints), 'nonzeros': nonzeros}
+        self.build_profile[name] = profile
+
+    def build_report(self, log=False):
+        """ Returns the :attr:`build_profile` of a profiled model (see the
+        `profile` argument) as DataFrame with one row per construction step
+        and a 'total' row. Memory is given in MiB.
 
-    def objective_function(self, sense=po.minimize, update=False):
+        Parameters
+        ----------
+        log : boolean
+            If True, the report is logged with level INFO, e.g. to the handlers
+            set up by :func:`oemof.tools.logger.define_logging`.
         """
+        report = pd.DataFrame.from_dict(
+            self.build_profile, orient='index').reindex(
+                columns=['seconds', 'memory', 'variables', 'constraints',
+                         'nonzeros'])
+        report['memory'] /= 2 ** 20
+        report.loc['total'] = report.sum()
+        report.loc['total', 'memory'] = report['memory'].iloc[:-1].max()
+        sizes = ['variables', 'constraints', 'nonzeros']
+        report[sizes] = report[sizes].astype(int)
+        if log:
+            logging.info("Model construction:\n{0}".format(report))
+        return report
+
+    def _presolve_excluded(self):
+        """ Returns the nodes and `(source, target)` tuples of the flows
+        which are part of constraint groups not handling presolved flows.
         """
-        if update:
-            self.del_component('objective')
+        excluded = set()
+        for group in self._constraint_groups:
+            if group in self.PRESOLVE_GROUPS:
+                continue
+            for member in self.es.groups.get(group) or []:
+                excluded.add(member[:2] if isinstance(member, tuple)
+                             else member)
+        return excluded
+
+    def _presolve(self):
+        """ Returns the values of all flows which can be presolved as arrays
+        keyed by `(source, target)`, with nan for the timesteps in which the
+        flow remains a variable.
+        """
+        excluded = self._presolve_excluded()
+        length = len(self.timesteps)
+        presolved = {}
+        for (o, i), f in self.flows.items():
+            if (f.nominal_value is None or f.investment is not None or
+                    f.binary is not None or f.discrete is not None or
+                    f.summed_max is not None or f.summed_min is not None or
+                    not is_none(f.positive_gradient[0]) or
+                    not is_none(f.negative_gradient[0]) or
+                    o in excluded or i in excluded or (o, i) in excluded):
+                continue
+            lower = sequence_array(f.min, length) * f.nominal_value
+            upper = sequence_array(f.max, length) * f.nominal_value
+            values = np.where(lower == upper, upper, np.nan)
+            if f.fixed:
+                actual = (sequence_array(f.actual_value, length) *
+                          f.nominal_value)
+                values = np.where(np.isnan(actual), values, actual)
+            if not np.isnan(values).all():
+                presolved[o, i] = values
+        if presolved:
+            removed = sum(int(np.count_nonzero(~np.isnan(v)))
+                          for v in presolved.values())
+            logging.info("Presolve removed {0} of {1} flow variables.".format(
+                removed, len(self.flows) * length))
+        return presolved
+
+    def _flow_timesteps(self, o, i):
+        """ Returns the timesteps in which the flow from `o` to `i` is a
+        variable.
+        """
+        presolved = self.presolved_flows.get((o, i))
+        if presolved is None:
+            return list(self.timesteps)
+        return np.flatnonzero(np.isnan(presolved)).tolist()
+
+    def flow_expression(self, o, i, t):
+        """ Returns the flow variable from `o` to `i` in timestep `t` or its
+        value if the flow is presolved in this timestep.
+        """
+        presolved = self.presolved_flows.get((o, i))
+        if presolved is None or np.isnan(presolved[t]):
+            return self.flow[o, i, t]
+        return presolved[t].item()
+
+    def flow_values(self, o, i):
+        """ Returns the values of the flow from `o` to `i` in all timesteps
+        as numpy array, including the values of presolved timesteps. The model
+        has to be solved first.
+        """
+        values = self.presolved_flows.get((o, i))
+        if values is None:
+            values = np.full(len(self.timesteps), np.nan)
+        else:
+            values = values.copy()
+        timesteps = self._flow_timesteps(o, i)
+        values[timesteps] = [self.flow[o, i, t].value for t in timesteps]
+        return values
+
+    def _set_flow_bounds(self, o, i):
+        """ Sets bounds, values and fix flags of the flow variable of the flow
+        from `o` to `i` for all timesteps in one batch.
+
+        The attributes `min`, `max` and `actual_value` of the flow are
+        converted to numpy arrays once and multiplied with the
+        `nominal_value`, so the sequences are not indexed per timestep.
+        """
+        f = self.flows[o, i]
+        if f.nominal_value is None:
+            return
+
+        length = len(self.timesteps)
+        timesteps = self._flow_timesteps(o, i)
+        variables = [self.flow[o, i, t] for t in timesteps]
+
+        # pre- optimized value of flow variable, fixed if flow is fixed
+        values = (sequence_array(f.actual_value, length)[timesteps] *
+                  f.nominal_value)
+        for t in np.flatnonzero(~np.isnan(values)):
+            variables[t].value = values[t].item()
+            if f.fixed:
+                variables[t].fix()
+        if f.fixed:
+            # release variables fixed by a former call
+            for t in np.flatnonzero(np.isnan(values)):
+                variables[t].unfix()
+
+        if f.binary is None:
+            lower = (sequence_array(f.min, length)[timesteps] *
+                     f.nominal_value).tolist()
+            upper = (sequence_array(f.max, length)[timesteps] *
+                     f.nominal_value).tolist()
+            for var, lb, ub in zip(variables, lower, upper):
+                var.setlb(lb)
+                var.setub(ub)
+
+    def update_parameters(self, flows):
+        """ Updates time series of flows in the existing model, so the model
+        can be solved again without being rebuilt.
+
+        The new sequences are set as attributes of the flow objects. Bounds
+        and fixed values of the flow variable and the constraints depending
+        on them are updated in place, as well as the cost coefficients of the
+        objective. The objective is only rebuilt if a flow without variable
+        costs gets variable costs.
 
-        expr = 0
+        Parameters
+        ----------
+        flows : dict
+            Dictionary with the `(source, target)` tuples of the flows as keys
+            and dictionaries of the new sequences (or scalars) as values, e.g.
+            `{(wind, bel): {'actual_value': [0.2, 0.4, 0.3]}}`.
+            Attributes that can be updated are 'actual_value',
+            'variable_costs' and 'max'. The 'actual_value' and 'max' of
+            presolved flows can not be updated.
+        """
+        blocks = [block for block in self.component_data_objects(po.Block)
+                  if hasattr(block, '_update_flow')]
+        cost_blocks = [block for block in
+                       self.component_data_objects(po.Block)
+                       if hasattr(block, '_update_costs')]
+        update_objective = False
+
+        for (o, i), attributes in flows.items():
+            f = self.flows[o, i]
+            unknown = set(attributes) - set(self.UPDATABLE_ATTRIBUTES)
+            if unknown:
+                raise ValueError(
+                    "Attributes {0} of flow ({1}, {2}) can not be "
+                    "updated.".format(sorted(unknown), o, i))
+            if ((o, i) in self.presolved_flows and
+                    ('actual_value' in attributes or 'max' in attributes)):
+                raise ValueError(
+                    "Bounds of the presolved flow ({0}, {1}) can not be "
+                    "updated.".format(o, i))
+            for attribute, value in attributes.items():
+                setattr(f, attribute, sequence(value))
+
+            if 'variable_costs' in attributes and not any(
+                    block._update_costs(o, i) for block in cost_blocks):
+                update_objective = True
+            if 'actual_value' in attributes or 'max' in attributes:
+                self._set_flow_bounds(o, i)
+                for block in blocks:
+                    block._update_flow(o, i)
+
+        if update_objective:
+            self.objective_function(sense=self.objective.sense, update=True)
 
-        # Expression for investment flows
-        for block in self.component_data_objects():
-            if hasattr(block, '_objective_expression'):
-                expr += block._objective_expression()
+    def objective_function(self, sense=po.minimize, update=False):
+        """ Builds the objective from the expressions returned by the
+        `_objective_expression` methods of all blocks. An existing objective
+        is replaced if `update` is True.
+        """
+        if update:
+            self.del_component('objective')
 
-        self.objective = po.Objective(sense=sense, expr=expr)
+        terms = []
+
+        blocks = [block for block in self.component_data_objects()
+                  if hasattr(block, '_objective_expression')]
+        for block in blocks:
+            if update:
+                # cost components of the block are created again below
+                for name in block._cost_components:
+                    block.del_component(name)
+            components = set(block.component_map())
+            terms.append(block._objective_expression())
+            block._cost_components = set(block.component_map()) - components
+
+        # the expressions of the blocks are summed once, not term by term
+        self.objective = po.Objective(sense=sense, expr=quicksum(terms))
 
     def receive_duals(self):
         """ Method sets solver suffix to extract information about dual
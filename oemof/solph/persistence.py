@@ -0,0 +1,420 @@
+# -*- coding: utf-8 -*-
+"""Columnar binary persistence of solph energy systems.
+
+An energy system is stored as a few tables of numbers instead of a pickle of
+its objects:
+
+* a node table with the label and class of every node and one column per
+  attribute of the nodes,
+* a flow table with the source and target node of every flow and one column
+  per attribute of the flows,
+* a table of the dictionaries of sequences keyed by nodes (e.g. the
+  `conversion_factors` of transformers),
+* all sequences which are no scalars (:class:`.plumbing._Profile` objects)
+  concatenated to one contiguous float64 array.
+
+Every attribute column consists of a type code (e.g. None, float, constant
+sequence, profile) and a float64 value per row. Options like
+:class:`.Investment` or :class:`.BinaryFlow` get a column holding their class
+and one column per attribute of theirs.
+
+The tables are written either to a directory of `.npy` files and a
+`meta.json` file, whose profiles are memory-mapped on :func:`load`, or to one
+`.npz` file, which is read completely.
+
+Examples
+--------
+>>> import os, tempfile
+>>> import pandas as pd
+>>> from oemof.solph import Bus, EnergySystem, Flow, Sink
+>>> es = EnergySystem(timeindex=pd.date_range('1/1/2012', periods=3,
+...                                           freq='H'))
+>>> b = Bus(label='b')
+>>> d = Sink(label='d', inputs={b: Flow(nominal_value=2, fixed=True,
+...                                     actual_value=[1, 0.5, 0.2])})
+>>> path = os.path.join(tempfile.mkdtemp(), 'es')
+>>> save(es, path)
+>>> restored = load(path)
+>>> flow = restored.groups['d'].inputs[restored.groups['b']]
+>>> flow.nominal_value, list(flow.actual_value)
+(2, [1.0, 0.5, 0.2])
+
+"""
+from importlib import import_module
+import json
+import numbers
+import os
+import numpy as np
+import pandas as pd
+from oemof.network import flow as edges
+from .plumbing import _Profile, _Sequence
+
+
+FORMAT_VERSION = 1
+
+# type codes of the cells of the attribute columns
+ABSENT = 0
+NONE = 1
+FLOAT = 2
+INT = 3
+BOOL = 4
+STRING = 5
+CONSTANT_FLOAT = 6
+CONSTANT_INT = 7
+CONSTANT_NONE = 8
+PROFILE = 9
+OPTION = 10
+DICTIONARY = 11
+
+# attributes set on the nodes by the blocks when building a model, which are
+# not stored as they are recomputed on every build
+DERIVED_ATTRIBUTES = {'inflow', 'label_main_flow', 'main_output',
+                      'tapped_output', 'conversion_factor_single_flow_sq',
+                      'flow_relation_index', 'main_flow_loss_index'}
+
+
+def save(es, path):
+    """ Writes the nodes, flows and sequences of a solph energy system in a
+    columnar binary format.
+
+    Nodes and flows have to be created by classes which can be imported by
+    :func:`load` and their attributes have to be scalars, strings, sequences
+    (see :func:`.plumbing.sequence`), options whose attributes are scalars
+    or dictionaries of sequences keyed by nodes. Labels are stored as strings.
+    The results of the energy system and the attributes the blocks derive
+    when building a model (see :const:`DERIVED_ATTRIBUTES`) are not stored.
+
+    Parameters
+    ----------
+    es : EnergySystem object
+    path : str
+        Directory to create the files in. If `path` ends with `.npz`, one
+        compressed file is written instead.
+    """
+    writer = _Writer()
+    arrays = writer.tables(es)
+    meta = {'version': FORMAT_VERSION,
+            'energy_system': _class_name(type(es)),
+            'classes': writer.classes,
+            'strings': writer.strings,
+            'node_columns': writer.nodes.names,
+            'flow_columns': writer.flows.names,
+            'tz': None if es.timeindex.tz is None else str(es.timeindex.tz),
+            'freq': es.timeindex.freqstr}
+    if path.endswith('.npz'):
+        np.savez_compressed(path, meta=np.array(json.dumps(meta)), **arrays)
+        return
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, name + '.npy'), array)
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+
+def load(path, lazy=True, **kwargs):
+    r""" Creates an energy system from the files written by :func:`save`.
+
+    Parameters
+    ----------
+    path : str
+        Directory or `.npz` file written by :func:`save`.
+    lazy : boolean
+        If True, the arrays of a directory are memory-mapped (copy-on-write,
+        changes are not written back) and the profiles are views of them, so
+        the values of a profile are read from disk on first access.
+    \**kwargs : keyword arguments
+        Passed to the constructor of the energy system, e.g. `groupings`.
+
+    Returns
+    -------
+    EnergySystem object
+    """
+    if os.path.isdir(path):
+        mmap_mode = 'c' if lazy else None
+        arrays = {name[:-4]: np.load(os.path.join(path, name),
+                                     mmap_mode=mmap_mode)
+                  for name in os.listdir(path) if name.endswith('.npy')}
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+    else:
+        with np.load(path) as npz:
+            arrays = dict(npz.items())
+        meta = json.loads(str(arrays.pop('meta')))
+    if meta['version'] != FORMAT_VERSION:
+        raise ValueError("Unknown format version {0} of {1}.".format(
+            meta['version'], path))
+    return _Reader(arrays, meta).energy_system(**kwargs)
+
+
+def _class_name(cls):
+    return cls.__module__ + ':' + cls.__qualname__
+
+
+def _import_class(name):
+    module, qualname = name.split(':')
+    obj = import_module(module)
+    for attribute in qualname.split('.'):
+        obj = getattr(obj, attribute)
+    return obj
+
+
+class _Table:
+    """ Collects the attribute cells of the rows of a table column by column.
+    """
+    def __init__(self):
+        self.names = []
+        self.cells = []
+        self.rows = 0
+
+    def add(self, name, row, kind, value):
+        try:
+            column = self.names.index(name)
+        except ValueError:
+            self.names.append(name)
+            self.cells.append(([], [], []))
+            column = -1
+        rows, kinds, values = self.cells[column]
+        rows.append(row)
+        kinds.append(kind)
+        values.append(value)
+
+    def arrays(self):
+        """ Returns the type codes and values as arrays with one row per row
+        of the table and one column per attribute (stored column by column).
+        """
+        shape = (self.rows, len(self.names))
+        kinds = np.zeros(shape, dtype=np.int8, order='F')
+        values = np.zeros(shape, dtype=np.float64, order='F')
+        for column, (rows, k, v) in enumerate(self.cells):
+            kinds[rows, column] = k
+            values[rows, column] = v
+        return kinds, values
+
+
+class _Writer:
+
+    def __init__(self):
+        self.classes = []
+        self.strings = []
+        self.profiles = []
+        self._profile_ids = {}
+        self.nodes = _Table()
+        self.flows = _Table()
+        self.factors = ([], [], [])
+
+    def _id(self, ids, value):
+        try:
+            return ids.index(value)
+        except ValueError:
+            ids.append(value)
+            return len(ids) - 1
+
+    def tables(self, es):
+        nodes = es.nodes
+        index = {id(n): i for i, n in enumerate(nodes)}
+        node_classes = np.empty(len(nodes), dtype=np.int32)
+        for i, n in enumerate(nodes):
+            node_classes[i] = self._id(self.classes, _class_name(type(n)))
+            for name, value in getattr(n, '__dict__', {}).items():
+                if name in DERIVED_ATTRIBUTES:
+                    continue
+                if isinstance(value, dict):
+                    self.nodes.add(name, i, DICTIONARY, 0)
+                    self._factors(index, i, name, value)
+                else:
+                    self._cell(self.nodes, name, i, value)
+        self.nodes.rows = len(nodes)
+
+        edges = []
+        flow_classes = []
+        for (s, t), f in es.flows().items():
+            row = len(edges)
+            edges.append((index[id(s)], index[id(t)]))
+            flow_classes.append(self._id(self.classes, _class_name(type(f))))
+            for name, value in vars(f).items():
+                self._cell(self.flows, name, row, value)
+        self.flows.rows = len(edges)
+
+        node_kinds, node_values = self.nodes.arrays()
+        flow_kinds, flow_values = self.flows.arrays()
+        lengths = [len(p) for p in self.profiles]
+        return {
+            'node_labels': np.array([str(n) for n in nodes], dtype=str),
+            'node_classes': node_classes,
+            'node_kinds': node_kinds,
+            'node_values': node_values,
+            'flow_edges': np.array(edges, dtype=np.int64).reshape(-1, 2),
+            'flow_classes': np.array(flow_classes, dtype=np.int32),
+            'flow_kinds': flow_kinds,
+            'flow_values': flow_values,
+            'factor_index': np.array(self.factors[0],
+                                     dtype=np.int64).reshape(-1, 3),
+            'factor_kinds': np.array(self.factors[1], dtype=np.int8),
+            'factor_values': np.array(self.factors[2], dtype=np.float64),
+            'profiles': (np.concatenate(self.profiles).astype(np.float64)
+                         if self.profiles else np.zeros(0)),
+            'profile_offsets': np.concatenate(
+                [[0], np.cumsum(lengths, dtype=np.int64)]),
+            'timeindex': es.timeindex.asi8}
+
+    def _factors(self, index, row, name, dictionary):
+        for key, value in dictionary.items():
+            if id(key) not in index:
+                raise ValueError(
+                    "Attribute {0} of node {1} can not be stored: keys of "
+                    "dictionaries have to be nodes of the energy "
+                    "system.".format(name, row))
+            kind, number = self._encode(value)
+            self.factors[0].append(
+                (row, self._id(self.strings, name), index[id(key)]))
+            self.factors[1].append(kind)
+            self.factors[2].append(number)
+
+    def _cell(self, table, name, row, value):
+        if isinstance(value, (numbers.Number, np.bool_, str, _Sequence,
+                              np.ndarray, type(None))):
+            table.add(name, row, *self._encode(value))
+            return
+        attributes = getattr(value, '__dict__', None)
+        if attributes is None:
+            raise ValueError("Attribute {0} of type {1} can not be "
+                             "stored.".format(name, type(value).__name__))
+        table.add(name, row, OPTION,
+                  self._id(self.classes, _class_name(type(value))))
+        for option, v in attributes.items():
+            table.add(name + '.' + option, row, *self._encode(v))
+
+    def _encode(self, value):
+        """ Returns the type code and the value of a cell."""
+        if value is None:
+            return NONE, 0
+        if isinstance(value, (bool, np.bool_)):
+            return BOOL, float(value)
+        if isinstance(value, numbers.Integral):
+            return INT, value
+        if isinstance(value, numbers.Real):
+            return FLOAT, value
+        if isinstance(value, str):
+            return STRING, self._id(self.strings, value)
+        if isinstance(value, _Sequence):
+            if value.default is None:
+                return CONSTANT_NONE, 0
+            kind, number = self._encode(value.default)
+            if kind not in (INT, FLOAT):
+                raise ValueError("Constant sequences of {0} can not be "
+                                 "stored.".format(type(value.default)))
+            return (CONSTANT_INT if kind == INT else CONSTANT_FLOAT), number
+        if isinstance(value, np.ndarray):
+            # the same profile of several objects is stored once
+            profile = self._profile_ids.get(id(value))
+            if profile is None:
+                profile = len(self.profiles)
+                self._profile_ids[id(value)] = profile
+                self.profiles.append(np.asarray(value, dtype=np.float64))
+            return PROFILE, profile
+        raise ValueError("Values of type {0} can not be stored.".format(
+            type(value).__name__))
+
+
+class _Reader:
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+        self.classes = [_import_class(c) for c in meta['classes']]
+        self.strings = meta['strings']
+        self.offsets = arrays['profile_offsets'].tolist()
+        self._profiles = {}
+
+    def profile(self, i):
+        profile = self._profiles.get(i)
+        if profile is None:
+            profile = _Profile(self.arrays['profiles'][
+                self.offsets[i]:self.offsets[i + 1]])
+            self._profiles[i] = profile
+        return profile
+
+    def decode(self, kind, value):
+        if kind == NONE:
+            return None
+        if kind == FLOAT:
+            return value
+        if kind == INT:
+            return int(value)
+        if kind == BOOL:
+            return bool(value)
+        if kind == STRING:
+            return self.strings[int(value)]
+        if kind == CONSTANT_FLOAT:
+            return _Sequence(default=value)
+        if kind == CONSTANT_INT:
+            return _Sequence(default=int(value))
+        if kind == CONSTANT_NONE:
+            return _Sequence(default=None)
+        if kind == PROFILE:
+            return self.profile(int(value))
+        raise ValueError("Unknown type code {0}.".format(kind))
+
+    def objects(self, classes, names, kinds, values):
+        """ Creates one object per row without calling its constructor and
+        sets the attributes of the row.
+        """
+        options = [name.split('.', 1) for name in names]
+        objects = []
+        for cls, row_kinds, row_values in zip(
+                classes.tolist(), kinds.tolist(), values.tolist()):
+            obj = self.classes[cls].__new__(self.classes[cls])
+            attributes = {}
+            for name, option, kind, value in zip(names, options, row_kinds,
+                                                 row_values):
+                if kind == ABSENT:
+                    continue
+                if kind == OPTION:
+                    cls = self.classes[int(value)]
+                    attributes[name] = cls.__new__(cls)
+                elif kind == DICTIONARY:
+                    attributes[name] = {}
+                elif len(option) == 2:
+                    setattr(attributes[option[0]], option[1],
+                            self.decode(kind, value))
+                else:
+                    attributes[name] = self.decode(kind, value)
+            obj.__dict__.update(attributes)
+            objects.append(obj)
+        return objects
+
+    def energy_system(self, **kwargs):
+        arrays = self.arrays
+        timeindex = pd.DatetimeIndex(arrays['timeindex'].astype('M8[ns]'))
+        if self.meta['tz'] is not None:
+            timeindex = timeindex.tz_localize('UTC').tz_convert(
+                self.meta['tz'])
+        timeindex = pd.DatetimeIndex(timeindex, freq=self.meta['freq'])
+        es = _import_class(self.meta['energy_system'])(timeindex=timeindex,
+                                                       **kwargs)
+
+        nodes = self.objects(arrays['node_classes'],
+                             self.meta['node_columns'], arrays['node_kinds'],
+                             arrays['node_values'])
+        for n, label in zip(nodes, arrays['node_labels'].tolist()):
+            n._label = label
+            n._inputs = {}
+            n._outputs = {}
+        for (row, name, key), kind, value in zip(
+                arrays['factor_index'].tolist(),
+                arrays['factor_kinds'].tolist(),
+                arrays['factor_values'].tolist()):
+            getattr(nodes[row], self.strings[name])[nodes[key]] = (
+                self.decode(kind, value))
+
+        flows = self.objects(arrays['flow_classes'],
+                             self.meta['flow_columns'], arrays['flow_kinds'],
+                             arrays['flow_values'])
+        for (s, t), f in zip(arrays['flow_edges'].tolist(), flows):
+            edges[nodes[s], nodes[t]] = f
+        for n in nodes:
+            # the arguments pickled instead of the node, see
+            # oemof.network.Node.__getstate__
+            n._state = ((), {'label': n._label, 'outputs': dict(n.outputs)})
+        es.add_many(nodes)
+        return es
@@ -2,13 +2,15 @@
 """
 
 """
-from collections import abc, UserList
+from collections import abc
+import numpy as np
 
 
 def sequence(sequence_or_scalar):
     """ Tests if an object is sequence (except string) or scalar and returns
-    a the original sequence if object is a sequence and a 'emulated' sequence
-    object of class _Sequence if object is a scalar or string.
+    a :class:`_Profile` holding the values of the sequence as numpy array if
+    object is a sequence and an 'emulated' sequence object of class
+    :class:`_Sequence` if object is a scalar or string.
 
     Parameters
     ----------
@@ -17,7 +19,7 @@ def sequence(sequence_or_scalar):
     Examples
     --------
     >>> sequence([1,2])
-    [1, 2]
+    _Profile([1, 2])
 
     >>> x = sequence(10)
     >>> x[0]
@@ -25,54 +27,218 @@ def sequence(sequence_or_scalar):
 
     >>> x[10]
     10
-    >>> print(x)
-    [10, 10, 10, 10, 10, 10, 10, 10, 10, 10, 10]
+    >>> x.is_constant
+    True
 
     """
+    if isinstance(sequence_or_scalar, (_Sequence, _Profile)):
+        return sequence_or_scalar
     if (isinstance(sequence_or_scalar, abc.Iterable) and not
             isinstance(sequence_or_scalar, str)):
-        return sequence_or_scalar
+        return _Profile(sequence_or_scalar)
     else:
         return _Sequence(default=sequence_or_scalar)
 
 
-class _Sequence(UserList):
-    """ Emulates a list whose length is not known in advance.
+class _Sequence(abc.Sequence):
+    """ Emulates a sequence of a constant value whose length is not known in
+    advance. The value is held once, items are never stored on access.
 
     Parameters
     ----------
-    source:
     default:
+        The value of every item.
 
+    Attributes
+    ----------
+    is_constant : bool
+        Always True.
 
     Examples
     --------
     >>> s = _Sequence(default=42)
-    >>> len(s)
-    0
     >>> s[2]
     42
     >>> len(s)
+    0
+    >>> s[:3]
+    [42, 42, 42]
+    >>> s.values
+    42.0
+
+    """
+    is_constant = True
+
+    def __init__(self, default):
+        self.default = default
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            if key.stop is None:
+                raise ValueError("Slices of a sequence of unknown length "
+                                 "need a stop.")
+            return [self.default] * len(range(*key.indices(key.stop)))
+        return self.default
+
+    def __len__(self):
+        return 0
+
+    def __iter__(self):
+        return iter(())
+
+    def __repr__(self):
+        return "_Sequence(default={0!r})".format(self.default)
+
+    def __eq__(self, other):
+        return (isinstance(other, _Sequence) and
+                self.default == other.default)
+
+    __hash__ = None
+
+    @property
+    def values(self):
+        """ The value of the items as numpy float (nan for None), which
+        broadcasts against arrays of any length.
+        """
+        return np.float64(np.nan if self.default is None else self.default)
+
+
+class _Profile(np.ndarray):
+    """ A sequence of values given as time series, held as typed numpy array.
+
+    Numpy arrays and pandas Series of a numeric type are wrapped without
+    copying their values, other sequences are converted to an array of their
+    numeric type or to floats (None becomes nan). Single items are returned
+    as Python numbers, slices as profiles.
+
+    Attributes
+    ----------
+    is_constant : bool
+        Always False.
+
+    Examples
+    --------
+    >>> p = _Profile([1, None, 3])
+    >>> p[2]
+    3.0
+    >>> type(_Profile([1, 2])[0])
+    <class 'int'>
+    >>> p.values
+    array([ 1., nan,  3.])
+
+    """
+    is_constant = False
+
+    def __new__(cls, values):
+        array = np.asarray(values)
+        if array.dtype.kind not in 'biuf':
+            array = np.asarray(values, dtype=float)
+        return array.view(cls)
+
+    def __getitem__(self, key):
+        item = super().__getitem__(key)
+        if isinstance(item, np.generic):
+            return item.item()
+        return item
+
+    @property
+    def values(self):
+        """ The values as plain numpy array (a view, no copy)."""
+        return self.view(np.ndarray)
+
+
+def is_none(item):
+    """ Tests if an item of a sequence is None. Items of a :class:`_Profile`
+    which were given as None are nan.
+
+    Examples
+    --------
+    >>> is_none(sequence([None, 2])[0]), is_none(sequence(None)[0])
+    (True, True)
+    >>> is_none(sequence([1, 2])[0]), is_none(sequence(0)[0])
+    (False, False)
+
+    """
+    return item is None or (isinstance(item, (float, np.floating)) and
+                            np.isnan(item))
+
+
+def sequence_array(sequence_or_scalar, length):
+    """ Returns the first `length` values of a sequence (as returned by
+    :func:`sequence`) as a numpy array of floats. Values which are `None` are
+    represented by `nan`.
+
+    This is meant for vectorized consumers which would otherwise index the
+    sequence once per timestep.
+
+    Parameters
+    ----------
+    sequence_or_scalar : array-like, _Sequence, None, int, float
+    length : int
+        Number of values of the returned array.
+
+    Examples
+    --------
+    >>> sequence_array(sequence(2), 3)
+    array([2., 2., 2.])
+
+    >>> sequence_array([1, None, 3, 4], 3)
+    array([ 1., nan,  3.])
+
+    """
+    if isinstance(sequence_or_scalar, _Sequence):
+        return np.full(length, sequence_or_scalar.values, dtype=float)
+    if (isinstance(sequence_or_scalar, abc.Iterable) and not
+            isinstance(sequence_or_scalar, str)):
+        values = np.array(sequence_or_scalar[:length], dtype=float)
+        if len(values) < length:
+            raise IndexError("Sequence of length {0} is shorter than the "
+                             "expected length {1}.".format(len(values),
+                                                          length))
+        return values
+    return sequence_array(_Sequence(default=sequence_or_scalar), length)
+
+
+class _Window(abc.Sequence):
+    """ A read-only view of `length` consecutive items of a sequence starting
+    at position `start`. The items are not copied but looked up in the
+    underlying sequence on access.
+
+    Parameters
+    ----------
+    sequence : array-like
+    start : int
+        Position of the first item of the view in `sequence`.
+    length : int
+        Number of items of the view.
+
+    Examples
+    --------
+    >>> w = _Window([1, 2, 3, 4, 5], start=1, length=3)
+    >>> len(w)
     3
-    >>> s[0] = 23
-    >>> s
-    [23, 42, 42]
+    >>> w[0], w[-1]
+    (2, 4)
+    >>> list(w)
+    [2, 3, 4]
+    >>> w[1:]
+    [3, 4]
 
     """
-    def __init__(self, *args, **kwargs):
-        self.default = kwargs["default"]
-        super().__init__(*args)
+    def __init__(self, sequence, start, length):
+        self.sequence = sequence
+        self.start = start
+        self.length = length
+
+    def __len__(self):
+        return self.length
 
     def __getitem__(self, key):
-        try:
-            return self.data[key]
-        except IndexError:
-            self.data.extend([self.default] * (key - len(self.data) + 1))
-            return self.data[key]
-
-    def __setitem__(self, key, value):
-        try:
-            self.data[key] = value
-        except IndexError:
-            self.data.extend([self.default] * (key - len(self.data) + 1))
-            self.data[key] = value
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            return self.sequence[self.start + start:self.start + stop:step]
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError("Window index out of range.")
+        return self.sequence[self.start + key]
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""Rolling horizon dispatch on top of the :class:`.OperationalModel`.
+
+The time horizon of the energy system is split into overlapping windows which
+are optimized one after another. Each window is a non-periodic
+:class:`.OperationalModel` of the energy system whose time index and
+sequences are views of the full ones. Only the first part of every window is
+kept, the overlap is optimized again as part of the next window.
+
+Examples
+--------
+>>> import pandas as pd
+>>> from oemof.solph import EnergySystem
+>>> es = EnergySystem(timeindex=pd.date_range('1/1/2012', periods=10,
+...                                           freq='H'))
+>>> RollingHorizon(es, window=4, overlap=2).windows()
+[(0, 4, 2), (2, 6, 4), (4, 8, 6), (6, 10, 10)]
+
+"""
+from collections import UserDict, UserList
+from contextlib import contextmanager
+import logging
+import numpy as np
+from .models import OperationalModel
+from .network import Storage
+from .options import Investment
+from .plumbing import _Sequence, _Window, is_none, sequence_array
+
+
+FLOW_SEQUENCES = ['min', 'max', 'actual_value', 'positive_gradient',
+                  'negative_gradient', 'variable_costs']
+
+NODE_SEQUENCES = ['capacity_loss', 'inflow_conversion_factor',
+                  'outflow_conversion_factor', 'capacity_min',
+                  'capacity_max']
+
+NODE_SEQUENCE_DICTS = ['conversion_factors', 'conversion_factor_single_flow']
+
+
+class RollingHorizon:
+    r""" Optimizes the dispatch of an energy system window by window.
+
+    The windows have a length of `window` timesteps, consecutive windows
+    overlap by `overlap` timesteps. The level of every storage at the end of
+    the kept part of a window becomes the `initial_capacity` of the storage in
+    the next window, the same holds for the status of binary flows.
+    The results of all windows are written to one :class:`ResultStore`.
+
+    Parameters
+    ----------
+    es : EnergySystem object
+        Energy system with a time index.
+    window : int
+        Number of timesteps of one window.
+    overlap : int
+        Number of timesteps at the end of a window which are optimized again
+        in the next window. Defaults to 0.
+    \**kwargs : keyword arguments
+        Passed to the :class:`.OperationalModel` of every window, e.g.
+        `constraint_groups`.
+
+    Note
+    ----
+    Windows are optimized independently, so constraints spanning the whole
+    time horizon are not supported: flows with `summed_min`/`summed_max` or
+    an investment object and storages with an investment object raise a
+    ValueError. Gradient constraints of flows are not linked across windows.
+    """
+    def __init__(self, es, window, overlap=0, **kwargs):
+        if not 0 <= overlap < window:
+            raise ValueError("The overlap has to be smaller than the window "
+                             "and must not be negative.")
+        self.es = es
+        self.window = window
+        self.overlap = overlap
+        self.model_kwargs = kwargs
+        self.flows = es.flows()
+        self.storages = [n for n in es.nodes if isinstance(n, Storage)]
+        self._check_energy_system()
+
+    def _check_energy_system(self):
+        for (o, i), f in self.flows.items():
+            if isinstance(f.investment, Investment):
+                raise ValueError("Flow ({0}, {1}) with an investment object "
+                                 "can not be optimized in windows.".format(
+                                     o, i))
+            if f.summed_max is not None or f.summed_min is not None:
+                raise ValueError("Flow ({0}, {1}) with summed_min/summed_max "
+                                 "can not be optimized in windows.".format(
+                                     o, i))
+        for n in self.storages:
+            if isinstance(n.investment, Investment):
+                raise ValueError("Storage {0} with an investment object can "
+                                 "not be optimized in windows.".format(n))
+
+    def windows(self):
+        """ Returns a list of `(start, stop, keep)` tuples, one per window.
+        The window covers the timesteps `start` to `stop` (excluding), the
+        results of the timesteps `start` to `keep` (excluding) are kept.
+        """
+        periods = len(self.es.timeindex)
+        step = self.window - self.overlap
+        windows = []
+        for start in range(0, periods, step):
+            stop = min(start + self.window, periods)
+            if stop == periods:
+                windows.append((start, stop, stop))
+                break
+            windows.append((start, stop, start + step))
+        return windows
+
+    def solve(self, solver='glpk', duals=False, **kwargs):
+        r""" Optimizes all windows one after another and returns the results
+        of the full time horizon. The results are also stored in the
+        `results` attribute of the energy system.
+
+        Parameters
+        ----------
+        solver : string
+            solver to be used e.g. "glpk","gurobi","cplex"
+        duals : boolean
+            If True, the duals of the bus balances are stored as well.
+        \**kwargs : keyword arguments
+            Passed to :meth:`.OperationalModel.solve`.
+        """
+        store = ResultStore(self.es, duals=duals)
+        initial_capacities = {n: n.initial_capacity for n in self.storages}
+        initial_status = {f: f.binary.initial_status
+                          for f in self.flows.values() if f.binary}
+        try:
+            for start, stop, keep in self.windows():
+                logging.info("Optimizing timesteps {0} to {1}...".format(
+                    start, stop - 1))
+                with windowed(self.es, start, stop):
+                    om = OperationalModel(self.es, periodic=False,
+                                          **self.model_kwargs)
+                    if duals:
+                        om.receive_duals()
+                    results = om.solve(solver=solver, **kwargs)
+                    termination_condition = (
+                        results["Solver"][0]["Termination condition"].key)
+                    if termination_condition != "optimal":
+                        raise ValueError(
+                            "Optimization of timesteps {0} to {1} failed with "
+                            "termination condition {2}.".format(
+                                start, stop - 1, termination_condition))
+                    store.add(om, start, keep)
+                    self._carry_over(om, keep - start - 1)
+        finally:
+            for n, initial_capacity in initial_capacities.items():
+                n.initial_capacity = initial_capacity
+            for f, status in initial_status.items():
+                f.binary.initial_status = status
+
+        self.es.results = store.result_dict()
+        return self.es.results
+
+    def _carry_over(self, om, t):
+        """ Sets the storage levels and the status of binary flows of timestep
+        `t` of the model as initial values of the next window.
+        """
+        for n in self.storages:
+            n.initial_capacity = (om.Storage.capacity[n, t].value /
+                                  n.nominal_capacity)
+        for (o, i), f in self.flows.items():
+            if f.binary:
+                f.binary.initial_status = int(round(
+                    om.BinaryFlow.status[o, i, t].value))
+
+
+class ResultStore:
+    """ Holds the results of a rolling horizon optimization in preallocated
+    arrays covering the full time horizon of the energy system.
+
+    Parameters
+    ----------
+    es : EnergySystem object
+    duals : boolean
+        If True, arrays for the duals of the bus balances are created.
+
+    Attributes
+    ----------
+    flows : dict
+        Array of the values of every flow, keyed by `(source, target)`.
+    capacities : dict
+        Array of the levels of every storage, keyed by the storage.
+    duals : dict
+        Array of the duals of every balanced bus, keyed by the bus.
+    objectives : list
+        Objective values of all windows, including the overlap.
+    """
+    def __init__(self, es, duals=False):
+        periods = len(es.timeindex)
+        self.es = es
+        self.flows = {key: np.full(periods, np.nan) for key in es.flows()}
+        self.capacities = {n: np.full(periods, np.nan) for n in es.nodes
+                           if isinstance(n, Storage)}
+        self.duals = {}
+        if duals:
+            self.duals = {n: np.full(periods, np.nan) for n in es.nodes
+                          if getattr(n, 'balanced', False)}
+        self.objectives = []
+
+    def add(self, om, start, stop):
+        """ Writes the timesteps `0` to `stop - start` (excluding) of the
+        solved model to the timesteps `start` to `stop` of the store.
+        """
+        timesteps = range(stop - start)
+        for (o, i), values in self.flows.items():
+            values[start:stop] = om.flow_values(o, i)[:stop - start]
+        for n, values in self.capacities.items():
+            values[start:stop] = [om.Storage.capacity[n, t].value
+                                  for t in timesteps]
+        # rows of the balances can be missing and duals can be unknown
+        balance = om.Bus.balance
+        for n, values in self.duals.items():
+            values[start:stop] = [
+                om.dual.get(balance[n, t], np.nan) if (n, t) in balance
+                else np.nan for t in timesteps]
+        self.objectives.append(om.objective())
+
+    def result_dict(self):
+        """ Returns the results as nested dictionary like
+        :func:`oemof.outputlib.result_dict`. The `objective` attribute holds
+        the variable costs of the stitched dispatch, fixed and investment
+        costs are not included.
+        """
+        periods = len(self.es.timeindex)
+        # time increment in hours as in the OperationalModel
+        timeincrement = self.es.timeindex.freq.nanos / 3.6e12
+        flows = self.es.flows()
+        result = UserDict()
+        objective = 0
+        for (o, i), values in self.flows.items():
+            result[o] = result.get(o, UserDict())
+            result[o][i] = UserList(values.tolist())
+            costs = flows[o, i].variable_costs
+            if not is_none(costs[0]):
+                objective += timeincrement * np.dot(
+                    sequence_array(costs, periods), values)
+        for n, values in self.capacities.items():
+            result[n] = result.get(n, UserDict())
+            result[n][n] = UserList(values.tolist())
+        for n, values in self.duals.items():
+            result[n] = result.get(n, UserDict())
+            result[n][n] = values.tolist()
+        result.objective = objective
+        result.objectives = self.objectives
+        result.investment = UserDict()
+        return result
+
+
+def windowed(es, start, stop):
+    """ Context manager restricting the time index and all flow and storage
+    sequences of the energy system to the timesteps `start` to `stop`
+    (excluding). The sequences are replaced by views (see
+    :class:`.plumbing._Window`) and restored on exit.
+    """
+    return replaced_sequences(
+        es, es.timeindex[start:stop],
+        lambda value: _Window(value, start, stop - start))
+
+
+def _sequence_attributes(es):
+    """ Yields `(object, attribute)` tuples of all attributes of the flows
+    and nodes of the energy system which hold sequences or dictionaries of
+    sequences.
+    """
+    for f in es.flows().values():
+        for attribute in FLOW_SEQUENCES:
+            yield f, attribute
+    for n in es.nodes:
+        for attribute in NODE_SEQUENCES + NODE_SEQUENCE_DICTS:
+            if hasattr(n, attribute):
+                yield n, attribute
+
+
+def sequences(es):
+    """ Yields all sequences of the flows and nodes of the energy system
+    which are no scalars (:class:`.plumbing._Sequence` objects).
+    """
+    for obj, attribute in _sequence_attributes(es):
+        value = getattr(obj, attribute)
+        for v in (value.values() if isinstance(value, dict) else [value]):
+            if not isinstance(v, _Sequence):
+                yield v
+
+
+@contextmanager
+def replaced_sequences(es, timeindex, replace):
+    """ Context manager replacing the time index of the energy system by
+    `timeindex` and every sequence of its flows and nodes, which is no scalar
+    (:class:`.plumbing._Sequence` object), by `replace(sequence)`. The
+    original values are restored on exit.
+    """
+    def new(value):
+        if isinstance(value, _Sequence):
+            return value
+        return replace(value)
+
+    replaced = [(es, 'timeindex', es.timeindex)]
+    es.timeindex = timeindex
+    try:
+        for obj, attribute in _sequence_attributes(es):
+            value = getattr(obj, attribute)
+            replaced.append((obj, attribute, value))
+            if isinstance(value, dict):
+                setattr(obj, attribute, {k: new(v) for k, v in value.items()})
+            else:
+                setattr(obj, attribute, new(value))
+        yield es
+    finally:
+        for obj, attribute, value in reversed(replaced):
+            setattr(obj, attribute, value)
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""Solving batches of scenarios of one energy system in a process pool.
+
+All scenarios share the topology of a base energy system and differ in the
+attributes of some flows or nodes. Every scenario is built and solved as an
+:class:`.OperationalModel` in a worker process of a
+:class:`concurrent.futures.ProcessPoolExecutor`. The workers inherit the base
+energy system when they are forked and only return numpy arrays of the
+results, no pyomo objects.
+
+Examples
+--------
+Scenarios are given as dictionaries of overrides. Flows are addressed by the
+labels of their source and target, nodes by their label:
+
+>>> scenarios = {
+...     'cheap_gas': {('gas', 'bel'): {'variable_costs': 20}},
+...     'windy': {('wind', 'bel'): {'actual_value': [0.8, 0.9, 0.7]},
+...               'storage': {'capacity_loss': 0.02}}}
+
+"""
+from collections import abc
+import concurrent.futures as cf
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import subprocess
+import threading
+import time
+import numpy as np
+from .models import OperationalModel
+from .network import Storage
+from .plumbing import sequence
+
+
+# energy system of the worker processes, set by _initialize_worker
+_energy_system = None
+
+# True in worker processes which lead their own process group
+_process_group = False
+
+
+class ScenarioTimeout(Exception):
+    """Raised in a worker process if a scenario exceeds its time limit."""
+    pass
+
+
+class ScenarioResult:
+    """ Results of one scenario.
+
+    Attributes
+    ----------
+    name :
+        Name of the scenario.
+    status : str
+        'ok' if the scenario was solved to optimality, 'failed' if it could
+        not be built or solved (e.g. because it is infeasible) and 'timeout'
+        if the time limit was exceeded.
+    message : str
+        Termination condition of the solver or error message.
+    objective : float
+        Value of the objective function (None if not solved).
+    flows : numpy.ndarray
+        Values of all flows with one row per flow (see
+        :attr:`ScenarioResults.flow_labels`) and one column per timestep.
+    capacities : numpy.ndarray
+        Levels of all storages with one row per storage (see
+        :attr:`ScenarioResults.storage_labels`).
+    seconds : float
+        Time needed to build and solve the scenario.
+    """
+    def __init__(self, name, status, message='', objective=None, flows=None,
+                 capacities=None, seconds=None):
+        self.name = name
+        self.status = status
+        self.message = message
+        self.objective = objective
+        self.flows = flows
+        self.capacities = capacities
+        self.seconds = seconds
+
+    def __repr__(self):
+        return "<ScenarioResult {0!r}: {1}>".format(self.name, self.status)
+
+
+class ScenarioResults(dict):
+    """ Dictionary of :class:`ScenarioResult` objects keyed by the scenario
+    names, with the labels of the rows of the result arrays.
+
+    Attributes
+    ----------
+    flow_labels : list
+        `(source, target)` label tuples of the rows of
+        :attr:`ScenarioResult.flows`.
+    storage_labels : list
+        Labels of the rows of :attr:`ScenarioResult.capacities`.
+    """
+    def __init__(self, es):
+        super().__init__()
+        self.flow_labels = [(str(o), str(i)) for o, i in _flow_keys(es)]
+        self.storage_labels = [str(n) for n in _storages(es)]
+
+    def flow(self, name, source, target):
+        """ Returns the values of the flow from the node labeled `source` to
+        the node labeled `target` in scenario `name`.
+        """
+        row = self.flow_labels.index((source, target))
+        return self[name].flows[row]
+
+    def failed(self):
+        """ Returns the names of the scenarios which were not solved."""
+        return [name for name, result in self.items()
+                if result.status != 'ok']
+
+
+def solve_scenarios(es, scenarios, solver='glpk', workers=None,
+                    timeout=None, model_kwargs=None, **kwargs):
+    r""" Builds and solves an :class:`.OperationalModel` for every scenario in
+    a pool of worker processes.
+
+    A scenario which can not be solved or exceeds the time limit does not
+    stop the batch, its :class:`ScenarioResult` holds the reason instead.
+
+    Parameters
+    ----------
+    es : EnergySystem object
+        The base energy system.
+    scenarios : dict
+        Overrides of every scenario keyed by the scenario names. The
+        overrides are dictionaries of the new attributes keyed by
+        `(source_label, target_label)` tuples for flows or by labels for
+        nodes (see the module documentation).
+    solver : string
+        solver to be used e.g. "glpk","gurobi","cplex"
+    workers : int
+        Number of worker processes, defaults to the number of CPUs.
+        With `workers=0` the scenarios are solved one after another in the
+        calling process, which is also done if processes can not be forked.
+    timeout : numeric
+        Time limit in seconds to build and solve one scenario. The time left
+        after building the model is passed to the solver as its time limit
+        (`timelimit` of the pyomo solver), the solver process is killed if
+        it does not stop in time. Worker processes also terminate the child
+        processes of the solver. Limiting the build time needs
+        :const:`signal.SIGALRM` and the main thread, i.e. is not done on
+        Windows or if the scenarios are solved in another thread.
+    model_kwargs : dict
+        Keyword arguments of the :class:`.OperationalModel` of every
+        scenario, e.g. `{'presolve': True}`.
+    \**kwargs : keyword arguments
+        Passed to :meth:`.OperationalModel.solve`.
+
+    Returns
+    -------
+    :class:`ScenarioResults`
+
+    Note
+    ----
+    Every worker process leads its own process group, so its solvers can be
+    terminated with it. If the batch is interrupted (e.g. by Ctrl-C), the
+    process groups of the workers are terminated before the exception is
+    raised.
+    """
+    results = ScenarioResults(es)
+    if model_kwargs is None:
+        model_kwargs = {}
+    if workers is None:
+        workers = os.cpu_count()
+
+    if workers and 'fork' not in multiprocessing.get_all_start_methods():
+        logging.warning("Processes can not be forked, solving scenarios "
+                        "one after another.")
+        workers = 0
+
+    if not workers:
+        _initialize_worker(es)
+        for name, overrides in scenarios.items():
+            results[name] = _solve_scenario(name, overrides, solver, timeout,
+                                            model_kwargs, kwargs)
+        return results
+
+    with cf.ProcessPoolExecutor(
+            max_workers=workers, initializer=_initialize_worker,
+            initargs=(es, True),
+            mp_context=multiprocessing.get_context('fork')) as executor:
+        try:
+            futures = {
+                executor.submit(_solve_scenario, name, overrides, solver,
+                                timeout, model_kwargs, kwargs): name
+                for name, overrides in scenarios.items()}
+            for future in cf.as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    # the worker died, e.g. because it ran out of memory
+                    results[name] = ScenarioResult(name, 'failed', repr(e))
+                logging.info("Scenario {0}: {1}".format(
+                    name, results[name].status))
+        except BaseException:
+            # the worker groups are not in the foreground process group of
+            # the terminal and would keep solving after e.g. Ctrl-C
+            _terminate_workers()
+            raise
+    return results
+
+
+def _flow_keys(es):
+    return sorted(es.flows(), key=lambda key: (str(key[0]), str(key[1])))
+
+
+def _storages(es):
+    return sorted((n for n in es.nodes if isinstance(n, Storage)), key=str)
+
+
+def _initialize_worker(es, group=False):
+    """ Sets the energy system of the worker. With `group`, the worker
+    leads a new process group, which the solver processes started by it
+    join, see :func:`_terminate_solvers`.
+    """
+    global _energy_system, _process_group
+    _energy_system = es
+    if group and hasattr(os, 'setpgrp'):
+        os.setpgrp()
+        _process_group = True
+
+
+def _terminate_solvers():
+    """ Terminates the other processes of the process group of a worker,
+    i.e. the solvers and their child processes, which are left running if a
+    solver is interrupted.
+    """
+    if not _process_group:
+        return
+    handler = signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    try:
+        os.killpg(os.getpgrp(), signal.SIGTERM)
+    finally:
+        signal.signal(signal.SIGTERM, handler)
+
+
+def _terminate_workers():
+    """ Terminates the process groups led by child processes of the
+    calling process, i.e. the worker processes and their solvers.
+    """
+    for process in multiprocessing.active_children():
+        try:
+            if os.getpgid(process.pid) == process.pid:
+                os.killpg(process.pid, signal.SIGTERM)
+        except OSError:  # the worker has already terminated
+            pass
+
+
+def _raise_timeout(signum, frame):
+    raise ScenarioTimeout()
+
+
+def _apply_overrides(es, overrides, replaced):
+    """ Sets the overrides as attributes of the flows and nodes of the energy
+    system and appends the replaced values as `(object, attribute, value)`
+    tuples to `replaced`. Attributes holding sequences are set via
+    :func:`.sequence`.
+    """
+    nodes = {str(n): n for n in es.nodes}
+    flows = {(str(o), str(i)): f for (o, i), f in es.flows().items()}
+    for key, attributes in overrides.items():
+        obj = flows[key] if isinstance(key, tuple) else nodes[key]
+        for attribute, value in attributes.items():
+            old = getattr(obj, attribute)
+            replaced.append((obj, attribute, old))
+            if isinstance(old, abc.Iterable) and not isinstance(old, str):
+                value = sequence(value)
+            setattr(obj, attribute, value)
+
+
+def _solve_scenario(name, overrides, solver, timeout, model_kwargs,
+                    solve_kwargs):
+    """ Builds and solves one scenario of the energy system of the worker.
+    Exceptions are returned as failed :class:`ScenarioResult`.
+
+    The alarm signal limits the time to build the model only. Raising an
+    exception while pyomo waits for the solver would leave the solver
+    process running, so the solver gets the remaining time as its limit.
+    """
+    es = _energy_system
+    start = time.perf_counter()
+    # signal handlers can only be set in the main thread
+    alarm = (timeout is not None and hasattr(signal, 'SIGALRM') and
+             threading.current_thread() is threading.main_thread())
+    if alarm:
+        handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    replaced = []
+    try:
+        _apply_overrides(es, overrides, replaced)
+        om = OperationalModel(es, **model_kwargs)
+        if timeout is not None:
+            if alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+            remaining = timeout - (time.perf_counter() - start)
+            if remaining <= 0:
+                raise ScenarioTimeout()
+            solve_kwargs = dict(solve_kwargs, solve_kwargs=dict(
+                solve_kwargs.get('solve_kwargs', {}),
+                timelimit=max(1, math.ceil(remaining))))
+        results = om.solve(solver=solver, **solve_kwargs)
+        condition = results["Solver"][0]["Termination condition"].key
+        if condition == 'maxTimeLimit':
+            raise ScenarioTimeout()
+        if condition != 'optimal':
+            return ScenarioResult(name, 'failed', condition,
+                                  seconds=time.perf_counter() - start)
+        flows = np.array([om.flow_values(o, i) for o, i in _flow_keys(es)],
+                         dtype=float)
+        capacities = np.array(
+            [[om.Storage.capacity[n, t].value if n.investment is None else
+              om.InvestmentStorage.capacity[n, t].value
+              for t in om.TIMESTEPS] for n in _storages(es)], dtype=float)
+        return ScenarioResult(name, 'ok', condition, om.objective(), flows,
+                              capacities, time.perf_counter() - start)
+    except (ScenarioTimeout, subprocess.TimeoutExpired):
+        # pyomo kills the solver process exceeding its time limit, but not
+        # the processes it started
+        _terminate_solvers()
+        return ScenarioResult(
+            name, 'timeout', "Time limit of {0} s exceeded.".format(timeout),
+            seconds=time.perf_counter() - start)
+    except Exception as e:
+        logging.error("Scenario {0} failed: {1!r}".format(name, e))
+        return ScenarioResult(name, 'failed', repr(e),
+                              seconds=time.perf_counter() - start)
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, handler)
+        for obj, attribute, value in reversed(replaced):
+            setattr(obj, attribute, value)
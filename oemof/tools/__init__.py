@@ -0,0 +1,28 @@
+"""The tool modules are imported on first access, e.g. of
+`oemof.tools.economics` after `import oemof.tools`.
+"""
+import sys
+
+from .helpers import _submodule
+
+
+_MODULES = ['config', 'economics', 'helpers', 'logger']
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError("module {0!r} has no attribute {1!r}".format(
+            __name__, name))
+    return _submodule(__name__, name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_MODULES))
+
+
+if sys.version_info < (3, 7):
+    # module level __getattr__ is not supported, import everything at once
+    for _name in __all__:
+        __getattr__(_name)
@@ -5,6 +5,7 @@ used by various classes. If there are too many helper-functions, they will
 be sorted in different modules.
 """
 
+from importlib import import_module
 import os
 
 
@@ -31,3 +32,21 @@ def get_fullpath(path, filename):
     """Combines path and filename to a full path.
     """
     return os.path.join(path, filename)
+
+
+def _submodule(package, name):
+    """ Imports the submodule `name` of `package`, raises an AttributeError
+    if there is none. Used by the module level `__getattr__` of packages
+    which import their submodules on first access.
+    """
+    error = AttributeError("module {0!r} has no attribute {1!r}".format(
+        package, name))
+    if name.startswith('__'):
+        raise error
+    try:
+        return import_module('.' + name, package)
+    except ImportError as e:
+        # only a missing submodule, not a failing import inside of it
+        if e.name != package + '.' + name:
+            raise
+        raise error from None
@@ -43,8 +43,8 @@ setup(name='oemof',
           ],
             'oemof': [os.path.join('tools', 'default_files', '*.ini')]},
       install_requires=['dill',
-                        'numpy >= 1.7.0',
-                        'pandas >= 0.18.0',
+                        'numpy >= 1.13.0',
+                        'pandas >= 0.24.0',
                         'pyomo >= 4.2.0, != 4.3.11377',
                         'matplotlib'],
       entry_points={
@@ -90,6 +90,19 @@ class EnergySystem_Tests:
                      group, len(ES.groups[group]),
                      sorted([e.uid for e in ES.groups[group]])))
 
+    def test_add_many(self):
+        Node.registry = None
+        buses = [NewBus(label="Bus {}".format(i)) for i in range(5)]
+        ES = es.EnergySystem(groupings=[type])
+        ES.add_many(buses)
+        eq_(ES.nodes, buses)
+        group = ES.groups[NewBus]
+        eq_(group, set(buses))
+        ES.add(NewBus(label="Bus 5"))
+        ok_(ES.groups[NewBus] is group,
+            "Groups of sets should be updated in place.")
+        eq_(len(group), 6)
+
     def test_grouping_filter_parameter(self):
         g1 = Grouping( key=lambda e: "The Special One",
                        filter=lambda e: "special" in e.uid)
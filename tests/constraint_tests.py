@@ -8,6 +8,7 @@ import pandas as pd
 
 from oemof.solph.network import Investment
 from oemof.solph import OperationalModel
+from oemof.solph.matrix import MatrixModel
 
 from oemof import energy_system as core_es
 import oemof.solph as solph
@@ -41,8 +42,17 @@ class Constraint_Tests:
         tmp_filename = filename.replace('.lp', '') + '_tmp.lp'
         new_filename = ospath.join(self.tmppath, tmp_filename)
         om.write(new_filename, io_options={'symbolic_solver_labels': True})
+        self.compare_with_expected(new_filename, filename, ignored)
+
+        # the direct matrix backend has to write the same file
+        matrix_filename = ospath.join(
+            self.tmppath, filename.replace('.lp', '') + '_matrix_tmp.lp')
+        MatrixModel(self.energysystem).write(matrix_filename)
+        self.compare_with_expected(matrix_filename, filename, ignored)
+
+    def compare_with_expected(self, new_filename, filename, ignored=None):
         logging.info("Comparing with file: {0}".format(filename))
-        with open(ospath.join(self.tmppath, tmp_filename)) as generated_file:
+        with open(new_filename) as generated_file:
             with open(ospath.join(ospath.dirname(ospath.realpath(__file__)),
                                   "lp_files",
                                   filename)) as expected_file:
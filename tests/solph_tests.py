@@ -1,8 +1,30 @@
-from nose.tools import ok_, eq_
+from collections import UserList
+import os
+import re
+import subprocess
+import sys
+import threading
 
+from nose import SkipTest
+from nose.tools import ok_, eq_, assert_raises
+import numpy as np
+import pandas as pd
+import pyomo.environ as po
+
+from oemof import outputlib
 from oemof.energy_system import EnergySystem as ES
+from oemof.network import Node
 from oemof.solph.blocks import InvestmentFlow as IF
+from oemof.solph.aggregation import TypicalPeriods
+from oemof.solph import generator, groupings
+from oemof.solph.inputlib import csv_cache, csv_tools
+from oemof.solph.matrix import MatrixModel
 from oemof.solph.network import Investment
+from oemof.solph import persistence
+from oemof.solph.rolling_horizon import (ResultStore, RollingHorizon,
+                                         windowed)
+from oemof.solph.scenarios import solve_scenarios
+from oemof.tools import helpers
 import oemof.solph as solph
 
 
@@ -38,3 +60,877 @@ class Grouping_Tests:
             ("Expected InvestmentFlow group to be nonempty.\n" +
              "Got: {}").format(self.es.groups.get(IF)))
 
+    def test_constraint_group_registry(self):
+        """ Subclasses get the constraint block of their closest registered
+        base class unless they register a block themselves.
+        """
+        class Converter(solph.LinearTransformer):
+            pass
+
+        class Boiler(Converter):
+            pass
+
+        b = solph.Bus(label='Bus')
+        converter = Converter(label='converter', inputs={b: solph.Flow()},
+                              conversion_factors={b: 0.5})
+        groupings.register_constraint_group(Boiler, solph.blocks.Bus)
+        try:
+            boiler = Boiler(label='boiler', inputs={b: solph.Flow()},
+                            conversion_factors={b: 0.5})
+            groups = self.es.groups
+        finally:
+            del groupings.CONSTRAINT_GROUPS[Boiler]
+        eq_(groups[solph.blocks.LinearTransformer], {converter})
+        eq_(groups[solph.blocks.Bus], {b, boiler})
+
+    def test_flow_groups(self):
+        """ A flow is put into every flow group it belongs to."""
+        b = solph.Bus(label='Bus')
+        source = solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=10, binary=solph.BinaryFlow())})
+        sink = solph.Sink(label='Sink', inputs={b: solph.Flow(
+            investment=Investment(ep_costs=500))})
+        stf = {(source, b, source.outputs[b]), (b, sink, sink.inputs[b])}
+        eq_(self.es.groups[solph.blocks.Flow], stf)
+        eq_(self.es.groups[solph.blocks.BinaryFlow],
+            {(source, b, source.outputs[b])})
+        eq_(self.es.groups[IF], {(b, sink, sink.inputs[b])})
+        ok_(solph.blocks.DiscreteFlow not in self.es.groups)
+
+
+class OperationalModel_Tests:
+
+    def setup(self):
+        self.es = solph.EnergySystem(
+            timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+
+    def test_flow_bounds_and_fixed_values(self):
+        """ Bounds and fixed values of the flow variable are set flow-wise.
+        """
+        b = solph.Bus(label='Bus')
+        source = solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=10, min=[0.1, 0.2, 0.3], max=0.9)})
+        sink = solph.Sink(label='Sink', inputs={b: solph.Flow(
+            nominal_value=2, actual_value=[1, 2, 3], fixed=True)})
+        om = solph.OperationalModel(self.es)
+
+        for t, minimum in enumerate([0.1, 0.2, 0.3]):
+            eq_(om.flow[source, b, t].lb, minimum * 10)
+            eq_(om.flow[source, b, t].ub, 9)
+            ok_(not om.flow[source, b, t].fixed)
+            eq_(om.flow[b, sink, t].value, (t + 1) * 2)
+            ok_(om.flow[b, sink, t].fixed)
+
+    def test_presolve(self):
+        """ Fixed and zero-bounded flows are constants in a presolved model.
+        """
+        b = solph.Bus(label='Bus')
+        source = solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=10, max=[0, 1, 0], variable_costs=2)})
+        sink = solph.Sink(label='Sink', inputs={b: solph.Flow(
+            nominal_value=2, actual_value=[0, 2, 0], fixed=True)})
+        om = solph.OperationalModel(self.es, presolve=True)
+
+        eq_(list(om.FLOW_TIMESTEPS), [(source, b, 1)])
+        eq_(om.flow_expression(b, sink, 1), 4)
+        eq_(om.flow_expression(source, b, 1), om.flow[source, b, 1])
+        # the balances of the first and last timestep are no constraints
+        eq_(list(om.Bus.balance), [(b, 1)])
+
+        om.flow[source, b, 1].value = 4
+        eq_(po.value(om.objective), 8)
+        eq_(list(om.flow_values(source, b)), [0, 4, 0])
+        eq_(list(om.results()[b][sink]), [0, 4, 0])
+
+    def test_presolve_infeasible(self):
+        """ Presolved flows violating a bus balance raise a ValueError.
+        """
+        b = solph.Bus(label='Bus')
+        solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=10, max=0)})
+        solph.Sink(label='Sink', inputs={b: solph.Flow(
+            nominal_value=2, actual_value=1, fixed=True)})
+        assert_raises(ValueError, solph.OperationalModel, self.es,
+                      presolve=True)
+
+    def test_presolve_conversion_factor_profile(self):
+        """ Relations of presolved flows with conversion factors given as
+        sequence are checked, not added as constraints.
+        """
+        b_in = solph.Bus(label='Bus_in')
+        b_out = solph.Bus(label='Bus_out')
+        solph.Source(label='Source', outputs={b_in: solph.Flow(
+            nominal_value=4, actual_value=[1, 1, 1], fixed=True)})
+        transformer = solph.LinearTransformer(
+            label='Transformer',
+            inputs={b_in: solph.Flow(nominal_value=4, actual_value=[1, 1, 1],
+                                     fixed=True)},
+            outputs={b_out: solph.Flow(nominal_value=2,
+                                       actual_value=[1, 1, 1], fixed=True)},
+            conversion_factors={b_out: [0.5, 0.5, 0.5]})
+        solph.Sink(label='Sink', inputs={b_out: solph.Flow(
+            nominal_value=2, actual_value=[1, 1, 1], fixed=True)})
+        om = solph.OperationalModel(self.es, presolve=True)
+
+        eq_(len(om.LinearTransformer.relation), 0)
+        eq_(len(om.Bus.balance), 0)
+
+        transformer.conversion_factors[b_out] = [0.5, 0.4, 0.5]
+        assert_raises(ValueError, solph.OperationalModel, self.es,
+                      presolve=True)
+
+    def test_result_arrays(self):
+        """ Results are read into arrays at once, the nested dictionary holds
+        their values.
+        """
+        b = solph.Bus(label='Bus')
+        source = solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=10, variable_costs=2)})
+        storage = solph.Storage(label='Storage', inputs={b: solph.Flow()},
+                                outputs={b: solph.Flow()},
+                                nominal_capacity=10)
+        om = solph.OperationalModel(self.es)
+        om.receive_duals()
+        for (o, i), f in om.flows.items():
+            for t in om.TIMESTEPS:
+                om.flow[o, i, t].value = t
+        for t in om.TIMESTEPS:
+            om.Storage.capacity[storage, t].value = 2 * t
+        om.dual[om.Bus.balance[b, 1]] = 5
+
+        results = om.results()
+        arrays = results.arrays
+        eq_(arrays.flows.shape, (3, 3))
+        eq_(list(arrays.flow(source, b)), [0, 1, 2])
+        eq_(list(arrays.capacity(storage)), [0, 2, 4])
+        eq_(arrays.buses, [b])
+        ok_(np.isnan(arrays.dual(b)[0]))
+        eq_(arrays.dual(b)[1], 5)
+        eq_(list(results[source][b]), [0, 1, 2])
+        eq_(list(results[storage][storage]), [0, 2, 4])
+        eq_(results[b][b][1], 5)
+
+    def test_compact_sequences(self):
+        """ Constant sequences do not grow, profiles are not copied.
+        """
+        b = solph.Bus(label='Bus')
+        profile = np.array([0.5, 0.8, 0.2])
+        source = solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=10, max=profile, variable_costs=2)})
+        flow = source.outputs[b]
+        solph.OperationalModel(self.es)
+
+        ok_(flow.variable_costs.is_constant)
+        eq_(len(flow.variable_costs), 0)
+        ok_(not flow.max.is_constant)
+        ok_(np.shares_memory(flow.max.values, profile))
+        # items are Python numbers, as items of lists
+        ok_(type(flow.max[1]) is float)
+        ok_(type(solph.Flow(actual_value=[1, 2]).actual_value[0]) is int)
+
+    def test_profiles_of_none(self):
+        """ Profiles of None are treated like None.
+        """
+        b = solph.Bus(label='Bus')
+        source = solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=10, variable_costs=[None, None, None],
+            positive_gradient=[None, None, None])})
+        om = solph.OperationalModel(self.es)
+        mm = MatrixModel(self.es)
+
+        eq_(list(om.POSITIVE_GRADIENT_FLOWS), [])
+        eq_(list(om.Flow.VARIABLE_COST_FLOWS), [])
+        eq_(len(om.positive_flow_gradient), 0)
+        ok_(not mm.costs.any())
+        ok_((source, b) not in mm.positive_flow_gradient.positions)
+
+    def test_update_parameters(self):
+        """ Updated series are pushed into the existing model.
+        """
+        b = solph.Bus(label='Bus')
+        source = solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=10, max=0.9, variable_costs=2)})
+        sink = solph.Sink(label='Sink', inputs={b: solph.Flow(
+            nominal_value=2, actual_value=[1, 2, 3], fixed=True)})
+        om = solph.OperationalModel(self.es)
+        objective = om.objective
+
+        om.update_parameters({
+            (source, b): {'variable_costs': [1, 5, 7],
+                          'max': [0.5, 0.25, 0.75]},
+            (b, sink): {'actual_value': [3, 2, 1]}})
+
+        for t, maximum in enumerate([5, 2.5, 7.5]):
+            eq_(om.flow[source, b, t].ub, maximum)
+            eq_(om.flow[b, sink, t].value, (3 - t) * 2)
+            ok_(om.flow[b, sink, t].fixed)
+            om.flow[source, b, t].value = 1
+        eq_(po.value(om.objective), 13)
+        # the cost coefficients are updated, the objective is not rebuilt
+        ok_(om.objective is objective)
+        eq_(po.value(om.Flow.variable_cost_coefficient[source, b, 2]), 7)
+
+        om.update_parameters({(b, sink): {'variable_costs': 1}})
+        ok_(om.objective is not objective)
+        eq_(po.value(om.objective), 25)
+
+    def test_build_profile(self):
+        """ Sizes of the blocks are recorded in the build profile.
+        """
+        b = solph.Bus(label='Bus')
+        solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=10, variable_costs=2)})
+        solph.Sink(label='Sink', inputs={b: solph.Flow(
+            nominal_value=2, actual_value=[1, 2, 3], fixed=True)})
+        om = solph.OperationalModel(self.es, profile=True)
+        report = om.build_report()
+
+        eq_(list(report.index), ['flow'] + [
+            str(group()) for group in om.CONSTRAINT_GROUPS] + [
+            'objective', 'total'])
+        eq_(list(report.loc['flow', ['variables', 'constraints']]), [6, 0])
+        eq_(list(report.loc['Bus', ['constraints', 'nonzeros']]), [3, 3])
+        eq_(report.loc['objective', 'nonzeros'], 3)
+        eq_(report.loc['total', 'constraints'], 3)
+        ok_(report.loc['total', 'seconds'] > 0)
+        ok_((report['memory'] >= 0).all())
+        ok_(report.loc['flow', 'memory'] > 0)
+
+    def test_non_periodic_storage(self):
+        """ The first storage balance of a non-periodic model refers to the
+        initial capacity and the last capacity stays free.
+        """
+        b = solph.Bus(label='Bus')
+        storage = solph.Storage(
+            label='Storage', inputs={b: solph.Flow()},
+            outputs={b: solph.Flow()}, nominal_capacity=10,
+            initial_capacity=0.5)
+        om = solph.OperationalModel(self.es, periodic=False)
+
+        ok_(not om.Storage.capacity[storage, 2].fixed)
+        for t in om.TIMESTEPS:
+            om.Storage.capacity[storage, t].value = 1
+            om.flow[b, storage, t].value = 0
+            om.flow[storage, b, t].value = 0
+        eq_(po.value(om.Storage.balance[storage, 0].body), -4)
+        eq_(po.value(om.Storage.balance[storage, 1].body), 0)
+
+
+class RollingHorizon_Tests:
+
+    def setup(self):
+        self.es = solph.EnergySystem(
+            timeindex=pd.date_range('1/1/2012', periods=5, freq='H'))
+
+    def test_windows(self):
+        """ The kept parts of the windows cover the time horizon once.
+        """
+        for window, overlap in [(2, 0), (3, 1), (5, 2), (8, 3)]:
+            windows = RollingHorizon(self.es, window, overlap).windows()
+            kept = [t for start, stop, keep in windows
+                    for t in range(start, keep)]
+            eq_(kept, list(range(5)))
+            ok_(all(stop - start <= window for start, stop, _ in windows))
+
+    def test_windowed_sequences(self):
+        """ Sequences are restricted to the window and restored afterwards.
+        """
+        b = solph.Bus(label='Bus')
+        source = solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=10, variable_costs=[1, 2, 3, 4, 5], max=0.9)})
+        flow = source.outputs[b]
+        costs = flow.variable_costs
+
+        timeindex = self.es.timeindex
+        with windowed(self.es, 2, 4):
+            eq_(list(self.es.timeindex), list(timeindex[2:4]))
+            eq_(list(flow.variable_costs), [3, 4])
+            eq_(flow.max[1], 0.9)
+            om = solph.OperationalModel(self.es)
+            eq_(len(om.TIMESTEPS), 2)
+        ok_(flow.variable_costs is costs)
+        ok_(self.es.timeindex is timeindex)
+
+    def test_investment_not_supported(self):
+        """ Investment flows can not be optimized window by window.
+        """
+        b = solph.Bus(label='Bus')
+        solph.Source(label='Source', outputs={b: solph.Flow(
+            investment=Investment(ep_costs=10))})
+        try:
+            RollingHorizon(self.es, window=2)
+        except ValueError:
+            pass
+        else:
+            ok_(False, "Expected a ValueError for an investment flow.")
+
+    def test_unknown_duals(self):
+        """ Unknown duals of bus balances are stored as NaN.
+        """
+        b = solph.Bus(label='Bus')
+        source = solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=10, variable_costs=2)})
+        solph.Sink(label='Sink', inputs={b: solph.Flow(
+            nominal_value=2, actual_value=[1, 1, 1, 1, 1], fixed=True)})
+        om = solph.OperationalModel(self.es, periodic=False)
+        om.receive_duals()
+        om.dual[om.Bus.balance[b, 1]] = 3
+        for t in om.TIMESTEPS:
+            om.flow[source, b, t].value = 2
+
+        store = ResultStore(self.es, duals=True)
+        store.add(om, 0, 5)
+        eq_(store.duals[b][1], 3)
+        eq_(int(np.isnan(store.duals[b]).sum()), 4)
+
+    def test_stitched_objective(self):
+        """ The variable costs of the stitched dispatch are weighted with the
+        time increment.
+        """
+        es = solph.EnergySystem(
+            timeindex=pd.date_range('1/1/2012', periods=3, freq='2H'))
+        b = solph.Bus(label='Bus')
+        source = solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=10, variable_costs=[1, 2, 3])})
+        store = ResultStore(es)
+        store.flows[source, b][:] = [4, 5, 6]
+        eq_(store.result_dict().objective, 2 * (4 + 10 + 18))
+
+
+class Scenarios_Tests:
+
+    def setup(self):
+        self.es = solph.EnergySystem(
+            timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+        b = solph.Bus(label='Bus')
+        self.source = solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=10, variable_costs=2)})
+        solph.Sink(label='Sink', inputs={b: solph.Flow(
+            nominal_value=2, actual_value=[1, 2, 3], fixed=True)})
+        self.flow = self.source.outputs[b]
+        self.scenarios = {
+            'unknown_node': {('Source', 'Nowhere'): {'max': 0.5}},
+            'unknown_attribute': {('Source', 'Bus'): {'variable_costs': 5},
+                                  'Sink': {'nonsense': 1}}}
+
+    def test_failures_are_isolated(self):
+        """ Failing scenarios are reported and do not stop the batch.
+        """
+        for workers in [0, 2]:
+            results = solve_scenarios(self.es, self.scenarios, workers=workers)
+            eq_(sorted(results.failed()), sorted(self.scenarios))
+            ok_('KeyError' in results['unknown_node'].message)
+            ok_('AttributeError' in results['unknown_attribute'].message)
+            eq_(results.flow_labels, [('Bus', 'Sink'), ('Source', 'Bus')])
+        # overrides are restored in the calling process (workers=0)
+        eq_(self.flow.variable_costs[0], 2)
+
+    def test_model_kwargs(self):
+        """ The models of the scenarios are built with the model_kwargs.
+        """
+        scenarios = {'no_source': {('Source', 'Bus'): {'max': 0}}}
+        results = solve_scenarios(self.es, scenarios, workers=0,
+                                  model_kwargs={'presolve': True})
+        # the presolve finds the bus balance violated while building
+        ok_('presolved flows of Bus violate'
+            in results['no_source'].message)
+
+    def test_timeout_in_thread(self):
+        """ Scenarios with a time limit can be solved in another thread.
+        """
+        results = {}
+
+        def solve():
+            results.update(solve_scenarios(self.es, self.scenarios,
+                                           workers=0, timeout=10))
+        thread = threading.Thread(target=solve)
+        thread.start()
+        thread.join()
+        eq_(sorted(results), sorted(self.scenarios))
+
+
+class TypicalPeriods_Tests:
+
+    def setup(self):
+        self.es = solph.EnergySystem(
+            timeindex=pd.date_range('1/1/2012', periods=12, freq='H'))
+        self.b = solph.Bus(label='Bus')
+        # periods 0, 2 and 3 are alike
+        self.source = solph.Source(label='Source', outputs={
+            self.b: solph.Flow(nominal_value=10, variable_costs=2,
+                               max=[1, 1, 1, 0, 0, 1, 1, 1, 1, 1, 0.9, 1])})
+        solph.Sink(label='Sink', inputs={self.b: solph.Flow(
+            nominal_value=2, actual_value=[1] * 12, fixed=True)})
+        self.storage = solph.Storage(
+            label='Storage', inputs={self.b: solph.Flow()},
+            outputs={self.b: solph.Flow()}, nominal_capacity=10)
+
+    def test_clustering(self):
+        """ Alike periods are represented by the same typical period.
+        """
+        for method in ['kmeans', 'kmedoids', 'hierarchical']:
+            aggregation = TypicalPeriods(self.es, 2, period_length=3,
+                                         method=method, seed=1)
+            eq_(list(aggregation.cluster_order), [0, 1, 0, 0])
+            eq_(list(aggregation.weights), [3, 1])
+            eq_(list(aggregation.disaggregate(range(6))),
+                [0, 1, 2, 3, 4, 5, 0, 1, 2, 0, 1, 2])
+
+    def test_reduced_model(self):
+        """ The model of the typical periods is weighted and the sequences
+        are restored afterwards.
+        """
+        aggregation = TypicalPeriods(self.es, 2, period_length=3,
+                                     method='kmedoids', seed=1)
+        om = aggregation.model()
+        flow = self.source.outputs[self.b]
+
+        eq_(len(om.TIMESTEPS), 6)
+        eq_(len(flow.max), 12)
+        eq_(len(self.es.timeindex), 12)
+        ok_(not hasattr(om, 'Storage'))
+        eq_(len(om.TypicalPeriodStorage.capacity_inter), 5)
+        for t in om.TIMESTEPS:
+            om.flow[self.source, self.b, t].value = 1
+            om.flow[self.b, self.storage, t].value = 0
+            om.flow[self.storage, self.b, t].value = 0
+        # three periods are represented by the first typical period
+        eq_(po.value(om.objective), 2 * (3 * 3 + 3))
+
+
+class MatrixModel_Tests:
+
+    def setup(self):
+        self.es = solph.EnergySystem(
+            timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+
+    def test_write_mps(self):
+        """ Fixed flows are moved to the right-hand side of the MPS file.
+        """
+        b = solph.Bus(label='Bus')
+        solph.Source(label='Source', outputs={b: solph.Flow(
+            nominal_value=10, variable_costs=2)})
+        solph.Sink(label='Sink', inputs={b: solph.Flow(
+            nominal_value=2, actual_value=[1, 2, 3], fixed=True)})
+        filename = os.path.join(helpers.extend_basic_path('tmp'),
+                                'matrix_model_tmp.mps')
+        MatrixModel(self.es).write(filename)
+
+        with open(filename) as mps_file:
+            lines = [line.split() for line in mps_file]
+        ok_(['E', 'c_e_Bus_balance(Bus_2)_'] in lines)
+        ok_(['flow(Source_Bus_1)', 'objective', '2'] in lines)
+        ok_(['RHS', 'c_e_Bus_balance(Bus_2)_', '6'] in lines)
+        ok_(['UP', 'BOUND', 'flow(Source_Bus_0)', '10'] in lines)
+        ok_(not any('flow(Bus_Sink_0)' in line for line in lines))
+
+    def test_labels(self):
+        """ Characters other than ASCII letters, digits, underscores and
+        parentheses are replaced in the labels of LP and MPS files.
+        """
+        b = solph.Bus(label='Bus €')
+        solph.Source(label='電源', outputs={b: solph.Flow(variable_costs=2)})
+        solph.Sink(label='Sink-1', inputs={b: solph.Flow(
+            nominal_value=2, actual_value=[1, 2, 3], fixed=True)})
+        filename = os.path.join(helpers.extend_basic_path('tmp'),
+                                'matrix_model_tmp.lp')
+        MatrixModel(self.es).write(filename)
+
+        with open(filename, encoding='utf-8') as lp_file:
+            content = lp_file.read()
+        ok_(not re.search(r'[^\x00-\x7f]', content))
+        ok_('flow(___Bus___0)' in content)
+        ok_('c_e_Bus_balance(Bus___0)_' in content)
+
+    def test_unsupported_arguments(self):
+        """ Arguments of the OperationalModel which the MatrixModel does not
+        support are rejected.
+        """
+        solph.Bus(label='Bus')
+        assert_raises(TypeError, MatrixModel, self.es, periodic=False)
+        assert_raises(TypeError, MatrixModel, self.es, presolve=True)
+
+
+class Persistence_Tests:
+
+    def setup(self):
+        self.es = solph.EnergySystem(
+            timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+
+    def test_round_trip(self):
+        """ Nodes, flows, options and sequences are restored, profiles are
+        memory-mapped.
+        """
+        bel = solph.Bus(label='electricity')
+        bgas = solph.Bus(label='gas', balanced=False)
+        solph.Source(label='wind', outputs={bel: solph.Flow(
+            nominal_value=10, actual_value=[0.2, 0.8, 0.5], fixed=True)})
+        solph.LinearTransformer(
+            label='pp', inputs={bgas: solph.Flow()},
+            outputs={bel: solph.Flow(nominal_value=5, min=0.4,
+                                     binary=solph.BinaryFlow())},
+            conversion_factors={bel: [0.4, 0.5, 0.6]})
+        solph.Storage(label='storage', inputs={bel: solph.Flow()},
+                      outputs={bel: solph.Flow()},
+                      investment=Investment(ep_costs=10), capacity_loss=0.01)
+        path = os.path.join(helpers.extend_basic_path('tmp'),
+                            'persistence_tmp')
+        persistence.save(self.es, path)
+        es = persistence.load(path)
+
+        eq_(list(es.timeindex), list(self.es.timeindex))
+        eq_(es.timeindex.freq, self.es.timeindex.freq)
+        eq_(sorted(str(n) for n in es.nodes),
+            sorted(str(n) for n in self.es.nodes))
+        bel, bgas = es.groups['electricity'], es.groups['gas']
+        ok_(not bgas.balanced)
+        wind = es.groups['wind'].outputs[bel]
+        eq_(list(wind.actual_value), [0.2, 0.8, 0.5])
+        ok_(isinstance(wind.actual_value.base.base, np.memmap))
+        ok_(wind.fixed)
+        eq_(wind.nominal_value, 10)
+        pp = es.groups['pp']
+        eq_(list(pp.conversion_factors[bel]), [0.4, 0.5, 0.6])
+        eq_(pp.outputs[bel].min[2], 0.4)
+        eq_(pp.outputs[bel].binary.initial_status, 0)
+        storage = es.groups['storage']
+        eq_(storage.investment.ep_costs, 10)
+        eq_(storage.capacity_loss, solph.plumbing.sequence(0.01))
+        ok_(isinstance(storage.inputs[bel].investment, Investment))
+        eq_(es.groups[solph.blocks.InvestmentStorage], {storage})
+
+
+class Generator_Tests:
+
+    def test_sizes_and_options(self):
+        es = generator.generate_energy_system(
+            buses=6, transformers=20, storages=5, timesteps=48,
+            investment=0.3, binary=0.3, profiles=4)
+        eq_(len(es.timeindex), 48)
+        eq_(len(es.flows()), 3 * 6 + 2 * 20 + 2 * 5)
+        eq_(len(es.groups[solph.blocks.Bus]), 6)
+        eq_(len(es.groups[solph.blocks.LinearTransformer]), 20)
+        eq_(len(es.groups[solph.blocks.Storage]) +
+            len(es.groups[solph.blocks.InvestmentStorage]), 5)
+        ok_(es.groups[solph.blocks.InvestmentFlow])
+        ok_(es.groups[solph.blocks.BinaryFlow])
+        demands = [es.groups['demand_{0}'.format(i)].inputs[
+            es.groups['bus_{0}'.format(i)]].actual_value for i in range(6)]
+        # the profiles are shared, not copied
+        ok_(np.shares_memory(demands[0].values, demands[4].values))
+        ok_(all(0 <= d.values.min() and d.values.max() <= 1
+                for d in demands))
+        for n in es.groups[solph.blocks.LinearTransformer]:
+            ok_(set(n.inputs).isdisjoint(n.outputs))
+        solph.OperationalModel(es)
+
+    def test_reproducible_stream(self):
+        """ Streamed nodes equal the nodes of the same seed, they are not
+        added to the registry. Other seeds give other systems.
+        """
+        def flows(es):
+            return sorted((s.label, t.label, f.nominal_value,
+                           tuple(f.max[t] for t in range(3)))
+                          for (s, t), f in es.flows().items())
+
+        es = generator.generate_energy_system(buses=5, transformers=8,
+                                              storages=2, seed=3)
+        streamed = solph.EnergySystem(timeindex=es.timeindex)
+        streamed.add_many(generator.generate_nodes(
+            buses=5, transformers=8, storages=2, seed=3))
+        eq_(flows(streamed), flows(es))
+        eq_(len(streamed.entities), len(es.entities))
+        ok_(Node.registry is streamed)
+        other = generator.generate_energy_system(buses=5, transformers=8,
+                                                 storages=2, seed=4)
+        ok_(flows(other) != flows(es))
+
+
+class ResultsDataFrame_Tests:
+
+    def setup(self):
+        self.es = solph.EnergySystem(
+            timeindex=pd.date_range('1/1/2012', periods=3, freq='H'))
+        bel = solph.Bus(label='electricity')
+        wind = solph.Source(label='wind', outputs={bel: solph.Flow()})
+        demand = solph.Sink(label='demand', inputs={bel: solph.Flow()})
+        storage = solph.Storage(label='storage', inputs={bel: solph.Flow()},
+                                outputs={bel: solph.Flow()})
+        self.es.results = {
+            wind: {bel: UserList([3, 2, 1])},
+            bel: {demand: UserList([1, 1, 1]), storage: [2, 1, 0],
+                  bel: [0.5, 0.5, 0.4]},
+            storage: {bel: [0, 0, 0], storage: [2, 3, 3]}}
+
+    def test_from_energy_system(self):
+        """ The values of all objects are indexed by sorted labels and dates.
+        """
+        rdf = outputlib.ResultsDataFrame(energy_system=self.es)
+
+        eq_(rdf.shape, (18, 1))
+        ok_(rdf.index.is_monotonic_increasing)
+        eq_(list(rdf.index.levels[2]),
+            ['demand', 'duals', 'storage', 'wind'])
+        eq_(list(rdf.slice_by(type='to_bus', obj_label='wind').val),
+            [3, 2, 1])
+        eq_(list(rdf.slice_by(type='other', obj_label='storage').val),
+            [2, 3, 3])
+        eq_(list(rdf.loc['electricity', 'from_bus', 'demand'].index),
+            list(self.es.timeindex))
+
+    def test_slice_lookup(self):
+        """ Slices are taken from the row ranges of the lookup table, bus
+        balances are cached until the index is replaced.
+        """
+        rdf = outputlib.ResultsDataFrame(energy_system=self.es)
+        lookup = rdf.lookup()
+        eq_(list(lookup.starts), [0, 3, 6, 9, 12, 15])
+        ok_(rdf.lookup() is lookup)
+        subset = rdf.slice_by(obj_label=['storage', 'demand'],
+                              date_from='2012-01-01 01:00')
+        eq_(list(subset.val), [1, 1, 1, 0, 3, 3, 0, 0])
+        balance = rdf.slice_bus_balance('electricity')
+        eq_(list(lookup.balances), ['electricity'])
+        ok_(rdf.slice_bus_balance('electricity').equals(balance))
+        rdf.index = rdf.index.copy()
+        ok_(rdf.lookup() is not lookup)
+        eq_(rdf.lookup().balances, {})
+
+    def test_result_table(self):
+        """ The wide result table holds one column per result and converts
+        from and to the long format.
+        """
+        rdf = outputlib.ResultsDataFrame(energy_system=self.es)
+        table = outputlib.ResultTable.from_energy_system(self.es)
+        eq_(table.values.shape, (6, 3))
+        ok_(table.to_long().equals(rdf))
+        ok_(outputlib.ResultTable.from_long(rdf).to_long().equals(rdf))
+
+        eq_(list(table.frame['wind', 'electricity']), [3, 2, 1])
+        eq_(list(table.frame['storage', 'storage']), [2, 3, 3])
+        eq_(sorted(table.flows_of('storage').columns),
+            [('electricity', 'storage'), ('storage', 'electricity')])
+        balance = table.bus_balance('electricity')
+        eq_(list(balance.columns.get_level_values('obj_label')),
+            list(rdf.slice_bus_balance('electricity').columns))
+        ok_((balance.values ==
+             rdf.slice_bus_balance('electricity').values).all())
+
+    def check_file(self, filename):
+        rdf = outputlib.ResultsDataFrame(energy_system=self.es)
+        path = os.path.join(helpers.extend_basic_path('tmp'), filename)
+        rdf.to_file(path)
+        ok_(outputlib.ResultsDataFrame(filename=path).equals(rdf))
+        selected = outputlib.ResultsDataFrame(
+            filename=path, obj_label=['storage', 'wind'],
+            date_from='2012-01-01 01:00')
+        eq_(list(selected.val), [1, 0, 3, 3, 0, 0, 2, 1])
+        eq_(list(selected.index.get_level_values('obj_label').unique()),
+            ['storage', 'wind'])
+
+    def test_csv_file(self):
+        """ Results are stored as csv and read selectively.
+        """
+        self.check_file('results_tmp.csv')
+        assert_raises(ValueError, outputlib.ResultsDataFrame(
+            energy_system=self.es).to_file, 'results_tmp.xls')
+
+    def test_parquet_file(self):
+        """ Results are stored as Parquet and read selectively.
+        """
+        try:
+            import pyarrow
+        except ImportError:
+            raise SkipTest('pyarrow is not installed.')
+        self.check_file('results_tmp.parquet')
+
+    def test_hdf_file(self):
+        """ Results are stored as HDF5 and read selectively.
+        """
+        try:
+            import tables
+        except ImportError:
+            raise SkipTest('pytables is not installed.')
+        self.check_file('results_tmp.h5')
+
+
+class NodesFromCSV_Tests:
+
+    def setup(self):
+        self.es = solph.EnergySystem()
+        self.path = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), os.pardir,
+            'examples', 'solph', 'csv_reader', 'dispatch', 'scenarios')
+
+    def test_dispatch_example(self):
+        """ Nodes, flows and sequences of the dispatch example are read.
+        """
+        nodes = solph.NodesFromCSV(
+            os.path.join(self.path, 'example_energy_system.csv'),
+            os.path.join(self.path, 'example_energy_system_seq.csv'))
+
+        eq_(sorted(str(n) for n in self.es.nodes), sorted(nodes))
+        bel = nodes['R1_bus_el']
+        ok_(isinstance(bel, solph.Bus))
+        wind = nodes['R1_wind'].outputs[bel]
+        eq_(wind.nominal_value, 5000)
+        ok_(wind.fixed)
+        eq_(list(wind.actual_value[:2]), [0.315569, 0.311572])
+        pp = nodes['R1_pp_gas']
+        eq_(pp.conversion_factors[bel][0], 0.425)
+        eq_(pp.outputs[bel].variable_costs[0], 2)
+        eq_(pp.outputs[bel].max[0], 0.85)
+        ok_(pp.inputs[nodes['GL_bus_gas']].variable_costs[0] is None)
+        storage = nodes['R2_storage_phs']
+        eq_(storage.nominal_capacity, 13100)
+        eq_(storage.inflow_conversion_factor[0], 0.9)
+        eq_(storage.outputs[nodes['R2_bus_el']].nominal_value, 1000)
+
+    def test_cached_tables(self):
+        """ Parsed csv files are served from the cache, also if a file was
+        touched but not changed.
+        """
+        cache = csv_cache.ParsedCache(os.path.join(
+            helpers.extend_basic_path('tmp'), 'csv_cache_tmp'))
+        cache.clear()
+        files = [os.path.join(self.path, 'example_energy_system.csv'),
+                 os.path.join(self.path, 'example_energy_system_seq.csv')]
+        nodes = solph.NodesFromCSV(*files, cache=cache)
+        eq_(len(cache._read_index()['entries']), 2)
+
+        filename = os.path.join(cache.path, 'nodes_flows.csv')
+        with open(files[0]) as source, open(filename, 'w') as f:
+            f.write(source.read())
+        parsed = []
+
+        def parse(filename):
+            parsed.append(filename)
+            return os.path.getsize(filename)
+        cache.load(filename, parse)
+        os.utime(filename, ns=(0, 0))
+        eq_(cache.load(filename, parse), os.path.getsize(filename))
+        eq_(len(parsed), 1)
+
+        solph.EnergySystem()
+        cached = solph.NodesFromCSV(*files, cache=cache)
+        eq_(sorted(nodes), sorted(cached))
+        eq_(list(cached['R1_wind'].outputs[cached['R1_bus_el']]
+                 .actual_value[:2]), [0.315569, 0.311572])
+        cache.clear()
+        eq_(cache.size, 0)
+
+    def test_concurrent_cache(self):
+        """ Entries loaded by several processes at once are all indexed.
+        """
+        cache = csv_cache.ParsedCache(os.path.join(
+            helpers.extend_basic_path('tmp'), 'csv_cache_tmp'))
+        cache.clear()
+        files = []
+        for i in range(40):
+            files.append(os.path.join(cache.path, 'file_{0}.txt'.format(i)))
+            with open(files[-1], 'w') as f:
+                f.write('x' * i)
+        code = ("import os, sys\n"
+                "from oemof.solph.inputlib import csv_cache\n"
+                "cache = csv_cache.ParsedCache(sys.argv[1])\n"
+                "for filename in sys.argv[2:]:\n"
+                "    cache.load(filename, os.path.getsize)\n")
+        processes = [subprocess.Popen(
+            [sys.executable, '-c', code, cache.path] + files[i::4],
+            cwd=os.path.join(os.path.dirname(__file__), os.pardir))
+            for i in range(4)]
+        eq_([p.wait() for p in processes], [0] * 4)
+        eq_(len(cache._read_index()['entries']), 40)
+        eq_(len(cache._read_index()['sources']), 40)
+        cache.clear()
+
+    def test_merge_csv_files(self):
+        """ Tables and sequences of a directory are merged.
+        """
+        output = helpers.extend_basic_path(os.path.join('tmp', 'merged_tmp'))
+        nodes_flows, nodes_flows_seq = csv_tools.merge_csv_files(
+            self.path, output, cache=False, workers=2, output_format='pickle')
+        table = pd.read_csv(os.path.join(self.path,
+                                         'example_energy_system.csv'))
+        eq_(nodes_flows.shape, table.shape)
+        eq_(nodes_flows_seq.shape, (8760, 6))
+        ok_(pd.read_pickle(os.path.join(
+            output, 'merged_nodes_flows_seq.pkl')).equals(nodes_flows_seq))
+        assert_raises(ValueError, csv_tools.merge_csv_files, self.path,
+                      output, output_format='xls')
+
+    def test_resample_sequence(self):
+        """ Coarser samples aggregated from finer ones equal the resampled
+        sequences.
+        """
+        filename = os.path.join(self.path, os.pardir, os.pardir, 'investment',
+                                'data', 'nodes_flows_seq.csv')
+        output = helpers.extend_basic_path(os.path.join('tmp', 'resampled'))
+        seq = pd.read_csv(filename, header=[0, 1, 2, 3, 4], index_col=0,
+                          parse_dates=True)
+        wind = ('Source', 'REGION1_wind', 'REGION1_wind', 'REGION1_bus_el',
+                'actual_value')
+        load = ('Sink', 'REGION1_load', 'REGION1_bus_el', 'REGION1_load',
+                'actual_value')
+        solar = ('Source', 'REGION1_solar', 'REGION1_solar',
+                 'REGION1_bus_el', 'actual_value')
+        files = csv_tools.resample_sequence(
+            filename, output, samples=['24H', '4H', '5H', 'M', '2H'],
+            how={wind: 'max', load: 'sum'}, chunksize=1000)
+        for sample in ['24H', '4H', '5H', 'M', '2H']:
+            resampled = pd.read_csv(files[sample], header=[0, 1, 2, 3, 4],
+                                    index_col=0, parse_dates=True)
+            ok_(np.allclose(resampled[wind],
+                            seq[wind].resample(sample).max()))
+            ok_(np.allclose(resampled[load],
+                            seq[load].resample(sample).sum()))
+            ok_(np.allclose(resampled[solar],
+                            seq[solar].resample(sample).mean()))
+
+
+class LazyImport_Tests:
+
+    def run(self, code):
+        """ Returns the output of `code` run in a fresh interpreter."""
+        return subprocess.check_output(
+            [sys.executable, '-c', code],
+            cwd=os.path.join(os.path.dirname(__file__), os.pardir),
+            stderr=subprocess.DEVNULL, universal_newlines=True)
+
+    def test_import_loads_no_dependencies(self):
+        """ Importing the packages must not import the modelling and plotting
+        libraries, which are loaded on first access of the classes.
+        """
+        loaded = self.run(
+            "import sys; import oemof.solph, oemof.outputlib, "
+            "oemof.tools; print(' '.join(sorted(m for m in "
+            "['pyomo', 'pandas', 'dill', 'matplotlib', 'networkx'] "
+            "if m in sys.modules)))")
+        eq_(loaded.split(), [])
+        # the outputlib does not depend on solph
+        eq_(self.run("import sys, oemof.outputlib; "
+                     "print('oemof.solph' in sys.modules)").split(),
+            ['False'])
+
+    def test_lazy_attributes(self):
+        """ Classes and submodules are attributes of the packages without
+        importing the submodules explicitly.
+        """
+        output = self.run(
+            "import oemof.solph as solph, oemof.outputlib as outputlib, "
+            "oemof.tools as tools\n"
+            "print(solph.Bus is solph.network.Bus,\n"
+            "      solph.OperationalModel is solph.models.OperationalModel,\n"
+            "      solph.plumbing.sequence(1)[0] == 1,\n"
+            "      all(hasattr(solph, m) for m in ['blocks', 'groupings',\n"
+            "          'options', 'inputlib']),\n"
+            "      solph.inputlib.csv_tools.NodesFromCSV is "
+            "solph.NodesFromCSV,\n"
+            "      outputlib.result_dictionary.ResultArrays is "
+            "outputlib.ResultArrays,\n"
+            "      outputlib.ResultTable.__name__ == 'ResultTable',\n"
+            "      tools.helpers.__name__ == 'oemof.tools.helpers',\n"
+            "      'OperationalModel' in dir(solph),\n"
+            "      hasattr(solph, 'NoSuchClass'),\n"
+            "      hasattr(outputlib, 'no_such_module'))")
+        eq_(output.split()[-11:], ['True'] * 9 + ['False'] * 2)
@@ -3,7 +3,7 @@ from traceback import format_exception_only as feo
 from nose.tools import assert_raises, eq_, ok_
 
 from oemof.energy_system import EnergySystem as ES
-from oemof.network import Bus, Node, Transformer
+from oemof.network import Bus, Node, Transformer, flow
 
 
 class Node_Tests:
@@ -74,6 +74,22 @@ class Node_Tests:
             "\n  Got unexpected exception:\n" +
             "\n      {}".format(feo(type(exception), exception)[0]))
 
+    def test_assignment_via_inputs_and_outputs(self):
+        """ Flows set or deleted via the inputs or outputs of a node are set or
+        deleted for both nodes.
+        """
+        n1, n2, n3 = Node(label="<N1>"), Node(label="<N2>"), Node(label="<N3>")
+        version = flow.version
+        n1.outputs[n2] = "n1 -> n2"
+        n3.inputs[n1] = "n1 -> n3"
+        eq_(n2.inputs[n1], "n1 -> n2")
+        eq_(dict(n1.outputs), {n2: "n1 -> n2", n3: "n1 -> n3"})
+        ok_(flow.version > version)
+
+        del n2.inputs[n1]
+        ok_(n2 not in n1.outputs)
+        eq_(len(n2.inputs), 0)
+
     def test_that_nodes_do_not_get_undead_flows(self):
         """ Newly created nodes should only have flows assigned to them.
 
@@ -117,3 +133,20 @@ class EnergySystem_Nodes_Integration_Tests:
         b2 = Bus(label='<B2>')
         Transformer(label='<TF1>', inputs=[b1], outputs=[b2])
         ok_(isinstance(self.es.entities[2], Transformer))
+
+    def test_adjacency(self):
+        b1 = Bus(label='<B1>')
+        b2 = Bus(label='<B2>')
+        tf = Transformer(label='<TF1>', inputs={b1: 'in'}, outputs={b2: 'out'})
+        adjacency = self.es.adjacency
+        eq_(list(adjacency.successors(0)), [2])
+        eq_(list(adjacency.predecessors(1)), [2])
+        eq_(dict(self.es.flows()), {(b1, tf): 'in', (tf, b2): 'out'})
+        ok_(self.es.adjacency is adjacency,
+            "The adjacency should be kept while no flow changes.")
+
+        flow[b2, b1] = 'back'
+        ok_(self.es.adjacency is not adjacency,
+            "The adjacency should be rebuilt after a flow changed.")
+        eq_(self.es.flows()[b2, b1], 'back')
+        eq_(dict(b1.inputs), {b2: 'back'})